@@ -5,11 +5,27 @@ from core.mixer import Mixer
 from core.warehouse import Warehouse
 from core.agent import Agent, AgentType, AgentStatus
 from core.pathfinding import find_path
-from core.types import NodeType
-from typing import Dict, List
+from core.kinematics import estimate_travel_time
+from core.route_cache import RouteCache
+from core.distance_field import DistanceFieldCache
+from core.reservation import ReservationManager
+from core.dispatcher import Dispatcher
+from core.lock_manager import default_lock_manager
+from core.fleet_state import SharedFleetState
+from core.types import NodeType, TaskStatus
+from core.layout_reload import reload_layout
+from core.trajectory import TrajectoryArchive
+from core.log_store import MAX_PAGE
+from core.map_validation import MapValidationError
+from utils.warmup import Warmup
+from typing import Dict, List, Optional
+from dataclasses import asdict
+from contextlib import nullcontext
+import atexit
 import traceback
 import logging
 import os
+import threading
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
@@ -29,27 +45,112 @@ class Config:
 app.config.from_object(Config)
 db = SQLAlchemy(app)
 
-# Create the warehouse from JSON configuration
-try:
-    map_path = os.path.join(os.path.dirname(__file__), 'data', 'map.json')
-    warehouse = Warehouse.load_from_json(map_path)
-    logger.info("Warehouse loaded successfully from map.json")
-except Exception as e:
-    logger.error(f"Failed to load warehouse: {str(e)}")
-    raise
+data_dir = os.path.join(os.path.dirname(__file__), 'data')
+map_path = os.path.join(data_dir, 'map.json')
+lookup_path = os.path.join(data_dir, 'lookup_table.json')
+MAINTENANCE_LOCK = "maintenance"
 
-# Initialize the Mixer with the warehouse
-mixer = Mixer(warehouse=warehouse)
-logger.info("Mixer initialized successfully")
+# Name of the shared memory segment holding node locks, agents and task queues; set it when
+# running several worker processes so they all serve the same fleet
+FLEET_SHM_NAME = os.environ.get('FLEET_SHM_NAME')
 
-# Create some example agents
+# Agent history older than the in-memory trajectory depth is appended here
+trajectory_archive = TrajectoryArchive(os.path.join(data_dir, 'logs', 'trajectories.bin'))
+
+def close_trajectories():
+    """Spills the history each agent still buffers, then flushes and closes the trajectory archive."""
+    for agent in list(agents.values()):
+        agent.path.flush()
+    trajectory_archive.close()
+
+atexit.register(close_trajectories)
+
+# Serializes layout reloads; agents keep moving while one is applied
+reload_lock = threading.Lock()
+
+# Seconds between dispatch rounds matching idle agents to waiting tasks (0 disables them)
+DISPATCH_INTERVAL = float(os.environ.get('DISPATCH_INTERVAL', '1.0'))
+
+# Sliding-window node reservations used while executing paths
+reservations = ReservationManager(min_window=2, max_window=8)
+
+# Built by the warm-up thread below; requests other than / and /ready get a 503 until then.
+# route_cache holds alternative routes used to recover when a node on a path gets locked, and
+# distance_fields are repaired incrementally when nodes are locked for maintenance.
+warehouse: Optional[Warehouse] = None
+mixer: Optional[Mixer] = None
+route_cache: Optional[RouteCache] = None
+distance_fields: Optional[DistanceFieldCache] = None
+dispatcher: Optional[Dispatcher] = None
+fleet: Optional[SharedFleetState] = None
 agents: Dict[int, Agent] = {}
 
-def create_initial_agents():
+def load_warehouse(progress):
+    """Loads the warehouse from the compiled map (recompiling it if map.json changed)."""
+    global warehouse
+    warehouse = Warehouse.load(map_path, lookup_path)
+    logger.info(f"Warehouse loaded from {warehouse.artifact.path}")
+
+def attach_fleet_state(progress):
+    """Moves node locks into the shared fleet state when FLEET_SHM_NAME is set."""
+    global fleet
+    if not FLEET_SHM_NAME:
+        return
+    store = warehouse.get_store()
+    shared = SharedFleetState.open(FLEET_SHM_NAME, node_capacity=len(store))
+    shared.bind(store, default_lock_manager)
+    fleet = shared
+    logger.info(f"Sharing fleet state in {FLEET_SHM_NAME} ({'created' if shared.created else 'attached'})")
+
+def init_mixer(progress):
+    """Initializes the Mixer with the warehouse."""
+    global mixer
+    mixer = Mixer(warehouse=warehouse, fleet=fleet)
+    logger.info("Mixer initialized successfully")
+
+def build_indexes(progress):
+    """Builds the indexed graph and its reverse, used by the planners and distance fields."""
+    warehouse.get_graph().reverse()
+
+def build_path_caches(progress):
+    """Creates the route cache and precomputes a distance field towards every rack side."""
+    global route_cache, distance_fields
+    graph = warehouse.get_graph()
+    route_cache = RouteCache(graph, k=4, max_pairs=512)
+    fields = DistanceFieldCache(graph)
+    targets = [access[0] for access in warehouse.access_nodes.values() if access]
+    for done, target in enumerate(targets, 1):
+        fields.field(target)
+        progress(done / len(targets))
+    distance_fields = fields
+
+def starting_node(agent_id: int, name: str):
+    """Node an agent starts on: where it is in the shared fleet state if another worker
+    already created it, otherwise the named node."""
+    index = fleet.node_of(agent_id) if fleet is not None else None
+    if index is not None and index >= 0:
+        return warehouse.get_store().node(index)
+    return warehouse.get_node_by_name(name)
+
+def share_agent(agent: Agent) -> None:
+    """Registers an agent in the shared fleet state, or catches up with its shared row."""
+    if fleet is None or fleet.register(agent):
+        return
+    created_at = agent.node
+    fleet.refresh(agent, wait=True)
+    if agent.node is not created_at:
+        # Another worker moved the agent between starting_node and register
+        default_lock_manager.release(created_at, agent)
+
+def agent_session(agent: Agent):
+    """Holds an agent against other workers while it moves (a no-op without shared state)."""
+    return fleet.session(agent) if fleet is not None else nullcontext()
+
+def create_initial_agents(progress=None):
     """Creates some example agents in the warehouse."""
     try:
         # Create a picker agent at A1
-        start_node = warehouse.get_node_by_name("A1")
+        start_node = starting_node(1, "A1")
         if start_node:
             agent1 = Agent(
                 agent_id=1,
@@ -57,13 +158,15 @@ def create_initial_agents():
                 weight=1.0,
                 status=AgentStatus.IDLE,
                 mixer=mixer,
-                agent_type=AgentType.PICKER
+                agent_type=AgentType.PICKER,
+                archive=trajectory_archive
             )
             agents[1] = agent1
+            share_agent(agent1)
             logger.info(f"Created picker agent at A1: {agent1}")
         
         # Create a transporter agent at E5
-        end_node = warehouse.get_node_by_name("E5")
+        end_node = starting_node(2, "E5")
         if end_node:
             agent2 = Agent(
                 agent_id=2,
@@ -71,16 +174,41 @@ def create_initial_agents():
                 weight=1.5,
                 status=AgentStatus.IDLE,
                 mixer=mixer,
-                agent_type=AgentType.TRANSPORTER
+                agent_type=AgentType.TRANSPORTER,
+                archive=trajectory_archive
             )
             agents[2] = agent2
+            share_agent(agent2)
             logger.info(f"Created transporter agent at E5: {agent2}")
     except Exception as e:
         logger.error(f"Failed to create agents: {str(e)}")
         raise
 
-# Initialize agents
-create_initial_agents()
+def start_dispatcher(progress):
+    """Starts the periodic dispatch rounds (tasks queued in shared fleet state are not dispatched)."""
+    global dispatcher
+    dispatcher = Dispatcher(distance_fields, mixer.scheduler, mixer.task_table, access_nodes=warehouse.access_nodes,
+                            on_fail=mixer.fail_task)
+    if DISPATCH_INTERVAL > 0 and fleet is None:
+        dispatcher.start(lambda: list(agents.values()), DISPATCH_INTERVAL, guard=reload_lock)
+
+warmup = Warmup([
+    ("map", load_warehouse),
+    ("fleet", attach_fleet_state),
+    ("mixer", init_mixer),
+    ("indexes", build_indexes),
+    ("path_caches", build_path_caches),
+    ("agents", create_initial_agents),
+    ("dispatcher", start_dispatcher),
+])
+warmup.start()
+
+@app.before_request
+def require_warm():
+    """Answers 503 for everything but the health and readiness checks until warm-up is done."""
+    if request.endpoint in ('home', 'ready') or warmup.ready:
+        return None
+    return jsonify({"error": "Service is warming up", "warmup": warmup.snapshot()}), 503
 
 @app.route('/')
 def home():
@@ -88,16 +216,26 @@ def home():
     return jsonify({
         "message": "Warehouse Optimization API is running!",
         "agents": len(agents),
-        "nodes": len(warehouse.nodes),
-        "status": "healthy"
+        "nodes": len(warehouse.nodes) if warehouse is not None else 0,
+        "status": "healthy" if warmup.ready else "warming_up",
+        "warmup_progress": round(warmup.progress(), 3)
     })
 
+@app.route('/ready')
+def ready():
+    """Readiness check: 200 once the warm-up has built every hot structure, 503 before that."""
+    snapshot = warmup.snapshot()
+    return jsonify(snapshot), 200 if snapshot["ready"] else 503
+
 @app.route('/agents', methods=['GET'])
 def list_agents():
     """Lists all agents and their current positions."""
     try:
         agent_info = []
         for agent in agents.values():
+            if fleet is not None:
+                # An agent being moved right now keeps its last known state instead of a torn row
+                fleet.refresh(agent)
             agent_info.append({
                 "id": agent.agent_id,
                 "type": agent.agent_type.name,
@@ -112,7 +250,12 @@ def list_agents():
 
 @app.route('/move_agent', methods=['POST'])
 def move_agent():
-    """Moves an agent to a target node using A* pathfinding with heuristics."""
+    """Moves an agent to a target node using A* pathfinding with heuristics.
+
+    The optional 'cost_model' field selects the planner: 'distance' (default) minimises the path
+    length over the graph's edge weights, 'travel_time' minimises the estimated driving time
+    using the agent's kinematics.
+    """
     try:
         data = request.get_json()
         if not data:
@@ -120,12 +263,16 @@ def move_agent():
             
         agent_id = data.get('agent_id')
         target_node_name = data.get('target_node')
+        cost_model = data.get('cost_model', 'distance')
         
         if not isinstance(agent_id, int):
             return jsonify({"error": "agent_id must be an integer"}), 400
             
         if not isinstance(target_node_name, str):
             return jsonify({"error": "target_node must be a string"}), 400
+
+        if cost_model not in ('distance', 'travel_time'):
+            return jsonify({"error": "cost_model must be 'distance' or 'travel_time'"}), 400
             
         agent = agents.get(agent_id)
         if not agent:
@@ -136,46 +283,270 @@ def move_agent():
             return jsonify({"error": f"Node {target_node_name} not found"}), 404
             
         # Check if target node is a rack center
-        if target_node.type == NodeType.CENTER:
+        if target_node.node_type == NodeType.CENTER:
             return jsonify({"error": "Cannot move to a rack position"}), 400
         
-        # Calculate heuristics for the agent type
-        heuristics = warehouse.calculate_heuristics(target_node, agent.agent_type)
+        # Hold the agent so no other worker moves it meanwhile, nor a deadlock resolution on
+        # another request's thread (those only back off agents whose motion lock is free)
+        with agent_session(agent), agent.motion_lock:
+            graph = warehouse.get_graph()
+            if cost_model == 'travel_time':
+                # Search over (node, heading) states with the agent's turn and stop penalties
+                search = find_path(graph, agent.node, target_node, 'travel_time', profile=agent.kinematics)
+                path = graph.to_nodes(search.indices)
+                estimated_time = search.cost
+            else:
+                # Calculate heuristics for the agent type
+                heuristics = warehouse.calculate_heuristics(target_node, agent.agent_type)
+
+                # Find path using A* with heuristics
+                search = find_path(graph, agent.node, target_node, 'astar', heuristic=heuristics)
+                path = graph.to_nodes(search.indices)
+                estimated_time = estimate_travel_time(path, agent.kinematics)
+
+            if not search.found:
+                return jsonify({"error": f"No path found to node {target_node_name}"}), 409
+
+            # Alternatives for recovery are keyed by the planned pair, computed in the background
+            origin = agent.node
+            route_cache.prefetch(origin, target_node)
         
-        # Find path using A* with heuristics
-        path = find_path(agent.node, target_node, heuristics)
+            # Move agent along path, holding a window of reserved nodes ahead of it
+            moves = []
+            remaining = path[1:]  # Skip first node (current position)
+            reroutes = 0
+            with agent.recording_trajectory():  # One trajectory event for the whole route
+                while remaining:
+                    result = reservations.execute(agent, remaining)
+                    moves.extend({"x": node.x, "y": node.y, "name": node.name} for node in result.moves)
+                    if result.success:
+                        break
+                    # Switch to a free precomputed alternative through the agent's position. Nodes
+                    # removed by a layout reload cannot be reserved, so a path running into one
+                    # ends up here too and is replanned on the current layout.
+                    with reload_lock:
+                        try:
+                            alternative = route_cache.reroute(origin, target_node, agent.node, agent)
+                        except ValueError:  # The target or the origin was removed
+                            alternative = None
+                        if alternative is not None:
+                            alternative = route_cache.graph.to_nodes(alternative[1:])
+                    if alternative is None or reroutes >= route_cache.k:
+                        return jsonify({
+                            "error": "Movement failed",
+                            "reason": f"Could not reserve node {result.blocked_node.name}",
+                            "partial_path": moves,
+                            "reroutes": reroutes
+                        }), 409
+                    reroutes += 1
+                    remaining = alternative
         
-        # Move agent along path
-        moves = []
-        for next_node in path[1:]:  # Skip first node (current position)
-            success = agent.move(next_node)
-            if not success:
-                return jsonify({
-                    "error": "Movement failed",
-                    "reason": f"Could not move to node {next_node.name}",
-                    "partial_path": moves
-                }), 409
-            moves.append({
-                "x": next_node.x,
-                "y": next_node.y,
-                "name": next_node.name
+            return jsonify({
+                "success": True,
+                "agent_id": agent_id,
+                "path": moves,
+                "cost_model": cost_model,
+                "estimated_time": estimated_time,
+                "reroutes": reroutes,
+                "search": {
+                    "algorithm": search.algorithm,
+                    "nodes_expanded": search.nodes_expanded,
+                    "heap_pushes": search.heap_pushes,
+                    "elapsed": search.elapsed
+                },
+                "final_position": {
+                    "x": agent.node.x,
+                    "y": agent.node.y,
+                    "name": agent.node.name
+                }
             })
         
+    except Exception as e:
+        logger.error(f"Error in move_agent: {str(e)}\n{traceback.format_exc()}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/reservations/stats', methods=['GET'])
+def reservation_stats():
+    """Returns contention statistics of the path reservation windows."""
+    return jsonify(reservations.snapshot())
+
+@app.route('/fleet', methods=['GET'])
+def fleet_state():
+    """Returns the shared fleet state seen by every worker."""
+    if fleet is None:
+        return jsonify({"error": "No shared fleet state; set FLEET_SHM_NAME to enable it"}), 404
+    return jsonify(fleet.snapshot())
+
+@app.route('/locks/stats', methods=['GET'])
+def lock_stats():
+    """Returns node lock counters and the most contended nodes."""
+    top = request.args.get('top', default=10, type=int)
+    return jsonify(default_lock_manager.stats.to_dict(top))
+
+@app.route('/deadlocks', methods=['GET'])
+def deadlocks():
+    """Returns the wait-for graph (which blocked agent waits for which) and deadlock counters."""
+    return jsonify({**mixer.wait_for.snapshot(), "stats": dict(mixer.deadlock_stats)})
+
+@app.route('/deadlocks/resolve', methods=['POST'])
+def resolve_deadlocks():
+    """Sweeps the wait-for graph for deadlock cycles and resolves them."""
+    try:
+        found = mixer.detect_and_resolve_deadlock()
+        return jsonify({"found": found, "stats": dict(mixer.deadlock_stats)})
+    except Exception as e:
+        logger.error(f"Error in resolve_deadlocks: {str(e)}\n{traceback.format_exc()}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/tasks/queue', methods=['GET'])
+def task_queue():
+    """Returns the task scheduler counters, the waiting tasks per priority level and the
+    number of tasks blocked on dependencies."""
+    if fleet is not None:
+        return jsonify({"shared": True, "queues": fleet.queue_lengths()})
+    return jsonify({**mixer.scheduler.snapshot(), "graph": mixer.task_graph.snapshot()})
+
+@app.route('/dispatch', methods=['POST'])
+def dispatch_tasks():
+    """Runs a dispatch round now and returns the assignments it made."""
+    try:
+        if fleet is not None:
+            return jsonify({"error": "Tasks are queued in shared fleet state"}), 409
+        with reload_lock:
+            assignments = dispatcher.dispatch(list(agents.values()))
         return jsonify({
-            "success": True,
-            "agent_id": agent_id,
-            "path": moves,
-            "final_position": {
-                "x": agent.node.x,
-                "y": agent.node.y,
-                "name": agent.node.name
-            }
+            "assignments": [{
+                "agent_id": a.agent.agent_id,
+                "task_id": a.task.task_id,
+                "goal": a.task.task.goal_state,
+                "distance": a.distance
+            } for a in assignments],
+            "stats": dispatcher.stats.to_dict()
         })
-        
     except Exception as e:
-        logger.error(f"Error in move_agent: {str(e)}\n{traceback.format_exc()}")
+        logger.error(f"Error in dispatch_tasks: {str(e)}\n{traceback.format_exc()}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/dispatch/stats', methods=['GET'])
+def dispatch_stats():
+    """Returns the dispatch round counters (assignments, empty travel, ...)."""
+    return jsonify(dispatcher.stats.to_dict())
+
+@app.route('/tasks', methods=['GET'])
+def list_tasks():
+    """Returns recorded tasks filtered by status, agent_id or rack (one of them is required).
+
+    Query parameters: status (PENDING, IN_PROGRESS, COMPLETED or FAILED), agent_id, rack, limit.
+    """
+    try:
+        status = request.args.get('status')
+        agent_id = request.args.get('agent_id', type=int)
+        rack = request.args.get('rack')
+        limit = request.args.get('limit', default=100, type=int)
+        if limit <= 0:
+            return jsonify({"error": "limit must be positive"}), 400
+        try:
+            status = TaskStatus[status.upper()] if status else None
+        except KeyError:
+            return jsonify({"error": f"Unknown status {status}"}), 400
+
+        table = mixer.task_table
+        if agent_id is not None:
+            records = table.by_agent(agent_id, status, limit)
+        elif rack:
+            records = table.by_rack(rack, status, limit)
+        elif status is not None:
+            records = table.by_status(status, limit)
+        else:
+            return jsonify({"error": "Filter by status, agent_id or rack"}), 400
+        return jsonify({"tasks": [record.to_dict() for record in records], "counts": table.counts()})
+    except Exception as e:
+        logger.error(f"Error in list_tasks: {str(e)}\n{traceback.format_exc()}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/tasks/counts', methods=['GET'])
+def task_counts():
+    """Returns the number of recorded tasks per status."""
+    return jsonify(mixer.task_table.counts())
+
+@app.route('/tasks/<task_id>/retry', methods=['POST'])
+def retry_task(task_id):
+    """Schedules a failed task again."""
+    try:
+        if not mixer.retry_task(task_id):
+            return jsonify({"error": f"Task {task_id} has not failed"}), 409
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 409
+    return jsonify({"success": True, "task": mixer.task_table.get(task_id).to_dict()})
+
+@app.route('/tasks/<task_id>', methods=['PATCH', 'DELETE'])
+def update_task(task_id):
+    """Cancels a waiting task (DELETE) or changes its priority and deadline (PATCH).
+
+    The PATCH body holds 'priority' and optionally 'deadline' (unix time).
+    """
+    try:
+        if fleet is not None:
+            return jsonify({"error": "Tasks are queued in shared fleet state"}), 409
+        if request.method == 'DELETE':
+            if not mixer.cancel_task(task_id):
+                return jsonify({"error": f"Task {task_id} is not waiting"}), 404
+            return jsonify({"success": True, "task_id": task_id})
+
+        data = request.get_json(silent=True) or {}
+        priority = data.get('priority')
+        if not isinstance(priority, int) or priority < 0:
+            return jsonify({"error": "priority must be a non-negative integer"}), 400
+        deadline = data.get('deadline')
+        if deadline is not None and not isinstance(deadline, (int, float)):
+            return jsonify({"error": "deadline must be a unix time"}), 400
+        if not mixer.reprioritize_task(task_id, priority, deadline):
+            return jsonify({"error": f"Task {task_id} is not waiting"}), 404
+        return jsonify({"success": True, "task_id": task_id, "priority": priority})
+    except Exception as e:
+        logger.error(f"Error updating task: {str(e)}\n{traceback.format_exc()}")
         return jsonify({"error": str(e)}), 500
 
+@app.route('/logs', methods=['GET'])
+def get_logs():
+    """Returns saved event logs, newest first unless order=asc.
+
+    Query parameters: type, agent_id, task_id, since and until (ISO timestamps), limit (at most
+    MAX_PAGE), offset and order ('asc' or 'desc').
+    """
+    try:
+        limit = request.args.get('limit', default=100, type=int)
+        offset = request.args.get('offset', default=0, type=int)
+        order = request.args.get('order', 'desc')
+        if not 0 < limit <= MAX_PAGE:
+            return jsonify({"error": f"limit must be between 1 and {MAX_PAGE}"}), 400
+        if offset < 0:
+            return jsonify({"error": "offset cannot be negative"}), 400
+        if order not in ('asc', 'desc'):
+            return jsonify({"error": "order must be 'asc' or 'desc'"}), 400
+
+        try:
+            logs = mixer.get_logs(event_type=request.args.get('type'), agent_id=request.args.get('agent_id'),
+                                  task_id=request.args.get('task_id'), since=request.args.get('since'),
+                                  until=request.args.get('until'), limit=limit, offset=offset,
+                                  newest_first=order == 'desc')
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        return jsonify({
+            "logs": logs,
+            "offset": offset,
+            "next_offset": offset + limit if len(logs) == limit else None
+        })
+    except Exception as e:
+        logger.error(f"Error in get_logs: {str(e)}\n{traceback.format_exc()}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/logs/stats', methods=['GET'])
+def log_stats():
+    """Returns the event log pipeline counters (queue depth, dropped events, ...)."""
+    return jsonify({**mixer.log_pipeline.stats.to_dict(), "sampled_out": mixer.sampled_out()})
+
 @app.route('/warehouse/map', methods=['GET'])
 def get_warehouse_map():
     """Returns the warehouse map layout."""
@@ -213,5 +584,84 @@ def get_warehouse_map():
         logger.error(f"Error in get_warehouse_map: {str(e)}\n{traceback.format_exc()}")
         return jsonify({"error": str(e)}), 500
 
+@app.route('/warehouse/lock', methods=['POST'])
+def set_maintenance_lock():
+    """Locks or unlocks nodes for maintenance and repairs the cached distance fields."""
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({"error": "No data provided"}), 400
+
+        names = data.get('nodes')
+        locked = data.get('locked', True)
+
+        if not isinstance(names, list) or not all(isinstance(name, str) for name in names):
+            return jsonify({"error": "nodes must be a list of node names"}), 400
+
+        if not isinstance(locked, bool):
+            return jsonify({"error": "locked must be a boolean"}), 400
+
+        missing = [name for name in names if warehouse.get_node_by_name(name) is None]
+        if missing:
+            return jsonify({"error": f"Nodes not found: {', '.join(missing)}"}), 404
+
+        # Only nodes whose lock state actually changed (or already matched) reach the distance fields
+        changed, failed = [], []
+        for name in names:
+            node = warehouse.get_node_by_name(name)
+            if locked:
+                ok = node.lock(MAINTENANCE_LOCK) or node.locked_by == MAINTENANCE_LOCK
+            else:
+                ok = node.unlock(MAINTENANCE_LOCK) or not node.locked
+            (changed if ok else failed).append(name)
+
+        updates = distance_fields.set_locked(changed, locked)
+
+        response = {
+            "success": not failed,
+            "locked": locked,
+            "nodes": changed,
+            "failed": failed,
+            "repairs": {source: {**asdict(stats), "touched": stats.touched} for source, stats in updates.items()},
+            "totals": {**asdict(distance_fields.totals), "touched": distance_fields.totals.touched}
+        }
+        if failed:
+            action = "lock" if locked else "unlock"
+            return jsonify({"error": f"Could not {action} nodes held by agents: {', '.join(failed)}", **response}), 409
+        return jsonify(response)
+    except Exception as e:
+        logger.error(f"Error in set_maintenance_lock: {str(e)}\n{traceback.format_exc()}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/warehouse/reload', methods=['POST'])
+def reload_warehouse_layout():
+    """Re-reads map.json and applies only the changed nodes, edges and racks to the running warehouse."""
+    try:
+        data = request.get_json(silent=True) or {}
+        dry_run = data.get('dry_run', False)
+        if not isinstance(dry_run, bool):
+            return jsonify({"error": "dry_run must be a boolean"}), 400
+
+        if fleet is not None:
+            # Node indices must match in every worker sharing the fleet state
+            return jsonify({"error": "Layout reloads are not supported with a shared fleet state; restart the workers"}), 409
+
+        with reload_lock:
+            try:
+                result = reload_layout(warehouse, map_path, lookup_path, agents=list(agents.values()),
+                                       route_cache=route_cache, distance_fields=distance_fields,
+                                       dry_run=dry_run)
+            except MapValidationError as e:
+                return jsonify({"error": "Map validation failed", "report": e.report.to_dict()}), 400
+
+        if result.conflicts and not dry_run:
+            return jsonify({"error": "Layout change conflicts with running agents", **result.to_dict()}), 409
+        if result.applied:
+            logger.info(f"Layout reloaded: {result.diff.counts()}, {result.routes_dropped} route pair(s) dropped")
+        return jsonify({"success": True, **result.to_dict()})
+    except Exception as e:
+        logger.error(f"Error in reload_warehouse_layout: {str(e)}\n{traceback.format_exc()}")
+        return jsonify({"error": str(e)}), 500
+
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5000)
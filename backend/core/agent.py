@@ -1,9 +1,15 @@
 from typing import List, Optional
+from contextlib import contextmanager
 from dataclasses import dataclass, field
+import threading
+import time
 import uuid
 from core.types import AgentStatus, AgentType, IMixer, IAgent
 from core.node import Node
 from core.task import Task
+from core.kinematics import KinematicProfile, default_profile
+from core.trajectory import DEFAULT_DEPTH, Trajectory, TrajectoryArchive
+from core.lock_manager import LockManager, default_lock_manager
 
 @dataclass
 class Agent(IAgent):
@@ -16,9 +22,20 @@ class Agent(IAgent):
         status (AgentStatus): Current status of the agent
         goal_state (str): Target state/location for the agent
         mixer (Optional[IMixer]): Reference to the global mixer instance
-        path (List[Node]): Current planned path
+        path (Trajectory): Most recent nodes visited, current node last
         battery (float): Current battery level (0-100)
         agent_type (AgentType): Type of agent
+        kinematics (Optional[KinematicProfile]): Motion limits, defaults to the profile of agent_type
+        history_depth (int): Number of visited nodes kept in memory
+        archive (Optional[TrajectoryArchive]): Where older history goes; without one it is
+            logged through the mixer, or dropped if there is no mixer
+        lock_manager (Optional[LockManager]): Serializes node locking, defaults to the shared manager
+        blocked_on (Optional[Node]): Node the last move failed to take, until the agent moves again
+        motion_lock (threading.RLock): Held by whoever moves the agent along a path; deadlock
+            resolution only backs the agent off if it can take this lock
+        
+    While a trajectory is being recorded (see `recording_trajectory`) hops are not logged one by
+    one; the whole path is logged as a single 'trajectory' event when the recording ends.
     """
     agent_id: int
     node: Node
@@ -26,55 +43,88 @@ class Agent(IAgent):
     status: AgentStatus = AgentStatus.IDLE
     goal_state: str = ""
     mixer: Optional[IMixer] = None
-    path: List[Node] = field(default_factory=list)
+    path: Trajectory = None  # Built in __post_init__
     battery: float = 100.0
     agent_type: AgentType = AgentType.PICKER
     hash_id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    kinematics: Optional[KinematicProfile] = None
+    history_depth: int = DEFAULT_DEPTH
+    archive: Optional[TrajectoryArchive] = field(default=None, repr=False, compare=False)
+    lock_manager: Optional[LockManager] = field(default=None, repr=False, compare=False)
+    _recording: Optional[dict] = field(default=None, init=False, repr=False, compare=False)
+    blocked_on: Optional[Node] = field(default=None, init=False, repr=False, compare=False)
+    motion_lock: threading.RLock = field(default_factory=threading.RLock, init=False, repr=False, compare=False)
 
     def __post_init__(self):
         """Initializes an Agent with its node and registers with the mixer."""
         if not self.node:
             raise ValueError("Agent must be initialized with a valid node")
+
+        if self.kinematics is None:
+            self.kinematics = default_profile(self.agent_type)
+        if self.lock_manager is None:
+            self.lock_manager = default_lock_manager
             
-        # Add initial node to path
+        # Add initial node to path, keeping any history passed in
+        previous = list(self.path or [])
+        self.path = Trajectory(self.history_depth, spill=self._spill_history)
+        for node in previous:
+            self.path.append(node)
         self.path.append(self.node)
-        if not self.node.lock(self):
+        if not self.lock_manager.try_acquire(self.node, self):
             raise RuntimeError(f"Failed to lock initial node {self.node}")
             
         # Register with the global Mixer if available
         if self.mixer:
             self.mixer.log_event('agent_creation', f"Agent {self.agent_id} created at {self.node}", self)
 
-    def move(self, new_node: Node) -> bool:
-        """Moves the agent to a new node and logs the action."""
+    def _spill_history(self, first: int, nodes: List[Node]) -> None:
+        """Sends history evicted from the in-memory trajectory to the archive or the event log."""
+        if self.archive is not None:
+            self.archive.spill(self.agent_id, first, nodes)
+        elif self.mixer:
+            self.mixer.log_event('trajectory_spill', f"Steps {first}-{first + len(nodes) - 1}: {' '.join(node.name for node in nodes)}", self)
+
+    def move(self, new_node: Node, timeout: float = 0.0) -> bool:
+        """Moves the agent to a new node and logs the action.
+
+        Args:
+            new_node (Node): Node to move to
+            timeout (float): Seconds to wait for the node if another agent holds it
+
+        Returns:
+            bool: True if the agent moved, False otherwise
+        """
         if not new_node:
             if self.mixer:
                 self.mixer.log_event('movement_failed', "Cannot move to None node", self)
             return False
             
-        # Try to lock the new node
-        if not new_node.lock(self):
+        # Lock the new node (it may already be reserved by this agent), then unlock the current one
+        if not self.lock_manager.move(self, self.node, new_node, timeout):
             if self.mixer:
                 self.mixer.log_event('movement_failed', f"Failed to move to {new_node} - node locked", self)
+            self.block(new_node)
             return False
-            
-        # Unlock the current node
-        self.node.unlock(self)
         
         # Update node and path
         self.node = new_node
         self.path.append(new_node)
+        self.unblock()
         
-        # Log the movement if mixer is available
-        if self.mixer:
+        # Record the hop, or log it if no trajectory is being recorded
+        if self._recording is not None:
+            self._record_hop(new_node)
+        elif self.mixer:
             self.mixer.log_event('movement', f"Moved to {new_node}", self)
         return True
 
-    def backtrack(self, steps: int = 1) -> bool:
+    def backtrack(self, steps: int = 1, timeout: float = 0.0) -> bool:
         """Moves the agent back along its path history.
         
         Args:
             steps (int): Number of steps to backtrack
+            timeout (float): Seconds to wait for the target node if another agent holds it
             
         Returns:
             bool: True if backtrack was successful, False otherwise
@@ -92,24 +142,71 @@ class Agent(IAgent):
         # Get the target node to backtrack to
         target_node = self.path[-steps-1]
         
-        # Try to lock the target node
-        if not target_node.lock(self):
+        # Lock the target node, then unlock the current one
+        if not self.lock_manager.move(self, self.node, target_node, timeout):
             if self.mixer:
                 self.mixer.log_event('backtrack_failed', f"Failed to backtrack to {target_node} - node locked", self)
+            self.block(target_node)
             return False
-            
-        # Unlock the current node
-        self.node.unlock(self)
         
         # Update node and path history
         self.node = target_node
-        self.path = self.path[:-steps]
+        self.path.drop_last(steps)
+        self.unblock()
         
-        # Log the backtrack if mixer is available
+        # Log the backtrack if mixer is available (always, even inside a recorded trajectory)
+        if self._recording is not None:
+            self._record_hop(target_node)
         if self.mixer:
             self.mixer.log_event('backtrack', f"Backtracked {steps} steps to {target_node}", self)
         return True
 
+    def block(self, node: Node) -> None:
+        """Records that the agent waits for a locked node (the mixer checks for deadlocks)."""
+        self.blocked_on = node
+        if self.mixer:
+            self.mixer.agent_blocked(self, node)
+
+    def unblock(self) -> None:
+        """Records that the agent moved again, so it no longer waits for a node."""
+        if self.blocked_on is not None:
+            self.blocked_on = None
+            if self.mixer:
+                self.mixer.agent_unblocked(self)
+
+    def release_reservations(self) -> int:
+        """Releases every node the agent holds except the one it stands on (e.g. the window
+        reserved ahead of it before it backed off) and returns how many there were."""
+        store = self.node.store
+        return sum(self.lock_manager.release(store.node(i), self)
+                   for i in store.held_by(self).tolist() if i != self.node.index)
+
+    @contextmanager
+    def recording_trajectory(self, task: Optional[Task] = None):
+        """Coalesces the moves made inside the block into one 'trajectory' event.
+
+        The event carries the node indices visited (the starting node first) and the offset of
+        each hop from the start in microseconds. Nested blocks join the outermost recording.
+
+        Args:
+            task (Task, optional): Task the trajectory is executed for
+        """
+        if self._recording is not None:
+            yield
+            return
+        self._recording = {'nodes': [self.node], 'offsets': [0], 'start': time.perf_counter_ns()}
+        try:
+            yield
+        finally:
+            recording, self._recording = self._recording, None
+            if self.mixer and len(recording['nodes']) > 1:
+                self.mixer.log_trajectory(self, recording['nodes'], recording['offsets'], task)
+
+    def _record_hop(self, node: Node) -> None:
+        recording = self._recording
+        recording['nodes'].append(node)
+        recording['offsets'].append((time.perf_counter_ns() - recording['start']) // 1000)
+
     def set_goal(self, goal: str) -> None:
         """Sets a new goal state for the agent."""
         if not goal:
@@ -128,7 +225,9 @@ class Agent(IAgent):
         if not task:
             raise ValueError("Task cannot be None")
             
+        self.status = AgentStatus.IDLE  # Ready to be dispatched again
         if self.mixer:
+            self.mixer.complete_task(task)
             self.mixer.log_event('task_completion', f"Completed task: {task.job} to goal {task.goal_state}", self, task)
 
     def get_last_node(self) -> Optional[Node]:
@@ -140,10 +239,8 @@ class Agent(IAgent):
         return self.path[-1] if self.path else None
 
     def clear_path_history(self) -> None:
-        """Clears the path history, keeping only the current node."""
-        if self.path:
-            current_node = self.path[-1]
-            self.path = [current_node]
+        """Clears the path history, keeping only the current node (older nodes are spilled)."""
+        self.path.clear(keep_last=True)
             
     def update_battery(self, level: float) -> None:
         """Updates the agent's battery level.
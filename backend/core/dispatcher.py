@@ -0,0 +1,316 @@
+""" Batch dispatch of waiting tasks to idle agents.
+    Instead of handing the next task to whichever agent asks, a dispatch round collects the idle
+    agents and the tasks at the head of the scheduler, builds a cost matrix of graph distances
+    from each agent to each task's goal node, and solves the assignment problem (Hungarian
+    algorithm) so the total empty travel is minimal. A goal naming a rack or rack side costs
+    the distance to its nearest access node. Agents not allowed to perform a task type get an
+    infinite cost; with more tasks than agents (or the reverse) the surplus waits for the next
+    round. Tasks whose goal cannot be resolved are failed instead of being kept in the pool,
+    and tasks no idle agent can take (not eligible, or cut off) are passed over this round,
+    so they do not starve the tasks behind them.
+"""
+
+import logging
+import threading
+import time
+import traceback
+from contextlib import nullcontext
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from core.distance_field import DistanceFieldCache
+from core.scheduler import ScheduledTask, TaskScheduler
+from core.task_table import TaskTable
+from core.types import AgentStatus, AgentType, TaskType
+
+INF = float('inf')
+
+logger = logging.getLogger(__name__)
+
+# Agent types allowed to perform each task type
+DEFAULT_ELIGIBILITY: Dict[TaskType, FrozenSet[AgentType]] = {
+    TaskType.PICK: frozenset({AgentType.PICKER}),
+    TaskType.PLACE: frozenset({AgentType.PICKER}),
+    TaskType.MOVE: frozenset({AgentType.PICKER, AgentType.TRANSPORTER}),
+    TaskType.CHARGE: frozenset({AgentType.PICKER, AgentType.TRANSPORTER}),
+}
+
+
+def solve_assignment(cost) -> List[Tuple[int, int]]:
+    """Solves the rectangular assignment problem (Hungarian algorithm, O(n^2 m)).
+
+    Infinite entries mark forbidden pairs. As many rows as possible are matched, at the lowest
+    total cost among the largest matchings.
+
+    Args:
+        cost (array-like): n x m matrix of pair costs
+
+    Returns:
+        List[Tuple[int, int]]: Matched (row, column) pairs, in row order
+    """
+    cost = np.asarray(cost, dtype=float)
+    n, m = cost.shape
+    if n == 0 or m == 0:
+        return []
+    if n > m:
+        return sorted((i, j) for j, i in solve_assignment(cost.T))
+
+    allowed = np.isfinite(cost)
+    if not allowed.any():
+        return []
+    low, high = cost[allowed].min(), cost[allowed].max()
+    # Worse than any combination of allowed pairs, so forbidden ones are used only as filler
+    forbidden = high + (high - low + 1.0) * (n + 1)
+    c = np.where(allowed, cost, forbidden)
+
+    # Shortest augmenting paths with potentials; index 0 is a sentinel column
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    match = np.zeros(m + 1, dtype=np.int64)  # Row (1-based) matched to each column, 0 if none
+    way = np.zeros(m + 1, dtype=np.int64)
+    for row in range(1, n + 1):
+        match[0] = row
+        column = 0
+        min_slack = np.full(m + 1, INF)
+        used = np.zeros(m + 1, dtype=bool)
+        while True:
+            used[column] = True
+            current = match[column]
+            slack = c[current - 1] - u[current] - v[1:]
+            free = ~used[1:]
+            better = free & (slack < min_slack[1:])
+            min_slack[1:][better] = slack[better]
+            way[1:][better] = column
+            candidates = np.where(free, min_slack[1:], INF)
+            next_column = int(np.argmin(candidates)) + 1
+            delta = candidates[next_column - 1]
+            u[match[used]] += delta
+            v[used] -= delta
+            min_slack[1:][free] -= delta
+            column = next_column
+            if match[column] == 0:
+                break
+        while column:
+            previous = way[column]
+            match[column] = match[previous]
+            column = previous
+
+    return sorted((int(match[j]) - 1, j - 1) for j in range(1, m + 1)
+                  if match[j] and allowed[match[j] - 1, j - 1])
+
+
+@dataclass
+class Assignment:
+    """A task given to an agent by a dispatch round.
+
+    Attributes:
+        agent (Agent): Agent the task was given to
+        task (ScheduledTask): The task, as it waited in the scheduler
+        distance (float): Graph distance from the agent to the task's goal node
+    """
+    agent: object
+    task: ScheduledTask
+    distance: float
+
+
+@dataclass
+class DispatchStats:
+    """Counters describing the dispatch rounds."""
+    rounds: int = 0
+    assigned: int = 0
+    empty_travel: float = 0.0  # Sum of agent-to-goal distances of the assignments
+    unreachable: int = 0  # Tasks failed because their goal is neither a node nor a rack (side)
+    deferred: int = 0  # Tasks passed over because no idle agent could take them
+    last_agents: int = 0
+    last_tasks: int = 0
+    last_elapsed: float = 0.0
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+class Dispatcher:
+    """Matches idle agents to waiting tasks, minimising the total distance to the goals.
+
+    Distances come from the distance field of each goal node; the warehouse graph is
+    undirected, so the field of the goal gives every agent's distance to it.
+
+    Attributes:
+        fields (DistanceFieldCache): Distance fields, one per goal node
+        scheduler (TaskScheduler): Waiting tasks
+        table (Optional[TaskTable]): Task statuses, updated when tasks are assigned or failed
+        on_fail (Optional[Callable[[str, str], None]]): Called with the id and reason of a task
+            that cannot be dispatched, instead of failing it in the table directly (e.g.
+            Mixer.fail_task, which fails its dependents too)
+        access_nodes (Dict[str, List[str]]): Access node names per rack side (e.g. "A1L")
+        eligibility (Dict[TaskType, FrozenSet[AgentType]]): Agent types allowed per task type
+        pool_factor (int): Tasks considered per idle agent, taken from the head of the scheduler
+            among those some idle agent can take
+        scan_limit (int): Most waiting tasks examined per round while filling the pool
+        rank_cost (float): Cost added per position a task sits behind the head of the queue,
+            so urgent tasks are not left for nearer but less urgent ones
+        stats (DispatchStats): Usage counters
+    """
+
+    def __init__(self, fields: DistanceFieldCache, scheduler: TaskScheduler, table: Optional[TaskTable] = None,
+                 eligibility: Optional[Dict[TaskType, FrozenSet[AgentType]]] = None,
+                 pool_factor: int = 2, rank_cost: float = 1.0,
+                 access_nodes: Optional[Dict[str, List[str]]] = None, scan_limit: int = 256,
+                 on_fail: Optional[Callable[[str, str], None]] = None):
+        if pool_factor < 1:
+            raise ValueError("pool_factor must be at least 1")
+        if scan_limit < 1:
+            raise ValueError("scan_limit must be at least 1")
+        self.fields = fields
+        self.scheduler = scheduler
+        self.table = table
+        self.on_fail = on_fail
+        self.access_nodes = access_nodes if access_nodes is not None else {}
+        self.eligibility = dict(DEFAULT_ELIGIBILITY if eligibility is None else eligibility)
+        self.pool_factor = pool_factor
+        self.scan_limit = scan_limit
+        self.rank_cost = rank_cost
+        self.stats = DispatchStats()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def goal_nodes(self, goal: str) -> List[str]:
+        """Nodes a goal can be reached at: the node itself, or the access nodes of a rack side
+        (e.g. "A1L") or of every side of a rack (e.g. "A1"). Empty if the goal is unknown."""
+        index = self.fields.graph.index
+        if goal in index:
+            return [goal]
+        sides = [goal] if goal in self.access_nodes else [side for side in self.access_nodes if side[:-1] == goal]
+        return [name for side in sides for name in self.access_nodes[side] if name in index]
+
+    def _distances(self, nodes: List[str], positions: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Distance from each position to the nearest of the nodes, and the index of that node."""
+        distances = self.fields.distances(nodes, positions)
+        return distances.min(axis=0), distances.argmin(axis=0)
+
+    def _positions(self, agents: List) -> np.ndarray:
+        return np.array([self.fields.graph.resolve(agent.node.name) for agent in agents], dtype=np.int64)
+
+    def cost_matrix(self, agents: List, tasks: List[ScheduledTask]) -> np.ndarray:
+        """Distance from each agent to each task's goal, inf where the agent is not eligible."""
+        cost = np.full((len(agents), len(tasks)), INF)
+        positions = self._positions(agents)
+        for j, entry in enumerate(tasks):
+            nodes = self.goal_nodes(entry.task.goal_state)
+            if not nodes:
+                continue
+            distances, _ = self._distances(nodes, positions)
+            allowed = self.eligibility.get(entry.task.job, frozenset())
+            eligible = np.array([agent.agent_type in allowed for agent in agents], dtype=bool)
+            cost[:, j] = np.where(eligible, distances, INF)
+        return cost
+
+    def dispatch(self, agents: Iterable) -> List[Assignment]:
+        """Runs one dispatch round: assigns waiting tasks to the idle agents.
+
+        Assigned agents get the task's goal and switch to MOVING; the task leaves the scheduler.
+
+        Args:
+            agents (Iterable[Agent]): Agents to consider; only IDLE ones are dispatched
+
+        Returns:
+            List[Assignment]: The assignments made
+        """
+        with self._lock:
+            started = time.perf_counter()
+            idle = [agent for agent in agents if agent.status == AgentStatus.IDLE]
+            tasks, cost = self._pool(idle) if idle else ([], None)
+
+            assignments = []
+            if idle and tasks:
+                ranked = cost + self.rank_cost * np.arange(len(tasks))
+                for i, j in solve_assignment(ranked):
+                    entry = self.scheduler.take(tasks[j].task_id)
+                    if entry is None:
+                        continue  # Cancelled or taken meanwhile
+                    agent = idle[i]
+                    if self.table is not None and entry.task_id in self.table:
+                        self.table.start(entry.task_id, agent.agent_id)
+                    # Rack goals send the agent to the access node nearest to it
+                    nodes = self.goal_nodes(entry.task.goal_state)
+                    _, nearest = self._distances(nodes, self._positions([agent]))
+                    agent.set_goal(nodes[int(nearest[0])])
+                    agent.status = AgentStatus.MOVING
+                    assignments.append(Assignment(agent, entry, float(cost[i, j])))
+
+            self.stats.rounds += 1
+            self.stats.assigned += len(assignments)
+            self.stats.empty_travel += sum(a.distance for a in assignments)
+            self.stats.last_agents = len(idle)
+            self.stats.last_tasks = len(tasks)
+            self.stats.last_elapsed = time.perf_counter() - started
+            return assignments
+
+    def _pool(self, idle: List) -> Tuple[List[ScheduledTask], np.ndarray]:
+        """Picks the candidate tasks of a round and their cost matrix.
+
+        Tasks are taken in scheduler order, skipping those no idle agent can take, until the
+        pool holds `pool_factor` tasks per idle agent or `scan_limit` tasks were examined.
+        """
+        want = self.pool_factor * len(idle)
+        limit = want
+        while True:
+            entries = self.scheduler.pending(limit)
+            unknown = [entry for entry in entries if not self.goal_nodes(entry.task.goal_state)]
+            if unknown:
+                # Fail them so they stop taking pool slots, then look again
+                for entry in unknown:
+                    self._fail(entry, f"Unknown goal {entry.task.goal_state}")
+                continue
+            cost = self.cost_matrix(idle, entries)
+            assignable = np.flatnonzero(np.isfinite(cost).any(axis=0))
+            if len(assignable) >= want or len(entries) < limit or limit >= self.scan_limit:
+                break
+            limit = min(2 * limit, self.scan_limit)
+        chosen = assignable[:want]
+        scanned = int(chosen[-1]) + 1 if len(chosen) == want else len(entries)
+        self.stats.deferred += scanned - len(chosen)
+        return [entries[j] for j in chosen], cost[:, chosen]
+
+    def _fail(self, entry: ScheduledTask, reason: str) -> None:
+        """Removes a task that cannot be dispatched, failing it in the task table."""
+        if self.scheduler.take(entry.task_id) is None:
+            return  # Cancelled or taken meanwhile
+        self.stats.unreachable += 1
+        if self.on_fail is not None:
+            self.on_fail(entry.task_id, reason)
+        elif self.table is not None and entry.task_id in self.table:
+            self.table.fail(entry.task_id, reason)
+
+    def start(self, agents_source, interval: float = 1.0, guard=None) -> None:
+        """Runs a dispatch round every `interval` seconds in a background thread.
+
+        Args:
+            agents_source (Callable[[], Iterable[Agent]]): Returns the agents to consider
+            interval (float): Seconds between rounds
+            guard (optional): Lock held during each round, e.g. to keep the distance fields
+                from changing under it
+        """
+        if self._thread is not None:
+            return
+        self._stop.clear()
+
+        def run():
+            while not self._stop.wait(interval):
+                try:
+                    with guard if guard is not None else nullcontext():
+                        self.dispatch(agents_source())
+                except Exception as e:
+                    logger.error(f"Dispatch round failed: {e}\n{traceback.format_exc()}")
+
+        self._thread = threading.Thread(target=run, name='dispatcher', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
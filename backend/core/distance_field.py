@@ -0,0 +1,336 @@
+""" Cached single-source distance fields with incremental repair.
+    When nodes are locked for maintenance (or unlocked again) only the part of each field whose
+    shortest-path tree is affected is recomputed, in the style of Ramalingam & Reps' dynamic
+    SSSP algorithm, instead of rebuilding every field from scratch.
+"""
+
+import heapq
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import numpy as np
+from core.graph import Graph
+
+INF = float('inf')
+
+
+@dataclass
+class RepairStats:
+    """Work done by one distance-field update.
+
+    Attributes:
+        invalidated (int): Entries whose shortest path went through a newly locked node
+        relaxed (int): Entries that received a new distance
+        heap_pops (int): Priority queue pops during the repair
+        elapsed (float): Wall-clock time of the repair in seconds
+    """
+    invalidated: int = 0
+    relaxed: int = 0
+    heap_pops: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def touched(self) -> int:
+        """Total number of entries the update had to look at."""
+        return self.invalidated + self.relaxed
+
+    def add(self, other: 'RepairStats') -> None:
+        """Accumulates another update into this one."""
+        self.invalidated += other.invalidated
+        self.relaxed += other.relaxed
+        self.heap_pops += other.heap_pops
+        self.elapsed += other.elapsed
+
+
+class DistanceField:
+    """Shortest distances from one source node to every reachable node.
+
+    Attributes:
+        source (int): Index of the node the distances are measured from
+        dist (List[float]): Distance per node index (inf if unreachable)
+        parent (List[int]): Predecessor in the shortest-path tree (-1 for none)
+    """
+
+    def __init__(self, graph: Graph, source: int, blocked: Set[int]):
+        self.graph = graph
+        self.source = source
+        self._predecessors = graph.reverse()
+        self._blocked = blocked
+        self.dist: List[float] = []
+        self.parent: List[int] = []
+        self._children: Dict[int, Set[int]] = {}
+        self.rebuild()
+
+    def distance(self, node: int) -> float:
+        """Returns the distance from the source to a node index (inf if unreachable)."""
+        return self.dist[node]
+
+    def _set(self, node: int, d: float, parent: int) -> None:
+        old_parent = self.parent[node]
+        if old_parent >= 0:
+            self._children[old_parent].discard(node)
+        self.dist[node] = d
+        self.parent[node] = parent
+        if parent >= 0:
+            self._children.setdefault(parent, set()).add(node)
+
+    def _drop(self, node: int) -> None:
+        old_parent = self.parent[node]
+        if old_parent >= 0:
+            self._children[old_parent].discard(node)
+        self.parent[node] = -1
+        self.dist[node] = INF
+
+    def _propagate(self, heap: list, stats: RepairStats) -> None:
+        """Runs Dijkstra from the seeded heap, improving entries as it goes."""
+        dist = self.dist
+        while heap:
+            d, node = heapq.heappop(heap)
+            stats.heap_pops += 1
+            if d > dist[node]:
+                continue
+            for neighbour, weight in self.graph.edges(node):
+                if neighbour in self._blocked:
+                    continue
+                new_d = d + weight
+                if new_d < dist[neighbour]:
+                    self._set(neighbour, new_d, node)
+                    stats.relaxed += 1
+                    heapq.heappush(heap, (new_d, neighbour))
+
+    def rebuild(self) -> RepairStats:
+        """Recomputes the whole field from scratch."""
+        started = time.perf_counter()
+        stats = RepairStats()
+        self.dist = [INF] * len(self.graph)
+        self.parent = [-1] * len(self.graph)
+        self._children.clear()
+        if self.source not in self._blocked:
+            self.dist[self.source] = 0.0
+            self._propagate([(0.0, self.source)], stats)
+        stats.elapsed = time.perf_counter() - started
+        return stats
+
+    def _best_predecessor(self, node: int, excluded: Set[int]):
+        """Returns (distance, parent) through the best valid predecessor of `node`."""
+        best, best_parent = INF, -1
+        for pred, weight in self._predecessors.edges(node):
+            if pred in excluded or pred in self._blocked:
+                continue
+            d = self.dist[pred] + weight
+            if d < best:
+                best, best_parent = d, pred
+        return best, best_parent
+
+    def repair(self, locked: Iterable[int] = (), unlocked: Iterable[int] = ()) -> RepairStats:
+        """Updates the field after nodes changed lock state.
+
+        The blocked set shared with the owning cache must already reflect the change. The same
+        repair applies to edge changes: a node whose tree edge disappeared is passed as locked
+        (its subtree is recomputed), and a node that may have become closer as unlocked.
+
+        Args:
+            locked (Iterable[int]): Nodes that just became impassable
+            unlocked (Iterable[int]): Nodes that just became passable again
+
+        Returns:
+            RepairStats: How much of the field the update touched
+        """
+        started = time.perf_counter()
+        stats = RepairStats()
+        heap: list = []
+
+        # Increases: every node whose tree path runs through a locked node loses its distance
+        affected: Set[int] = set()
+        stack = [node for node in locked if self.dist[node] < INF]
+        while stack:
+            node = stack.pop()
+            if node in affected:
+                continue
+            affected.add(node)
+            stack.extend(self._children.get(node, ()))
+        stats.invalidated = len(affected)
+        for node in affected:
+            self._drop(node)
+        for node in affected:
+            if node in self._blocked or node == self.source:
+                continue
+            d, parent = self._best_predecessor(node, affected)
+            if d < INF:
+                self._set(node, d, parent)
+                heapq.heappush(heap, (d, node))
+
+        # Decreases: reopened nodes are seeded from their best predecessor
+        for node in unlocked:
+            if node in self._blocked:
+                continue
+            if node == self.source:
+                d, parent = 0.0, -1
+            else:
+                d, parent = self._best_predecessor(node, set())
+            if d < self.dist[node]:
+                self._set(node, d, parent)
+                stats.relaxed += 1
+                heapq.heappush(heap, (d, node))
+
+        self._propagate(heap, stats)
+        stats.elapsed = time.perf_counter() - started
+        return stats
+
+    def rebind(self, graph: Graph, remap: List[int], removed_edges: Set[Tuple[int, int]],
+               moved: Set[int], seeds: Iterable[int]) -> RepairStats:
+        """Moves the field onto an edited graph and repairs only what the edit touched.
+
+        Args:
+            graph (Graph): The edited graph
+            remap (List[int]): New index of every old index (-1 for removed nodes)
+            removed_edges (Set[Tuple[int, int]]): Removed directed edges, in old indices
+            moved (Set[int]): Old indices of nodes whose position (and so edge weights) changed
+            seeds (Iterable[int]): New indices of nodes that may have become closer (endpoints
+                of added or shortened edges)
+
+        Returns:
+            RepairStats: How much of the field the update touched
+        """
+        old_dist, old_parent = self.dist, self.parent
+        self.graph = graph
+        self._predecessors = graph.reverse()
+        self.source = remap[self.source]
+        self.dist = [INF] * len(graph)
+        self.parent = [-1] * len(graph)
+        self._children = {}
+
+        # Copy the tree, collecting the nodes whose tree edge no longer exists as it was
+        cut = []
+        for old, new in enumerate(remap):
+            if new < 0 or old_dist[old] == INF:
+                continue
+            parent = old_parent[old]
+            new_parent = remap[parent] if parent >= 0 else -1
+            self._set(new, old_dist[old], new_parent)
+            if parent >= 0 and (new_parent < 0 or (parent, old) in removed_edges or parent in moved or old in moved):
+                cut.append(new)
+        return self.repair(locked=cut, unlocked=seeds)
+
+
+class DistanceFieldCache:
+    """Distance fields keyed by source node name, kept consistent with maintenance locks.
+
+    Thread-safe: building, reading (through `distance` and `distances`), repairing and
+    rebinding fields are serialized by one lock, so a dispatch round never sees a field
+    half repaired by a maintenance lock or a layout reload.
+
+    Attributes:
+        graph (Graph): Graph the fields are computed on
+        blocked (Set[int]): Indices of the nodes currently locked for maintenance
+        last_update (Dict[str, RepairStats]): Per-field stats of the most recent lock change
+        totals (RepairStats): Stats accumulated over all lock changes
+    """
+
+    def __init__(self, graph: Graph):
+        self.graph = graph
+        self.blocked: Set[int] = set()
+        self._fields: Dict[str, DistanceField] = {}
+        self.last_update: Dict[str, RepairStats] = {}
+        self.totals = RepairStats()
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._fields)
+
+    def field(self, source: str) -> DistanceField:
+        """Returns the field for a source node name, building it on first use.
+
+        The field is repaired in place by later lock changes; read it through `distances`
+        when other threads may change locks meanwhile.
+        """
+        with self._lock:
+            field = self._fields.get(source)
+            if field is None:
+                field = DistanceField(self.graph, self.graph.resolve(source), self.blocked)
+                self._fields[source] = field
+            return field
+
+    def distance(self, source: str, target: str) -> float:
+        """Returns the distance between two node names (inf if unreachable)."""
+        with self._lock:
+            return self.field(source).distance(self.graph.resolve(target))
+
+    def distances(self, sources: Iterable[str], targets) -> np.ndarray:
+        """Copies the distances from each source name to the target indices, one row per source."""
+        with self._lock:
+            return np.array([np.asarray(self.field(source).dist)[targets] for source in sources])
+
+    def set_locked(self, names: Iterable[str], locked: bool = True) -> Dict[str, RepairStats]:
+        """Changes the lock state of nodes and repairs every cached field.
+
+        Args:
+            names (Iterable[str]): Names of the nodes changing state
+            locked (bool): True to take the nodes offline, False to bring them back
+
+        Returns:
+            Dict[str, RepairStats]: Repair stats per field source
+        """
+        with self._lock:
+            return self._set_locked(names, locked)
+
+    def _set_locked(self, names: Iterable[str], locked: bool) -> Dict[str, RepairStats]:
+        changed = []
+        for name in names:
+            node = self.graph.resolve(name)
+            if locked and node not in self.blocked:
+                self.blocked.add(node)
+                changed.append(node)
+            elif not locked and node in self.blocked:
+                self.blocked.discard(node)
+                changed.append(node)
+
+        self.last_update = {}
+        for source, field in self._fields.items():
+            if locked:
+                stats = field.repair(locked=changed)
+            else:
+                stats = field.repair(unlocked=changed)
+            self.last_update[source] = stats
+            self.totals.add(stats)
+        return self.last_update
+
+    def rebind(self, graph: Graph, remap: List[int], removed_edges: Set[Tuple[int, int]],
+               moved: Set[int], seeds: Iterable[int]) -> Dict[str, RepairStats]:
+        """Moves every cached field onto an edited graph (see DistanceField.rebind).
+
+        Fields whose source node was removed are dropped.
+
+        Returns:
+            Dict[str, RepairStats]: Repair stats per kept field source
+        """
+        with self._lock:
+            return self._rebind(graph, remap, removed_edges, moved, list(seeds))
+
+    def _rebind(self, graph: Graph, remap: List[int], removed_edges: Set[Tuple[int, int]],
+                moved: Set[int], seeds: List[int]) -> Dict[str, RepairStats]:
+        blocked = {remap[i] for i in self.blocked if remap[i] >= 0}
+        self.blocked.clear()
+        self.blocked.update(blocked)
+        self.graph = graph
+
+        self.last_update = {}
+        for source in list(self._fields):
+            field = self._fields[source]
+            if remap[field.source] < 0:
+                del self._fields[source]
+                continue
+            stats = field.rebind(graph, remap, removed_edges, moved, seeds)
+            self.last_update[source] = stats
+            self.totals.add(stats)
+        return self.last_update
+
+    def invalidate(self, sources: Optional[Iterable[str]] = None) -> None:
+        """Drops cached fields (all of them if no sources are given)."""
+        with self._lock:
+            if sources is None:
+                self._fields.clear()
+                return
+            for source in sources:
+                self._fields.pop(source, None)
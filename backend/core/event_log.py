@@ -0,0 +1,240 @@
+""" Append-only event log files.
+    Events are written as JSON lines to one file per day (`warehouse_logs_YYYYMMDD.jsonl`), so a
+    flush costs O(batch) whatever the size of the day's log. A file that reaches `max_bytes`
+    rolls over to `warehouse_logs_YYYYMMDD.1.jsonl`, `.2`, and so on. Next to every log file a
+    `.idx` file records the byte offset of the first event of each hour, letting readers seek
+    straight to a time instead of scanning the day.
+
+    A crash can at worst leave a torn last line, which is cut off when the file is reopened.
+"""
+
+import glob
+import json
+import os
+import re
+import time
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+FSYNC_ALWAYS = 'always'      # fsync after every batch
+FSYNC_INTERVAL = 'interval'  # fsync at most every fsync_interval seconds
+FSYNC_NEVER = 'never'        # leave it to the OS
+FSYNC_POLICIES = (FSYNC_ALWAYS, FSYNC_INTERVAL, FSYNC_NEVER)
+
+DEFAULT_MAX_BYTES = 64 << 20
+TAIL_CHUNK = 1 << 16
+
+
+def _day(timestamp: str) -> str:
+    """'YYYYMMDD' of an ISO timestamp."""
+    return timestamp[0:4] + timestamp[5:7] + timestamp[8:10]
+
+
+def _hour(timestamp: str) -> str:
+    """'YYYY-MM-DDTHH' of an ISO timestamp."""
+    return timestamp[:13]
+
+
+def _index_path(path: str) -> str:
+    return path + '.idx'
+
+
+def read_index(path: str) -> Dict[str, int]:
+    """Returns hour ('YYYY-MM-DDTHH') -> byte offset of its first event in a log file."""
+    index = {}
+    size = os.path.getsize(path) if os.path.exists(path) else 0
+    if os.path.exists(_index_path(path)):
+        with open(_index_path(path)) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break  # Torn last line
+                if entry['offset'] < size:
+                    index.setdefault(entry['hour'], entry['offset'])
+    return index
+
+
+def read_events(path: str, since: Optional[str] = None) -> Iterator[dict]:
+    """Yields the events of a log file, optionally from an ISO timestamp on.
+
+    With `since`, reading starts at the indexed offset of the latest hour not after it, so
+    only that hour is scanned before reaching the requested events.
+    """
+    offset = 0
+    if since is not None:
+        hour = _hour(since)
+        offsets = [offset for indexed, offset in read_index(path).items() if indexed <= hour]
+        offset = max(offsets, default=0)
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b'\n'):
+                break
+            event = json.loads(line)
+            if since is None or event.get('timestamp', '') >= since:
+                yield event
+
+
+class EventLogWriter:
+    """Appends event dicts to rotating JSON-lines files.
+
+    Attributes:
+        directory (str): Where the log files go
+        prefix (str): File name prefix
+        fsync (str): One of FSYNC_POLICIES
+        fsync_interval (float): Seconds between fsyncs under the 'interval' policy
+        max_bytes (int): Size at which a file rolls over to the next part
+    """
+
+    def __init__(self, directory: str, prefix: str = 'warehouse_logs', fsync: str = FSYNC_INTERVAL,
+                 fsync_interval: float = 1.0, max_bytes: int = DEFAULT_MAX_BYTES):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync must be one of {', '.join(FSYNC_POLICIES)}")
+        if max_bytes < 1:
+            raise ValueError("max_bytes must be positive")
+        self.directory = directory
+        self.prefix = prefix
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        self._file = None
+        self._index = None
+        self._day: Optional[str] = None
+        self._part = 0
+        self._size = 0
+        self._hours: Dict[str, int] = {}
+        self._last_fsync = time.monotonic()
+
+    @property
+    def path(self) -> Optional[str]:
+        """File currently written to, if any."""
+        return self._file.name if self._file is not None else None
+
+    def path_for(self, day: str, part: int = 0) -> str:
+        """File of part `part` of a day ('YYYYMMDD')."""
+        suffix = f".{part}" if part else ""
+        return os.path.join(self.directory, f"{self.prefix}_{day}{suffix}.jsonl")
+
+    def files(self, day: Optional[str] = None) -> List[str]:
+        """Log files in write order, optionally of one day."""
+        pattern = re.compile(re.escape(self.prefix) + r'_(\d{8})(?:\.(\d+))?\.jsonl$')
+        found = []
+        for path in glob.glob(os.path.join(self.directory, f"{self.prefix}_*.jsonl")):
+            match = pattern.search(os.path.basename(path))
+            if match and (day is None or match.group(1) == day):
+                found.append(((match.group(1), int(match.group(2) or 0)), path))
+        return [path for _, path in sorted(found)]
+
+    def write(self, events: List[dict]) -> int:
+        """Appends events, rotating by day and size, and returns the bytes written."""
+        written = 0
+        pending: List[bytes] = []
+        hours: List[Tuple[str, int]] = []
+        for event in events:
+            timestamp = event.get('timestamp') or datetime.now().isoformat()
+            line = (json.dumps(event, separators=(',', ':'), default=str) + '\n').encode()
+            day = _day(timestamp)
+            if day != self._day or (self._size and self._size + len(line) > self.max_bytes):
+                written += self._commit(pending, hours)
+                pending, hours = [], []
+                self._open(day, rotate=day == self._day)
+            hour = _hour(timestamp)
+            if hour not in self._hours:
+                self._hours[hour] = self._size
+                hours.append((hour, self._size))
+            pending.append(line)
+            self._size += len(line)
+        written += self._commit(pending, hours)
+        return written
+
+    def _commit(self, lines: List[bytes], hours: List[Tuple[str, int]]) -> int:
+        """Writes buffered lines to the current file, then their hour offsets to its index."""
+        if not lines:
+            return 0
+        data = b''.join(lines)
+        self._file.write(data)
+        self._file.flush()
+        if hours:
+            self._index.write(''.join(json.dumps({'hour': hour, 'offset': offset}) + '\n' for hour, offset in hours))
+            self._index.flush()
+        self._sync()
+        return len(data)
+
+    def _sync(self, force: bool = False) -> None:
+        now = time.monotonic()
+        if self.fsync == FSYNC_NEVER and not force:
+            return
+        if force or self.fsync == FSYNC_ALWAYS or now - self._last_fsync >= self.fsync_interval:
+            os.fsync(self._file.fileno())
+            os.fsync(self._index.fileno())
+            self._last_fsync = now
+
+    def _open(self, day: str, rotate: bool) -> None:
+        """Switches to the last part of a day, or to a new part if `rotate`."""
+        self._close_files()
+        if rotate:
+            self._part += 1
+        else:
+            self._part = 0
+            while os.path.exists(self.path_for(day, self._part + 1)):
+                self._part += 1
+        self._day = day
+        path = self.path_for(day, self._part)
+        self._size = self._repair(path)
+        self._hours = self._repair_index(path)
+        self._file = open(path, 'ab')
+        self._index = open(_index_path(path), 'a')
+
+    @staticmethod
+    def _repair(path: str) -> int:
+        """Cuts a torn last line off a log file and returns its size."""
+        if not os.path.exists(path):
+            return 0
+        with open(path, 'rb+') as f:
+            size = f.seek(0, os.SEEK_END)
+            end = size
+            while end > 0:
+                start = max(0, end - TAIL_CHUNK)
+                f.seek(start)
+                chunk = f.read(end - start)
+                newline = chunk.rfind(b'\n')
+                if newline >= 0:
+                    end = start + newline + 1
+                    break
+                end = start
+            if end < size:
+                f.truncate(end)
+        return end
+
+    @staticmethod
+    def _repair_index(path: str) -> Dict[str, int]:
+        """Loads a log file's hour index, rewriting it if it points past the (repaired) file."""
+        hours = read_index(path)
+        index_path = _index_path(path)
+        if os.path.exists(index_path):
+            with open(index_path) as f:
+                lines = sum(1 for _ in f)
+            if lines != len(hours):
+                with open(index_path, 'w') as f:
+                    f.write(''.join(json.dumps({'hour': hour, 'offset': offset}) + '\n' for hour, offset in hours.items()))
+        return hours
+
+    def flush(self) -> None:
+        """Flushes and fsyncs the current file whatever the policy."""
+        if self._file is not None:
+            self._file.flush()
+            self._index.flush()
+            self._sync(force=True)
+
+    def _close_files(self) -> None:
+        if self._file is not None:
+            self.flush()
+            self._file.close()
+            self._index.close()
+            self._file = self._index = None
+
+    def close(self) -> None:
+        self._close_files()
+        self._day = None
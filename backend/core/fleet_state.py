@@ -0,0 +1,413 @@
+""" Fleet state shared between server processes.
+    Node lock owners, agent positions, batteries and statuses, and the task queues live in one
+    `multiprocessing.shared_memory` segment, so several workers (e.g. `gunicorn -w 4 app:app`
+    with FLEET_SHM_NAME set) serve the same warehouse.
+
+    Lock protocol: every region of the segment has a byte in a lock file, taken with
+    `fcntl.lockf`, which excludes other processes; threads of one process are excluded by a
+    threading lock (or, for node stripes, by the LockManager's own stripe mutexes) taken first.
+    Byte 0 guards the header and agent table layout, byte 1 the task queues, one byte per
+    agent row guards that agent, and one byte per lock stripe guards its nodes.
+
+    The segment outlives the processes using it; remove it with
+    `python -m core.fleet_state --unlink NAME` once every worker has stopped.
+"""
+
+import argparse
+import fcntl
+import os
+import struct
+import tempfile
+import threading
+import zlib
+from contextlib import contextmanager
+from multiprocessing import resource_tracker, shared_memory
+from typing import Dict, Iterator, List, Optional
+import numpy as np
+from core.node import FREE, ANONYMOUS, NodeStore
+from core.lock_manager import LockManager
+from core.types import AgentStatus, AgentType, TaskType
+
+MAGIC = b'WHFLEET1'
+HEADER = struct.Struct('<8sIIIII?')  # magic, node capacity, agent capacity, queue capacity, node count, map checksum, initialized
+HEADER_SIZE = 64
+
+AGENT_DTYPE = np.dtype([('agent_id', '<i4'), ('node', '<i4'), ('battery', '<f4'),
+                        ('status', 'u1'), ('agent_type', 'u1'), ('used', 'u1'), ('pad', 'u1')])
+TASK_DTYPE = np.dtype([('agent_id', '<i4'), ('job', 'u1'), ('priority', 'u1'), ('pad', '<u2'), ('goal', 'S56')])
+NO_AGENT = -1
+
+PRIORITY_QUEUE = 0
+REGULAR_QUEUE = 1
+
+# Offsets of the lock file bytes guarding each region
+_LOCK_SEGMENT = 0
+_LOCK_QUEUES = 1
+_LOCK_AGENTS = 1 << 20
+_LOCK_NODES = 1 << 30
+
+AGENT_STATUSES = list(AgentStatus)
+AGENT_TYPES = list(AgentType)
+TASK_TYPES = list(TaskType)
+
+AGENT_OWNER_BASE = 2  # Owner ids above this are agents; FREE and ANONYMOUS come first
+
+
+def owner_code(owner) -> int:
+    """Process-independent lock owner id.
+
+    Agents map to AGENT_OWNER_BASE + agent_id, other owners (such as the maintenance lock
+    string) to a negative checksum of their repr.
+    """
+    if owner is None:
+        return ANONYMOUS
+    agent_id = getattr(owner, 'agent_id', None)
+    if isinstance(agent_id, int) and not isinstance(owner, (str, int)):
+        return AGENT_OWNER_BASE + agent_id
+    return -1 - (zlib.crc32(repr(owner).encode()) & 0x7FFFFFFF)
+
+
+def map_checksum(store: NodeStore) -> int:
+    """Checksum of the node names in index order; processes sharing a segment must agree on it."""
+    return zlib.crc32('\0'.join(store.names[:store.size]).encode())
+
+
+def _layout(node_capacity: int, agent_capacity: int, queue_capacity: int) -> Dict[str, int]:
+    """Byte offsets of the segment's arrays, and its total size under 'size'."""
+    offsets = {'owners': HEADER_SIZE}
+    offset = HEADER_SIZE + 4 * node_capacity
+    offset += -offset % 8
+    offsets['agents'] = offset
+    offset += AGENT_DTYPE.itemsize * agent_capacity
+    offset += -offset % 8
+    offsets['counters'] = offset
+    offset += 8 * 4
+    offsets['queues'] = offset
+    offsets['size'] = offset + TASK_DTYPE.itemsize * 2 * queue_capacity
+    return offsets
+
+
+def lock_path(name: str) -> str:
+    """Lock file used by the segment called `name`."""
+    return os.path.join(tempfile.gettempdir(), f"{name}.lock")
+
+
+class SharedFleetState:
+    """Views over a shared fleet segment, plus its lock protocol.
+
+    Use `open` to create or attach, then `bind` to move a NodeStore's owners into the segment.
+
+    Attributes:
+        name (str): Shared memory segment name
+        created (bool): Whether this process created the segment
+        owners (np.ndarray): Lock owner id per node index
+        agents (np.ndarray): Agent rows (AGENT_DTYPE)
+        store (Optional[NodeStore]): Bound node store
+    """
+
+    def __init__(self, segment: shared_memory.SharedMemory, lock_fd: int, created: bool):
+        self.name = segment.name.lstrip('/')
+        self.created = created
+        self._segment = segment
+        self._lock_fd = lock_fd
+        magic, self.node_capacity, self.agent_capacity, self.queue_capacity, _, _, _ = HEADER.unpack_from(segment.buf)
+        if magic != MAGIC:
+            raise ValueError(f"Shared memory segment {self.name} is not a fleet state segment")
+        offsets = _layout(self.node_capacity, self.agent_capacity, self.queue_capacity)
+        buf = segment.buf
+        self.owners = np.ndarray(self.node_capacity, dtype=np.int32, buffer=buf, offset=offsets['owners'])
+        self.agents = np.ndarray(self.agent_capacity, dtype=AGENT_DTYPE, buffer=buf, offset=offsets['agents'])
+        self._counters = np.ndarray(4, dtype=np.uint64, buffer=buf, offset=offsets['counters'])
+        self._queues = np.ndarray((2, self.queue_capacity), dtype=TASK_DTYPE, buffer=buf, offset=offsets['queues'])
+        self.store: Optional[NodeStore] = None
+        self._slots: Dict[int, int] = {}
+        self._segment_lock = threading.Lock()
+        self._queue_lock = threading.Lock()
+        self._agent_locks = [threading.Lock() for _ in range(self.agent_capacity)]
+
+    @classmethod
+    def open(cls, name: str, node_capacity: int, agent_capacity: int = 64,
+             queue_capacity: int = 1024, create: bool = True) -> 'SharedFleetState':
+        """Attaches to the segment called `name`, creating it with the given capacities if needed.
+
+        Raises:
+            FileNotFoundError: If the segment does not exist and `create` is False
+            ValueError: If an existing segment is too small for `node_capacity` nodes
+        """
+        if node_capacity < 1 or agent_capacity < 1 or queue_capacity < 1:
+            raise ValueError("Capacities must be at least 1")
+        lock_fd = os.open(lock_path(name), os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.lockf(lock_fd, fcntl.LOCK_EX, 1, _LOCK_SEGMENT)
+            try:
+                try:
+                    segment = shared_memory.SharedMemory(name=name)
+                    created = False
+                except FileNotFoundError:
+                    if not create:
+                        raise
+                    size = _layout(node_capacity, agent_capacity, queue_capacity)['size']
+                    segment = shared_memory.SharedMemory(name=name, create=True, size=size)
+                    segment.buf[:size] = bytes(size)
+                    HEADER.pack_into(segment.buf, 0, MAGIC, node_capacity, agent_capacity, queue_capacity, 0, 0, False)
+                    created = True
+                # The segment must survive this process; the resource tracker would unlink it at exit
+                resource_tracker.unregister(segment._name, 'shared_memory')
+            finally:
+                fcntl.lockf(lock_fd, fcntl.LOCK_UN, 1, _LOCK_SEGMENT)
+        except BaseException:
+            os.close(lock_fd)
+            raise
+        fleet = cls(segment, lock_fd, created)
+        if fleet.node_capacity < node_capacity:
+            fleet.close()
+            raise ValueError(f"Shared fleet state {name} holds {fleet.node_capacity} nodes, {node_capacity} needed")
+        return fleet
+
+    def close(self) -> None:
+        """Detaches this process; the segment stays for the others. A bound store keeps
+        using the segment, so only close an unbound one."""
+        self.owners = self.agents = self._counters = self._queues = None
+        self._segment.close()
+        os.close(self._lock_fd)
+
+    @staticmethod
+    def unlink(name: str) -> None:
+        """Removes the segment and its lock file."""
+        segment = shared_memory.SharedMemory(name=name)
+        segment.close()
+        segment.unlink()  # Also drops the resource tracker registration made by attaching
+        if os.path.exists(lock_path(name)):
+            os.remove(lock_path(name))
+
+    # Lock protocol
+
+    @contextmanager
+    def _region(self, offset: int, thread_lock: Optional[threading.Lock] = None) -> Iterator[None]:
+        """Holds one lock file byte (after the matching thread lock, if any)."""
+        if thread_lock is not None:
+            thread_lock.acquire()
+        try:
+            fcntl.lockf(self._lock_fd, fcntl.LOCK_EX, 1, offset)
+            try:
+                yield
+            finally:
+                fcntl.lockf(self._lock_fd, fcntl.LOCK_UN, 1, offset)
+        finally:
+            if thread_lock is not None:
+                thread_lock.release()
+
+    def stripe_guard(self, stripe: int):
+        """Process-level lock of a node stripe; the LockManager holds the stripe's mutex around it."""
+        return self._region(_LOCK_NODES + stripe)
+
+    def bind(self, store: NodeStore, locks: LockManager) -> None:
+        """Moves a store's lock owners into the segment and guards a lock manager's stripes.
+
+        The first process to bind copies its locks in; later ones take the segment's.
+
+        Raises:
+            ValueError: If the segment was initialized from a different map
+        """
+        checksum = map_checksum(store)
+        with self._region(_LOCK_SEGMENT, self._segment_lock):
+            _, _, _, _, size, stored, initialized = HEADER.unpack_from(self._segment.buf)
+            if initialized and (size != store.size or stored != checksum):
+                raise ValueError(f"Shared fleet state {self.name} was built for a different map")
+            store.share(self.owners, owner_code, initialize=not initialized)
+            if not initialized:
+                HEADER.pack_into(self._segment.buf, 0, MAGIC, self.node_capacity, self.agent_capacity,
+                                 self.queue_capacity, store.size, checksum, True)
+        self.store = store
+        locks.guard = self.stripe_guard
+
+    # Agents
+
+    def _slot(self, agent_id: int) -> Optional[int]:
+        slot = self._slots.get(agent_id)
+        if slot is None or not self.agents[slot]['used'] or self.agents[slot]['agent_id'] != agent_id:
+            hits = np.flatnonzero(self.agents['used'].astype(bool) & (self.agents['agent_id'] == agent_id))
+            slot = int(hits[0]) if len(hits) else None
+            if slot is not None:
+                self._slots[agent_id] = slot
+        return slot
+
+    def node_of(self, agent_id: int) -> Optional[int]:
+        """Node index of a registered agent, if any."""
+        slot = self._slot(agent_id)
+        return int(self.agents[slot]['node']) if slot is not None else None
+
+    def register(self, agent) -> bool:
+        """Adds an agent's row unless another process already did.
+
+        Returns:
+            bool: True if the row was added, False if it existed (pull it into the agent)
+
+        Raises:
+            RuntimeError: If the agent table is full
+        """
+        with self._region(_LOCK_SEGMENT, self._segment_lock):
+            if self._slot(agent.agent_id) is not None:
+                return False
+            free = np.flatnonzero(self.agents['used'] == 0)
+            if not len(free):
+                raise RuntimeError(f"The shared agent table holds {self.agent_capacity} agents")
+            slot = int(free[0])
+            self.agents[slot] = (agent.agent_id, NO_AGENT, 0.0, 0, 0, 1, 0)
+            self._slots[agent.agent_id] = slot
+            self.push(agent)
+        return True
+
+    def push(self, agent) -> None:
+        """Writes an agent's position, battery and status to its row."""
+        row = self.agents[self._slot(agent.agent_id)]
+        row['node'] = agent.node.index if agent.node.store is self.store else NO_AGENT
+        row['battery'] = agent.battery
+        row['status'] = AGENT_STATUSES.index(agent.status)
+        row['agent_type'] = AGENT_TYPES.index(agent.agent_type)
+
+    def pull(self, agent) -> None:
+        """Updates an agent from its row, following moves made by other processes. The caller
+        holds the agent's row lock (see session and refresh)."""
+        slot = self._slot(agent.agent_id)
+        if slot is None:
+            return
+        row = self.agents[slot]
+        node_index = int(row['node'])
+        if node_index != NO_AGENT and self.store is not None and agent.node.index != node_index:
+            agent.node = self.store.node(node_index)
+            agent.path.append(agent.node)
+        agent.battery = float(row['battery'])
+        agent.status = AGENT_STATUSES[row['status']]
+
+    def refresh(self, agent, wait: bool = False) -> bool:
+        """Pulls an agent's row under its row lock, so a concurrent push is never read half done.
+
+        Args:
+            agent (Agent): Agent to update
+            wait (bool): Wait for a session holding the agent to end; otherwise give up at once
+
+        Returns:
+            bool: False if the agent is not registered, or (without wait) another thread or
+                process is moving it; it then keeps its last known state
+        """
+        slot = self._slot(agent.agent_id)
+        if slot is None:
+            return False
+        if wait:
+            with self._region(_LOCK_AGENTS + slot, self._agent_locks[slot]):
+                self.pull(agent)
+            return True
+        thread_lock = self._agent_locks[slot]
+        if not thread_lock.acquire(blocking=False):
+            return False
+        try:
+            try:
+                fcntl.lockf(self._lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB, 1, _LOCK_AGENTS + slot)
+            except OSError:
+                return False
+            try:
+                self.pull(agent)
+            finally:
+                fcntl.lockf(self._lock_fd, fcntl.LOCK_UN, 1, _LOCK_AGENTS + slot)
+        finally:
+            thread_lock.release()
+        return True
+
+    @contextmanager
+    def session(self, agent) -> Iterator[None]:
+        """Holds an agent against other processes and threads, pulling its row before and
+        pushing it after, so moves of one agent never interleave."""
+        slot = self._slot(agent.agent_id)
+        if slot is None:
+            raise KeyError(f"Agent {agent.agent_id} is not registered in the shared fleet state")
+        with self._region(_LOCK_AGENTS + slot, self._agent_locks[slot]):
+            self.pull(agent)
+            try:
+                yield
+            finally:
+                self.push(agent)
+
+    # Task queues
+
+    def push_task(self, task, agent_id: Optional[int] = None) -> None:
+        """Appends a task to the priority queue (priority 1) or the regular queue.
+
+        Raises:
+            ValueError: If the goal does not fit in a queue entry
+            RuntimeError: If the queue is full
+        """
+        goal = task.goal_state.encode()
+        if len(goal) > TASK_DTYPE['goal'].itemsize:
+            raise ValueError(f"Goal {task.goal_state!r} is too long for the shared task queue")
+        queue = PRIORITY_QUEUE if task.priority == 1 else REGULAR_QUEUE
+        with self._region(_LOCK_QUEUES, self._queue_lock):
+            head, tail = int(self._counters[2 * queue]), int(self._counters[2 * queue + 1])
+            if tail - head >= self.queue_capacity:
+                raise RuntimeError(f"The shared task queue holds {self.queue_capacity} tasks")
+            self._queues[queue, tail % self.queue_capacity] = (
+                NO_AGENT if agent_id is None else agent_id, TASK_TYPES.index(task.job), task.priority, 0, goal)
+            self._counters[2 * queue + 1] = tail + 1
+
+    def pop_task(self) -> Optional[dict]:
+        """Takes the oldest high-priority task, or else the oldest regular one.
+
+        Returns:
+            Optional[dict]: 'agent_id', 'goal', 'job' and 'priority' of the task, or None if both queues are empty
+        """
+        with self._region(_LOCK_QUEUES, self._queue_lock):
+            for queue in (PRIORITY_QUEUE, REGULAR_QUEUE):
+                head, tail = int(self._counters[2 * queue]), int(self._counters[2 * queue + 1])
+                if head < tail:
+                    entry = self._queues[queue, head % self.queue_capacity]
+                    self._counters[2 * queue] = head + 1
+                    return {
+                        'agent_id': None if entry['agent_id'] == NO_AGENT else int(entry['agent_id']),
+                        'goal': entry['goal'].decode(),
+                        'job': TASK_TYPES[entry['job']],
+                        'priority': int(entry['priority']),
+                    }
+        return None
+
+    def queue_lengths(self) -> Dict[str, int]:
+        counters = self._counters.tolist()
+        return {'priority': int(counters[1] - counters[0]), 'regular': int(counters[3] - counters[2])}
+
+    def snapshot(self) -> dict:
+        """Summary of the segment: capacities, registered agents, held nodes and queue lengths."""
+        used = self.agents[self.agents['used'] == 1]
+        return {
+            'name': self.name,
+            'node_capacity': self.node_capacity,
+            'agent_capacity': self.agent_capacity,
+            'agents': [{'agent_id': int(row['agent_id']), 'node': int(row['node']),
+                        'battery': round(float(row['battery']), 2),
+                        'status': AGENT_STATUSES[row['status']].name} for row in used],
+            'locked_nodes': int(np.count_nonzero(self.owners != FREE)),
+            'queues': self.queue_lengths(),
+        }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='fleet-state', description="Inspect or remove a shared fleet state segment.")
+    parser.add_argument('name', help="Segment name (FLEET_SHM_NAME)")
+    parser.add_argument('--unlink', action='store_true', help="Remove the segment once every worker has stopped")
+    args = parser.parse_args(argv)
+    try:
+        if args.unlink:
+            SharedFleetState.unlink(args.name)
+            print(f"Removed {args.name}")
+            return 0
+        fleet = SharedFleetState.open(args.name, 1, create=False)
+    except FileNotFoundError:
+        print(f"No shared fleet state called {args.name}")
+        return 1
+    snapshot = fleet.snapshot()
+    fleet.close()
+    for key, value in snapshot.items():
+        print(f"{key}: {value}")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
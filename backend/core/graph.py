@@ -0,0 +1,195 @@
+""" Integer-indexed graph shared by every path planning engine.
+    Nodes are numbered 0..n-1 and edges are stored in compressed sparse row (CSR) form, so a
+    neighbour scan is a slice of two flat lists instead of a dict walk over Node objects.
+"""
+
+from math import sqrt
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from core.node import Node
+
+METRICS = ('euclidean', 'manhattan', 'hops')
+
+
+class Graph:
+    """Directed weighted graph in CSR form.
+
+    The edges leaving node i are targets[offsets[i]:offsets[i + 1]] with the matching weights.
+    A graph built from Node objects keeps them in `nodes`, so lock state is read live from the
+    nodes; a graph built from raw map data uses the static `locked` flags instead.
+
+    Attributes:
+        names (List[str]): Node name per index
+        index (Dict[str, int]): Node index per name
+        xs (List[float]): X coordinate per index
+        ys (List[float]): Y coordinate per index
+        offsets (List[int]): Start of each node's edge slice (length n + 1)
+        targets (List[int]): Edge targets
+        weights (List[float]): Edge weights
+        locked (List[bool]): Static lock flags (used when no Node objects are attached)
+        nodes (Optional[List[Node]]): Node objects backing the graph, if any
+        metric (str): How edge weights were derived ('euclidean', 'manhattan' or 'hops')
+    """
+
+    def __init__(self, names: List[str], xs: Sequence[float], ys: Sequence[float], offsets: Sequence[int],
+                 targets: Sequence[int], weights: Sequence[float], locked: Optional[Sequence[bool]] = None,
+                 nodes: Optional[List[Node]] = None, metric: str = 'hops'):
+        if len(offsets) != len(names) + 1:
+            raise ValueError("offsets must have one entry more than names")
+        if len(targets) != len(weights):
+            raise ValueError("targets and weights must have the same length")
+        self.names = names
+        self.index: Dict[str, int] = {name: i for i, name in enumerate(names)}
+        self.xs = xs
+        self.ys = ys
+        self.offsets = offsets
+        self.targets = targets
+        self.weights = weights
+        self.locked = locked if locked is not None else [False] * len(names)
+        self.nodes = nodes
+        self.metric = metric
+        self._reverse: Optional['Graph'] = None
+
+    @staticmethod
+    def _edge_weight(metric: str, x1: float, y1: float, x2: float, y2: float) -> float:
+        if metric == 'euclidean':
+            return sqrt((x1 - x2) ** 2 + (y1 - y2) ** 2)
+        if metric == 'manhattan':
+            return abs(x1 - x2) + abs(y1 - y2)
+        return 1.0
+
+    @classmethod
+    def from_map_data(cls, nodes_data: Dict[str, dict], metric: str = 'euclidean') -> 'Graph':
+        """Builds a graph from the "nodes" section of map.json.
+
+        Neighbour names that do not exist in the map are skipped.
+
+        Args:
+            nodes_data (Dict[str, dict]): Node records with x, y, neighbours and locked
+            metric (str): Edge weight metric ('euclidean', 'manhattan' or 'hops')
+
+        Returns:
+            Graph: The graph, without Node objects attached
+        """
+        if metric not in METRICS:
+            raise ValueError(f"Unsupported metric '{metric}'. Use one of {', '.join(METRICS)}.")
+        names = list(nodes_data)
+        index = {name: i for i, name in enumerate(names)}
+        xs = [float(nodes_data[name]['x']) for name in names]
+        ys = [float(nodes_data[name]['y']) for name in names]
+        offsets, targets, weights = [0], [], []
+        for i, name in enumerate(names):
+            for neighbour in nodes_data[name].get('neighbours', []):
+                j = index.get(neighbour)
+                if j is None:
+                    continue
+                targets.append(j)
+                weights.append(cls._edge_weight(metric, xs[i], ys[i], xs[j], ys[j]))
+            offsets.append(len(targets))
+        locked = [bool(nodes_data[name].get('locked', False)) for name in names]
+        return cls(names, xs, ys, offsets, targets, weights, locked=locked, metric=metric)
+
+    @classmethod
+    def from_nodes(cls, nodes: Iterable[Node], metric: str = 'hops') -> 'Graph':
+        """Builds a graph over Node objects, using their neighbour distances as edge weights.
+
+        Neighbours that are not part of `nodes` are skipped.
+
+        Args:
+            nodes (Iterable[Node]): Nodes of the graph, in index order
+            metric (str): How the neighbour distances were derived
+        """
+        node_list = list(nodes)
+        names = [node.name for node in node_list]
+        position = {id(node): i for i, node in enumerate(node_list)}
+        offsets, targets, weights = [0], [], []
+        for node in node_list:
+            for neighbour, distance in node.neighbours.items():
+                j = position.get(id(neighbour))
+                if j is None:
+                    continue
+                targets.append(j)
+                weights.append(float(distance))
+            offsets.append(len(targets))
+        xs = [float(node.x) for node in node_list]
+        ys = [float(node.y) for node in node_list]
+        return cls(names, xs, ys, offsets, targets, weights, nodes=node_list, metric=metric)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @property
+    def edge_count(self) -> int:
+        """Number of directed edges."""
+        return len(self.targets)
+
+    def resolve(self, node) -> int:
+        """Returns the index of a node given as an index, a name or a Node object."""
+        if isinstance(node, int):
+            if not 0 <= node < len(self.names):
+                raise ValueError(f"Node index {node} out of range")
+            return node
+        name = node if isinstance(node, str) else node.name
+        try:
+            return self.index[name]
+        except KeyError:
+            raise ValueError(f"Node {name} not found in graph") from None
+
+    def edges(self, i: int) -> Iterable[Tuple[int, float]]:
+        """Returns (target, weight) pairs for the edges leaving node i."""
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return zip(self.targets[start:end], self.weights[start:end])
+
+    def weight(self, i: int, j: int) -> float:
+        """Returns the weight of edge i -> j (inf if there is none)."""
+        for target, weight in self.edges(i):
+            if target == j:
+                return weight
+        return float('inf')
+
+    def is_locked(self, i: int) -> bool:
+        """Returns whether node i is currently locked."""
+        if self.nodes is not None:
+            return self.nodes[i].is_locked()
+        return self.locked[i]
+
+    def owner(self, i: int):
+        """Returns whoever holds the lock on node i (None for unattached graphs)."""
+        if self.nodes is not None:
+            return self.nodes[i].locked_by
+        return None
+
+    def node(self, i: int) -> Optional[Node]:
+        """Returns the Node object behind index i, if the graph has them."""
+        return self.nodes[i] if self.nodes is not None else None
+
+    def to_nodes(self, indices: Iterable[int]) -> List[Node]:
+        """Maps a list of indices back to Node objects."""
+        if self.nodes is None:
+            raise ValueError("Graph has no Node objects attached")
+        return [self.nodes[i] for i in indices]
+
+    def euclidean(self, i: int, j: int) -> float:
+        """Straight-line distance between two nodes."""
+        return sqrt((self.xs[i] - self.xs[j]) ** 2 + (self.ys[i] - self.ys[j]) ** 2)
+
+    def manhattan(self, i: int, j: int) -> float:
+        """Manhattan distance between two nodes."""
+        return abs(self.xs[i] - self.xs[j]) + abs(self.ys[i] - self.ys[j])
+
+    def reverse(self) -> 'Graph':
+        """Returns the graph with every edge reversed (cached), for predecessor scans."""
+        if self._reverse is None:
+            incoming: List[List[Tuple[int, float]]] = [[] for _ in self.names]
+            for i in range(len(self.names)):
+                for j, weight in self.edges(i):
+                    incoming[j].append((i, weight))
+            offsets, targets, weights = [0], [], []
+            for edges in incoming:
+                for i, weight in edges:
+                    targets.append(i)
+                    weights.append(weight)
+                offsets.append(len(targets))
+            self._reverse = Graph(self.names, self.xs, self.ys, offsets, targets, weights,
+                                  locked=self.locked, nodes=self.nodes, metric=self.metric)
+            self._reverse._reverse = self
+        return self._reverse
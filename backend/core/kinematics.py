@@ -0,0 +1,127 @@
+""" Kinematic profiles used to turn a path over the node grid into an estimated travel time.
+    Headings are quantised to the 8 directions of the N<row>-<col> grid, a gentle (45 degree) turn
+    costs the time lost slowing down to cornering speed, and anything sharper forces a full stop
+    plus an in-place rotation.
+"""
+
+from dataclasses import dataclass
+from math import atan2, pi, sqrt
+from typing import Dict, List, Optional
+from core.types import AgentType
+from core.node import Node
+
+HEADINGS = 8  # Number of discrete headings (45 degree steps)
+
+
+@dataclass(frozen=True)
+class KinematicProfile:
+    """Motion limits of an agent, in map units and seconds.
+
+    Attributes:
+        max_speed (float): Cruise speed (map units / s)
+        acceleration (float): Acceleration and braking rate (map units / s^2)
+        corner_speed (float): Speed held through a 45 degree turn (map units / s)
+        turn_rate (float): In-place rotation rate after a stop (degrees / s)
+        stop_turn_steps (int): Heading change (in 45 degree steps) from which the agent must stop
+        turn_penalty (Optional[float]): Override for the derived gentle-turn penalty (s)
+        stop_penalty (Optional[float]): Override for the derived stop-and-go penalty (s)
+    """
+    max_speed: float
+    acceleration: float
+    corner_speed: float
+    turn_rate: float = 180.0
+    stop_turn_steps: int = 2
+    turn_penalty: Optional[float] = None
+    stop_penalty: Optional[float] = None
+
+    def __post_init__(self):
+        if self.max_speed <= 0 or self.acceleration <= 0:
+            raise ValueError("max_speed and acceleration must be positive")
+        if not 0 <= self.corner_speed <= self.max_speed:
+            raise ValueError("corner_speed must be between 0 and max_speed")
+        if self.turn_rate <= 0:
+            raise ValueError("turn_rate must be positive")
+
+    def _slowdown_penalty(self, speed: float) -> float:
+        """Time lost braking from cruise speed down to `speed` and accelerating back."""
+        return (self.max_speed - speed) ** 2 / (self.acceleration * self.max_speed)
+
+    def gentle_turn_penalty(self) -> float:
+        """Returns the time lost on a 45 degree turn."""
+        if self.turn_penalty is not None:
+            return self.turn_penalty
+        return self._slowdown_penalty(self.corner_speed)
+
+    def full_stop_penalty(self) -> float:
+        """Returns the time lost stopping and pulling away again."""
+        if self.stop_penalty is not None:
+            return self.stop_penalty
+        return self._slowdown_penalty(0.0)
+
+    def ramp_penalty(self) -> float:
+        """Returns the time lost accelerating from rest (or braking to rest) once."""
+        return self.max_speed / (2 * self.acceleration)
+
+    def turn_cost(self, steps: int) -> float:
+        """Returns the time penalty for changing heading by `steps` 45 degree steps."""
+        if steps <= 0:
+            return 0.0
+        if steps < self.stop_turn_steps:
+            return steps * self.gentle_turn_penalty()
+        return self.full_stop_penalty() + (steps * 45.0) / self.turn_rate
+
+
+# Default profiles: pickers are light and nimble, transporters are heavy and prefer straight runs.
+DEFAULT_KINEMATICS: Dict[AgentType, KinematicProfile] = {
+    AgentType.PICKER: KinematicProfile(max_speed=36.0, acceleration=36.0, corner_speed=24.0, turn_rate=180.0),
+    AgentType.TRANSPORTER: KinematicProfile(max_speed=54.0, acceleration=18.0, corner_speed=18.0, turn_rate=90.0),
+}
+
+
+def default_profile(agent_type: AgentType) -> KinematicProfile:
+    """Returns the default kinematic profile for an agent type."""
+    return DEFAULT_KINEMATICS[agent_type]
+
+
+def heading_of(dx: float, dy: float) -> int:
+    """Returns the discrete heading (0-7) of a displacement."""
+    return round(atan2(dy, dx) / (pi / 4)) % HEADINGS
+
+
+def heading_between(a: Node, b: Node) -> int:
+    """Returns the discrete heading (0-7) of the move from node a to node b."""
+    return heading_of(b.x - a.x, b.y - a.y)
+
+
+def heading_steps(h1: int, h2: int) -> int:
+    """Returns the number of 45 degree steps between two headings."""
+    diff = abs(h1 - h2) % HEADINGS
+    return min(diff, HEADINGS - diff)
+
+
+def segment_length(a: Node, b: Node) -> float:
+    """Returns the Euclidean length of the segment between two nodes."""
+    return sqrt((a.x - b.x) ** 2 + (a.y - b.y) ** 2)
+
+
+def estimate_travel_time(path: List[Node], profile: KinematicProfile) -> float:
+    """Estimates the time needed to drive a path from rest to rest.
+
+    Args:
+        path (List[Node]): Nodes to visit, starting with the current position
+        profile (KinematicProfile): Kinematics of the agent driving the path
+
+    Returns:
+        float: Estimated travel time in seconds (0 for an empty or single-node path)
+    """
+    if len(path) < 2:
+        return 0.0
+    total = 2 * profile.ramp_penalty()
+    heading = None
+    for a, b in zip(path, path[1:]):
+        total += segment_length(a, b) / profile.max_speed
+        new_heading = heading_between(a, b)
+        if heading is not None:
+            total += profile.turn_cost(heading_steps(heading, new_heading))
+        heading = new_heading
+    return total
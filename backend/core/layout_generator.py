@@ -0,0 +1,445 @@
+""" Procedural warehouse layouts for scale testing.
+    Reproduces the grammar of data/map.json at any size:
+    - an N<row>-<col> grid of aisle nodes with vertical racks A, B, ... (A on the right), each
+      rack standing between its L and R access columns and reached from five access nodes per side;
+    - a freezer section of C<row>-<col> nodes with horizontal frozen racks between the C rows,
+      entered through its own dock;
+    - entry/exit docks on an E1 row above an E2 staging row that feeds the grid.
+    Writes map.json, lookup_table.json, items.csv (the schema functions/ reads) and
+    item_placements.csv. The map only depends on the spec; items and placements use the seed.
+
+    Usage:
+        python -m core.layout_generator -o /tmp/warehouse --scale 10 --seed 7
+"""
+
+import argparse
+import csv
+import json
+import math
+import os
+import random
+import sys
+from dataclasses import asdict, dataclass, field, replace
+from typing import Dict, List, Optional, Tuple
+
+ACCESS_NODES = 5          # Access nodes per rack side, as in lookup_table.json
+STEP = 20                 # Grid spacing in map units
+RACK_WIDTH = 40           # Distance between the L and R access columns of a rack
+FREEZER_ROW_GAP = 70      # Distance between two C rows (depth of a frozen rack)
+FREEZER_RACKS_PER_ROW = 2  # In data/map.json; larger freezers get wider to stay roughly square
+DOCK_GAP = 95             # E1 docks to E2 staging row
+STAGING_GAP = 64          # E2 staging row to the first grid row
+RACK_CAPACITY = 100
+SHELF_WEIGHT_LIMITS = {1: 400, 2: 250, 3: 150}
+BINS = {'S': 1, 'M': 2, 'L': 3}
+
+# (name, size, category, weight, frequency) of the items in functions/items.csv
+CATALOGUE = [
+    ("Bulk Rice Sack (100kg)", 'L', "Food", 350.0, 0.40),
+    ("Rice Pack", 'M', "Food", 54.0, 0.82),
+    ("Canned Tuna", 'M', "Food", 45.7, 0.87),
+    ("Vacuum Cleaner", 'M', "Household Goods", 12.1, 0.52),
+    ("Blender", 'M', "Household Goods", 12.0, 0.70),
+    ("Dishwasher", 'M', "Household Goods", 18.8, 0.57),
+    ("Heavy Machinery Part", 'L', "Household Goods", 390.0, 0.20),
+    ("Detergent (10L)", 'M', "Chemicals", 60.0, 0.39),
+    ("Bleach (5L)", 'M', "Chemicals", 146.0, 0.59),
+    ("Steel Drum (200L)", 'L', "Chemicals", 320.0, 0.25),
+    ("Orange Juice (1L)", 'M', "Beverages", 87.5, 0.78),
+    ("Milk (1L)", 'M', "Beverages", 44.5, 0.64),
+    ("Water Bottle (500ml)", 'S', "Beverages", 14.0, 0.72),
+    ("Frozen Pizza (500g)", 'M', "Frozen", 55.0, 0.49),
+    ("Frozen Peas (1kg)", 'M', "Frozen", 48.0, 0.59),
+    ("Frozen Chicken Wings (2kg)", 'M', "Frozen", 44.5, 0.70),
+]
+
+
+@dataclass
+class LayoutSpec:
+    """Size of a generated warehouse.
+
+    The defaults give roughly the size of data/map.json.
+
+    Attributes:
+        rack_columns (int): Columns of vertical racks in the main grid (lettered from A)
+        rack_rows (int): Racks per column (numbered from 1, top to bottom)
+        freezer_racks (int): Frozen racks in the freezer section
+        docks (int): Entry/exit docks on the E1 row (the freezer dock comes on top)
+        items (int): Items written to the item CSVs
+        seed (int): Seed for the item catalogue and placements
+        shelves_per_rack (int): Shelf levels per rack side
+        bins_per_shelf (int): Bins per shelf
+    """
+    rack_columns: int = 7
+    rack_rows: int = 3
+    freezer_racks: int = 6
+    docks: int = 6
+    items: int = 133
+    seed: int = 0
+    shelves_per_rack: int = 3
+    bins_per_shelf: int = 5
+
+    def __post_init__(self):
+        if self.rack_columns < 1 or self.rack_rows < 1:
+            raise ValueError("rack_columns and rack_rows must be at least 1")
+        if self.freezer_racks < 0 or self.docks < 1 or self.items < 0:
+            raise ValueError("freezer_racks and items must be non-negative and docks at least 1")
+        if self.shelves_per_rack < 1 or self.bins_per_shelf < max(BINS.values()):
+            raise ValueError(f"Need at least one shelf and {max(BINS.values())} bins per shelf")
+
+    @classmethod
+    def scaled(cls, factor: float, **overrides) -> 'LayoutSpec':
+        """Returns a spec about `factor` times the size of the default one.
+
+        The grid grows by sqrt(factor) in each direction, so node, rack and item counts grow
+        by about `factor`.
+        """
+        if factor <= 0:
+            raise ValueError("factor must be positive")
+        base = cls()
+        side = math.sqrt(factor)
+        spec = replace(
+            base,
+            rack_columns=max(1, round(base.rack_columns * side)),
+            rack_rows=max(1, round(base.rack_rows * side)),
+            freezer_racks=max(FREEZER_RACKS_PER_ROW, round(base.freezer_racks * factor)),
+            docks=max(1, round(base.docks * side)),
+            items=max(1, round(base.items * factor)),
+        )
+        return replace(spec, **overrides)
+
+
+@dataclass
+class GeneratedLayout:
+    """A generated warehouse, in the shape of the map sources.
+
+    Attributes:
+        nodes (Dict[str, dict]): map.json "nodes" records
+        racks (Dict[str, dict]): map.json "racks" records
+        lookup (Dict[str, List[str]]): lookup_table.json, rack side -> access nodes
+        items (List[dict]): items.csv rows
+        placements (List[dict]): item_placements.csv rows
+    """
+    spec: LayoutSpec
+    nodes: Dict[str, dict] = field(default_factory=dict)
+    racks: Dict[str, dict] = field(default_factory=dict)
+    lookup: Dict[str, List[str]] = field(default_factory=dict)
+    items: List[dict] = field(default_factory=list)
+    placements: List[dict] = field(default_factory=list)
+
+    @property
+    def edge_count(self) -> int:
+        return sum(len(node['neighbours']) for node in self.nodes.values()) // 2
+
+    def summary(self) -> Dict[str, int]:
+        return {
+            "nodes": len(self.nodes),
+            "edges": self.edge_count,
+            "racks": len(self.racks),
+            "frozen_racks": sum(rack['is_frozen'] for rack in self.racks.values()),
+            "rack_sides": len(self.lookup),
+            "items": len(self.items),
+            "placed": len(self.placements),
+        }
+
+
+def rack_letters(index: int) -> str:
+    """Spreadsheet-style letters for a rack column: 0 -> A, 25 -> Z, 26 -> AA."""
+    letters = ''
+    index += 1
+    while index:
+        index, rest = divmod(index - 1, 26)
+        letters = chr(ord('A') + rest) + letters
+    return letters
+
+
+def _freezer_racks_per_row(count: int) -> int:
+    return min(count, max(FREEZER_RACKS_PER_ROW, math.ceil(math.sqrt(count / 3))))
+
+
+def _add_node(nodes: Dict[str, dict], name: str, x: float, y: float, node_type: str = 'center') -> None:
+    nodes[name] = {"x": int(round(x)), "y": int(round(y)), "neighbours": [], "locked": False,
+                   "is_goal": False, "heuristic": 0, "type": node_type}
+
+
+def _connect(nodes: Dict[str, dict], a: str, b: str) -> None:
+    nodes[a]['neighbours'].append(b)
+    nodes[b]['neighbours'].append(a)
+
+
+def _rack(start: Tuple[float, float], end: Tuple[float, float], frozen: bool) -> dict:
+    start, end = tuple(int(round(v)) for v in start), tuple(int(round(v)) for v in end)
+    center = tuple(int(round((s + e) / 2)) for s, e in zip(start, end))
+    return {"is_frozen": frozen, "current_capacity": RACK_CAPACITY,
+            "start_cords": list(start), "center_cords": list(center), "end_cords": list(end)}
+
+
+def _main_grid(layout: GeneratedLayout, x0: float, y0: float) -> Tuple[List[float], List[str]]:
+    """Builds the N grid and its racks. Returns the column x positions and the first-row names."""
+    spec = layout.spec
+    nodes = layout.nodes
+
+    # Columns: two margins, then L, R and an aisle per rack column, then one more margin.
+    # The rack of column k (0 = leftmost) is lettered so that A ends up on the right.
+    xs, rack_cols = [], {}
+    x = x0
+    for _ in range(2):
+        xs.append(x)
+        x += STEP
+    for k in range(spec.rack_columns):
+        rack_cols[len(xs) + 1] = rack_letters(spec.rack_columns - 1 - k)  # 1-based L column
+        xs.append(x)
+        x += RACK_WIDTH
+        xs.append(x)
+        x += STEP
+        xs.append(x)
+        x += STEP
+    xs.append(x)
+
+    first_rack_row = 3
+    last_rack_row = first_rack_row + spec.rack_rows * ACCESS_NODES - 1
+    n_rows = last_rack_row + 2
+    cols = len(xs)
+
+    def name(row: int, col: int) -> str:
+        return f"N{row}-{col}"
+
+    for row in range(1, n_rows + 1):
+        for col in range(1, cols + 1):
+            _add_node(nodes, name(row, col), xs[col - 1], y0 + (row - 1) * STEP)
+
+    def crosses_rack(r1: int, c1: int, r2: int, c2: int) -> bool:
+        left = min(c1, c2)
+        return (c1 != c2 and left in rack_cols
+                and first_rack_row <= min(r1, r2) and max(r1, r2) <= last_rack_row)
+
+    # 8-connected, except through a rack
+    for row in range(1, n_rows + 1):
+        for col in range(1, cols + 1):
+            for dr, dc in ((0, 1), (1, -1), (1, 0), (1, 1)):
+                r2, c2 = row + dr, col + dc
+                if 1 <= r2 <= n_rows and 1 <= c2 <= cols and not crosses_rack(row, col, r2, c2):
+                    _connect(nodes, name(row, col), name(r2, c2))
+
+    for number in range(1, spec.rack_rows + 1):
+        rows = range(first_rack_row + (number - 1) * ACCESS_NODES, first_rack_row + number * ACCESS_NODES)
+        top, bottom = y0 + (rows[0] - 1) * STEP, y0 + (rows[-1] - 1) * STEP
+        for left_col in sorted(rack_cols, key=lambda c: (len(rack_cols[c]), rack_cols[c])):
+            rack_id = f"{rack_cols[left_col]}{number}"
+            x = (xs[left_col - 1] + xs[left_col]) / 2
+            layout.racks[rack_id] = _rack((x, top - STEP / 4), (x, bottom + STEP / 4), frozen=False)
+            layout.lookup[f"{rack_id}L"] = [name(row, left_col) for row in rows]
+            layout.lookup[f"{rack_id}R"] = [name(row, left_col + 1) for row in rows]
+    return xs, [name(1, col) for col in range(1, cols + 1)]
+
+
+def _freezer(layout: GeneratedLayout, x0: float, y0: float, letter: str) -> Optional[str]:
+    """Builds the C rows and the frozen racks between them. Returns the name of the door node."""
+    count = layout.spec.freezer_racks
+    if not count:
+        return None
+    nodes = layout.nodes
+    per_row = _freezer_racks_per_row(count)
+    rack_rows = math.ceil(count / per_row)
+    span = ACCESS_NODES + 1
+    cols = 1 + span * per_row
+
+    def name(row: int, col: int) -> str:
+        return f"C{row}-{col}"
+
+    for row in range(1, rack_rows + 2):
+        for col in range(1, cols + 1):
+            _add_node(nodes, name(row, col), x0 + (col - 1) * STEP, y0 + (row - 1) * FREEZER_ROW_GAP)
+
+    # Rack slots: (rack row, first access column) -> rack id
+    slots = {}
+    for number in range(1, count + 1):
+        row, position = divmod(number - 1, per_row)
+        slots[(row + 1, 2 + position * span)] = f"{letter}{number}"
+
+    def blocked(r1: int, c1: int, r2: int, c2: int) -> bool:
+        if r1 == r2:
+            return False
+        for first in range(2, cols, span):
+            if (min(r1, r2), first) in slots and first <= c1 < first + ACCESS_NODES and first <= c2 < first + ACCESS_NODES:
+                return True
+        return False
+
+    for row in range(1, rack_rows + 2):
+        for col in range(1, cols + 1):
+            for dr, dc in ((0, 1), (1, -1), (1, 0), (1, 1)):
+                r2, c2 = row + dr, col + dc
+                if r2 <= rack_rows + 1 and 1 <= c2 <= cols and not blocked(row, col, r2, c2):
+                    _connect(nodes, name(row, col), name(r2, c2))
+
+    for (row, first), rack_id in sorted(slots.items(), key=lambda item: int(item[1][len(letter):])):
+        access = range(first, first + ACCESS_NODES)
+        y = y0 + (row - 0.5) * FREEZER_ROW_GAP
+        layout.racks[rack_id] = _rack((x0 + (first - 1.5) * STEP, y), (x0 + (access[-1] - 0.5) * STEP, y), frozen=True)
+        # The R side faces the row above the rack, the L side the row below, as in data/map.json
+        layout.lookup[f"{rack_id}R"] = [name(row, col) for col in access]
+        layout.lookup[f"{rack_id}L"] = [name(row + 1, col) for col in access]
+
+    # The door is the gap column closest to the middle of the first C row
+    gaps = list(range(1, cols + 1, span))
+    return name(1, gaps[len(gaps) // 2])
+
+
+def _entrances(layout: GeneratedLayout, xs: List[float], first_row: List[str], grid_y: float,
+               freezer_door: Optional[str]) -> None:
+    """Adds the E2 staging row above the grid and the E1 docks above it."""
+    nodes = layout.nodes
+    staging_y = grid_y - STAGING_GAP
+    dock_y = staging_y - DOCK_GAP
+    staging, docks = [], []
+
+    if freezer_door is not None:
+        door = nodes[freezer_door]
+        _add_node(nodes, "E2-1", door['x'], staging_y)
+        _add_node(nodes, "E1-1", door['x'], dock_y, 'entry')
+        _connect(nodes, "E2-1", freezer_door)
+        _connect(nodes, "E1-1", "E2-1")
+        staging.append("E2-1")
+        docks.append("E1-1")
+
+    main_staging = []
+    for col, x in enumerate(xs):
+        name = f"E2-{len(staging) + 1}"
+        _add_node(nodes, name, x, staging_y)
+        for below in first_row[max(col - 1, 0):col + 2]:
+            _connect(nodes, name, below)
+        if staging:
+            _connect(nodes, staging[-1], name)
+        staging.append(name)
+        main_staging.append(name)
+
+    # Docks are spread evenly over the staging row; the left half receives, the right half ships
+    count = min(layout.spec.docks, len(main_staging))
+    for i in range(count):
+        col = round((i + 0.5) * len(main_staging) / count - 0.5)
+        below = nodes[main_staging[col]]
+        name = f"E1-{len(docks) + 1}"
+        _add_node(nodes, name, below['x'], dock_y, 'entry' if i < (count + 1) // 2 else 'exit')
+        for neighbour in main_staging[max(col - 1, 0):col + 2]:
+            _connect(nodes, name, neighbour)
+        docks.append(name)
+
+
+def _items(layout: GeneratedLayout, rng: random.Random) -> None:
+    """Draws items from the catalogue and places them on free bins of suitable rack sides."""
+    spec = layout.spec
+    frozen_sides = [side for side in layout.lookup if layout.racks[side[:-1]]['is_frozen']]
+    normal_sides = [side for side in layout.lookup if not layout.racks[side[:-1]]['is_frozen']]
+    used: Dict[Tuple[str, int], set] = {}
+
+    for item_id in range(1, spec.items + 1):
+        name, size, category, weight, frequency = rng.choice(CATALOGUE)
+        weight = round(weight * rng.uniform(0.9, 1.1), 1)
+        frequency = round(min(max(frequency + rng.uniform(-0.05, 0.05), 0.05), 1.0), 2)
+        layout.items.append({"item_id": item_id, "item_name": name, "item_size": size, "category": category,
+                             "weight": weight, "frequency": frequency})
+
+        sides = frozen_sides if category == "Frozen" else normal_sides
+        levels = [level for level in range(1, spec.shelves_per_rack + 1)
+                  if weight <= SHELF_WEIGHT_LIMITS.get(level, min(SHELF_WEIGHT_LIMITS.values()))]
+        if not sides or not levels:
+            continue
+        bins = BINS[size]
+        for _ in range(100):
+            side, level = rng.choice(sides), rng.choice(levels)
+            taken = used.setdefault((side, level), set())
+            starts = [start for start in range(1, spec.bins_per_shelf - bins + 2)
+                      if not taken.intersection(range(start, start + bins))]
+            if starts:
+                start = rng.choice(starts)
+                taken.update(range(start, start + bins))
+                positions = f"{start}-{start + bins - 1}" if bins > 1 else str(start)
+                layout.placements.append({"item_id": item_id, "name": name, "category": category.lower(),
+                                          "size": size, "position": f"({side},{level},{positions})"})
+                break
+
+
+def generate_layout(spec: LayoutSpec) -> GeneratedLayout:
+    """Generates a warehouse from a spec.
+
+    Args:
+        spec (LayoutSpec): Size of the warehouse and seed for the items
+
+    Returns:
+        GeneratedLayout: Nodes, racks, lookup table, items and placements
+    """
+    layout = GeneratedLayout(spec=spec)
+    freezer_cols = 1 + (ACCESS_NODES + 1) * _freezer_racks_per_row(spec.freezer_racks)
+    grid_x = STEP + (freezer_cols * STEP + 3 * STEP if spec.freezer_racks else 0)
+    grid_y = STAGING_GAP + DOCK_GAP + 2 * STEP
+    xs, first_row = _main_grid(layout, grid_x, grid_y)
+    freezer_door = _freezer(layout, STEP, grid_y + 2 * STEP, rack_letters(spec.rack_columns))
+    _entrances(layout, xs, first_row, grid_y, freezer_door)
+    _items(layout, random.Random(spec.seed))
+    return layout
+
+
+def write_layout(layout: GeneratedLayout, output_dir: str) -> Dict[str, str]:
+    """Writes the map sources and item CSVs of a layout.
+
+    Records are written one per line, so large layouts stay diffable and stream well.
+
+    Returns:
+        Dict[str, str]: Written file paths keyed by kind
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    paths = {kind: os.path.join(output_dir, filename) for kind, filename in (
+        ('map', 'map.json'), ('lookup', 'lookup_table.json'),
+        ('items', 'items.csv'), ('placements', 'item_placements.csv'))}
+
+    def records(f, items) -> None:
+        f.write('{\n')
+        f.write(',\n'.join(f"    {json.dumps(key)}: {json.dumps(value)}" for key, value in items))
+        f.write('\n  }' if items else '}')
+
+    with open(paths['map'], 'w') as f:
+        f.write('{\n  "nodes": ')
+        records(f, list(layout.nodes.items()))
+        f.write(',\n  "racks": ')
+        records(f, list(layout.racks.items()))
+        f.write('\n}\n')
+
+    with open(paths['lookup'], 'w') as f:
+        f.write('{\n')
+        f.write(',\n'.join(f"  {json.dumps(side)}: {json.dumps(nodes)}" for side, nodes in layout.lookup.items()))
+        f.write('\n}\n')
+
+    for kind, rows, columns in (
+            ('items', layout.items, ['item_id', 'item_name', 'item_size', 'category', 'weight', 'frequency']),
+            ('placements', layout.placements, ['item_id', 'name', 'category', 'size', 'position'])):
+        with open(paths[kind], 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=columns)
+            writer.writeheader()
+            writer.writerows(rows)
+    return paths
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='generate-layout', description="Generate a warehouse layout for scale testing.")
+    parser.add_argument('-o', '--output', required=True, help="Output directory")
+    parser.add_argument('--scale', type=float, default=1.0, help="Size relative to the default spec, which is close to data/map.json (default 1)")
+    parser.add_argument('--seed', type=int, default=0, help="Seed for items and placements")
+    for option in ('rack_columns', 'rack_rows', 'freezer_racks', 'docks', 'items'):
+        parser.add_argument(f"--{option.replace('_', '-')}", type=int, help="Override the scaled value")
+    args = parser.parse_args(argv)
+
+    overrides = {option: getattr(args, option) for option in ('rack_columns', 'rack_rows', 'freezer_racks', 'docks', 'items')
+                 if getattr(args, option) is not None}
+    try:
+        spec = LayoutSpec.scaled(args.scale, seed=args.seed, **overrides)
+    except ValueError as e:
+        print(f"generate-layout: {e}", file=sys.stderr)
+        return 2
+    layout = generate_layout(spec)
+    paths = write_layout(layout, args.output)
+    print(json.dumps({"spec": asdict(spec), **layout.summary(), "files": paths}, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,340 @@
+""" Hot reload of the warehouse layout.
+    `diff_layout` compares a freshly compiled map against the loaded Warehouse by node name, and
+    `apply_layout` patches the loaded Node, Rack and Shelf objects in place (agents keep their
+    Node references), then moves the route cache and distance fields onto the new graph, dropping
+    or repairing only the entries the diff touched.
+
+    Usage:
+        python -m core.layout_reload data/map.json --lookup data/lookup_table.json
+        python -m core.layout_reload data/map.json --apply http://localhost:5000
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import urllib.request
+from dataclasses import asdict, dataclass, field
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from core.distance_field import DistanceFieldCache, RepairStats
+from core.graph import Graph
+from core.map_artifact import MapArtifact, default_artifact_path
+from core.route_cache import RouteCache
+from core.warehouse import Warehouse
+
+Edge = Tuple[str, str]
+
+
+@dataclass
+class LayoutDiff:
+    """Differences between the loaded layout and a new one, by name.
+
+    Edges are undirected and listed as (a, b) with a < b.
+    """
+    added_nodes: List[str] = field(default_factory=list)
+    removed_nodes: List[str] = field(default_factory=list)
+    moved_nodes: List[str] = field(default_factory=list)
+    retyped_nodes: List[str] = field(default_factory=list)
+    added_edges: List[Edge] = field(default_factory=list)
+    removed_edges: List[Edge] = field(default_factory=list)
+    added_racks: List[str] = field(default_factory=list)
+    removed_racks: List[str] = field(default_factory=list)
+    changed_racks: List[str] = field(default_factory=list)
+    changed_sides: List[str] = field(default_factory=list)
+
+    @property
+    def empty(self) -> bool:
+        return not any(asdict(self).values())
+
+    def touched_nodes(self) -> Set[str]:
+        """Names of the nodes whose existence, position or adjacency changed."""
+        touched = set(self.added_nodes) | set(self.removed_nodes) | set(self.moved_nodes)
+        for a, b in self.added_edges + self.removed_edges:
+            touched.update((a, b))
+        return touched
+
+    def counts(self) -> Dict[str, int]:
+        return {key: len(value) for key, value in asdict(self).items()}
+
+    def to_dict(self) -> dict:
+        return {"counts": self.counts(), **asdict(self)}
+
+
+@dataclass
+class ReloadResult:
+    """Outcome of a layout reload.
+
+    Attributes:
+        diff (LayoutDiff): What changed
+        applied (bool): Whether the warehouse was patched
+        conflicts (List[str]): Reasons the reload was refused, if any
+        routes_dropped (int): Route cache pairs invalidated by the diff
+        routes_kept (int): Route cache pairs carried over to the new graph
+        fields_dropped (int): Distance fields whose source node was removed
+        field_repairs (RepairStats): Work done repairing the remaining distance fields
+        elapsed (float): Wall-clock time of the reload in seconds
+    """
+    diff: LayoutDiff
+    applied: bool = False
+    conflicts: List[str] = field(default_factory=list)
+    routes_dropped: int = 0
+    routes_kept: int = 0
+    fields_dropped: int = 0
+    field_repairs: RepairStats = field(default_factory=RepairStats)
+    elapsed: float = 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "applied": self.applied,
+            "conflicts": self.conflicts,
+            "diff": self.diff.to_dict(),
+            "routes_dropped": self.routes_dropped,
+            "routes_kept": self.routes_kept,
+            "fields_dropped": self.fields_dropped,
+            "field_repairs": {**asdict(self.field_repairs), "touched": self.field_repairs.touched},
+            "elapsed": self.elapsed,
+        }
+
+
+def _edges(warehouse: Warehouse) -> Set[Edge]:
+    return {(a.name, b.name) if a.name < b.name else (b.name, a.name)
+            for a in warehouse.nodes.values() for b in a.neighbours}
+
+
+def diff_layout(current: Warehouse, target: Warehouse) -> LayoutDiff:
+    """Compares two warehouses by node, edge, rack and rack-side name.
+
+    Args:
+        current (Warehouse): The loaded warehouse
+        target (Warehouse): The warehouse built from the new map
+
+    Returns:
+        LayoutDiff: What would change
+    """
+    diff = LayoutDiff()
+    old, new = current.nodes, target.nodes
+    diff.added_nodes = [name for name in new if name not in old]
+    diff.removed_nodes = [name for name in old if name not in new]
+    for name, node in old.items():
+        other = new.get(name)
+        if other is None:
+            continue
+        if (node.x, node.y) != (other.x, other.y):
+            diff.moved_nodes.append(name)
+        if node.node_type != other.node_type:
+            diff.retyped_nodes.append(name)
+
+    old_edges, new_edges = _edges(current), _edges(target)
+    diff.added_edges = sorted(new_edges - old_edges)
+    diff.removed_edges = sorted(old_edges - new_edges)
+
+    diff.added_racks = [rack_id for rack_id in target.racks if rack_id not in current.racks]
+    diff.removed_racks = [rack_id for rack_id in current.racks if rack_id not in target.racks]
+    diff.changed_racks = [rack_id for rack_id, rack in current.racks.items()
+                          if rack_id in target.racks and target.racks[rack_id] != rack]
+    sides = set(current.access_nodes) | set(target.access_nodes)
+    diff.changed_sides = sorted(side for side in sides if current.access_nodes.get(side) != target.access_nodes.get(side))
+    return diff
+
+
+def _conflicts(warehouse: Warehouse, diff: LayoutDiff, agents: Iterable) -> List[str]:
+    """Lists the reasons the diff cannot be applied while the agents are running.
+
+    Removed nodes further along a path in flight are not a conflict: once removed they can no
+    longer be locked, so the agent stops before them and replans on the new layout.
+    """
+    removed = set(diff.removed_nodes)
+    conflicts = []
+    for agent in agents:
+        if agent.node.name in removed:
+            conflicts.append(f"Agent {agent.agent_id} is standing on removed node {agent.node.name}")
+    for name in diff.removed_nodes:
+        node = warehouse.nodes[name]
+        if node.is_locked():
+            conflicts.append(f"Removed node {name} is locked by {getattr(node.locked_by, 'agent_id', node.locked_by)}")
+    return conflicts
+
+
+def apply_layout(warehouse: Warehouse, target: Warehouse, diff: LayoutDiff, agents: Iterable = (),
+                 route_cache: Optional[RouteCache] = None,
+                 distance_fields: Optional[DistanceFieldCache] = None) -> ReloadResult:
+    """Patches the warehouse in place to match the target layout.
+
+    Nothing is changed if a removed node is occupied or locked. Existing Node objects are
+    updated rather than replaced, so agents, reservations and tasks holding them stay valid.
+
+    Args:
+        warehouse (Warehouse): The loaded warehouse, patched in place
+        target (Warehouse): The warehouse built from the new map (consumed: its new nodes are adopted)
+        diff (LayoutDiff): Result of diff_layout(warehouse, target)
+        agents (Iterable): Running agents
+        route_cache (Optional[RouteCache]): Route cache to move onto the new graph
+        distance_fields (Optional[DistanceFieldCache]): Distance fields to move onto the new graph
+
+    Returns:
+        ReloadResult: What was applied and how much of the caches survived
+    """
+    started = time.perf_counter()
+    result = ReloadResult(diff=diff)
+    result.conflicts = _conflicts(warehouse, diff, agents)
+    if result.conflicts:
+        return result
+
+    nodes = warehouse.nodes
+    old_graph = warehouse.get_graph()
+
+    # Nodes whose neighbour dicts have to be rebuilt. Node hashes depend on the coordinates,
+    # so every dict holding a moved node is emptied before the node moves.
+    rewire = diff.touched_nodes()
+    for name in diff.moved_nodes + diff.removed_nodes:
+        rewire.update(neighbour.name for neighbour in nodes[name].neighbours)
+    adjacency = {name: [(neighbour.name, weight) for neighbour, weight in target.nodes[name].neighbours.items()]
+                 for name in rewire if name in target.nodes}
+    for name in rewire:
+        if name in nodes:
+            nodes[name].neighbours.clear()
+
+    store = warehouse.get_store()
+    for name in diff.removed_nodes:
+        store.release(nodes.pop(name).index)
+    for name in diff.moved_nodes:
+        nodes[name].x, nodes[name].y = target.nodes[name].x, target.nodes[name].y
+    for name in diff.retyped_nodes:
+        nodes[name].set_type(target.nodes[name].node_type)
+    for name in diff.added_nodes:
+        node = store.adopt(target.nodes[name])
+        node.neighbours = {}
+        nodes[name] = node
+    for name, neighbours in adjacency.items():
+        nodes[name].neighbours = {nodes[other]: weight for other, weight in neighbours}
+
+    # Racks, shelves and access nodes
+    for rack_id in diff.removed_racks:
+        del warehouse.racks[rack_id]
+    for rack_id in diff.added_racks + diff.changed_racks:
+        warehouse.racks[rack_id] = target.racks[rack_id]
+    for rack_id in diff.added_racks + diff.changed_racks + diff.removed_racks:
+        for shelf_id in [s for s, shelf in warehouse.shelves.items() if shelf.rack_id == rack_id]:
+            if shelf_id not in target.shelves:
+                del warehouse.shelves[shelf_id]
+        for shelf_id, shelf in target.shelves.items():
+            if shelf.rack_id == rack_id and shelf_id not in warehouse.shelves:
+                warehouse.shelves[shelf_id] = shelf
+    for side in diff.changed_sides:
+        if side in target.access_nodes:
+            warehouse.access_nodes[side] = target.access_nodes[side]
+        else:
+            warehouse.access_nodes.pop(side, None)
+    warehouse.facts.n_racks = len(warehouse.racks)
+
+    # New graph; surviving nodes keep their relative order, added ones come last
+    graph = Graph.from_nodes(nodes.values(), metric=old_graph.metric)
+    remap = [graph.index.get(name, -1) for name in old_graph.names]
+    warehouse.graph = graph
+    warehouse.artifact = target.artifact
+
+    moved = {old_graph.index[name] for name in diff.moved_nodes}
+    touched = moved | {old_graph.index[name] for name in diff.removed_nodes}
+    removed_edges: Set[Tuple[int, int]] = set()
+    for a, b in diff.removed_edges:
+        i, j = old_graph.index[a], old_graph.index[b]
+        removed_edges.update(((i, j), (j, i)))
+        touched.update((i, j))
+
+    # Edges that are new or may have become shorter, one entry per direction
+    new_edges = []
+    for a, b in diff.added_edges:
+        i, j = graph.index[a], graph.index[b]
+        new_edges += [(i, j, graph.weight(i, j)), (j, i, graph.weight(j, i))]
+    for name in diff.moved_nodes:
+        i = graph.index[name]
+        for j, weight in graph.edges(i):
+            new_edges += [(i, j, weight), (j, i, graph.weight(j, i))]
+    seeds = {i for i, j, _ in new_edges} | {j for i, j, _ in new_edges}
+
+    if route_cache is not None:
+        result.routes_dropped = route_cache.rebind(graph, remap, touched, new_edges)
+        result.routes_kept = len(route_cache)
+    if distance_fields is not None:
+        before = len(distance_fields)
+        updates = distance_fields.rebind(graph, remap, removed_edges, moved, seeds)
+        result.fields_dropped = before - len(distance_fields)
+        for stats in updates.values():
+            result.field_repairs.add(stats)
+
+    result.applied = True
+    result.elapsed = time.perf_counter() - started
+    return result
+
+
+def reload_layout(warehouse: Warehouse, map_path: str, lookup_path: Optional[str] = None,
+                  artifact_path: Optional[str] = None, agents: Iterable = (),
+                  route_cache: Optional[RouteCache] = None, distance_fields: Optional[DistanceFieldCache] = None,
+                  dry_run: bool = False) -> ReloadResult:
+    """Compiles the map sources, diffs them against the warehouse and applies the changes.
+
+    Args:
+        warehouse (Warehouse): The loaded warehouse
+        map_path (str): Path to the new map.json
+        lookup_path (Optional[str]): Path to the new lookup_table.json
+        artifact_path (Optional[str]): Compiled map path, defaults to map.bin next to map.json
+        agents (Iterable): Running agents, checked against removed nodes
+        route_cache (Optional[RouteCache]): Route cache to carry over
+        distance_fields (Optional[DistanceFieldCache]): Distance fields to carry over
+        dry_run (bool): Only compute the diff and the conflicts
+
+    Returns:
+        ReloadResult: What changed and what was applied
+
+    Raises:
+        MapValidationError: If the new map has errors (the warehouse is left untouched)
+    """
+    started = time.perf_counter()
+    target = Warehouse.load(map_path, lookup_path, artifact_path)
+    diff = diff_layout(warehouse, target)
+    if dry_run or diff.empty:
+        result = ReloadResult(diff=diff, conflicts=_conflicts(warehouse, diff, agents))
+    else:
+        result = apply_layout(warehouse, target, diff, agents, route_cache, distance_fields)
+    result.elapsed = time.perf_counter() - started
+    return result
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='reload-layout',
+                                     description="Show how an edited map differs from the compiled one, or ask the server to apply it.")
+    parser.add_argument('map', help="Path to the edited map.json")
+    parser.add_argument('--lookup', help="Path to lookup_table.json")
+    parser.add_argument('--apply', metavar='URL', help="Base URL of a running server to reload (e.g. http://localhost:5000)")
+    parser.add_argument('--dry-run', action='store_true', help="With --apply, only ask the server for the diff")
+    args = parser.parse_args(argv)
+
+    if args.apply:
+        body = json.dumps({"dry_run": args.dry_run}).encode()
+        request = urllib.request.Request(f"{args.apply.rstrip('/')}/warehouse/reload", data=body,
+                                         headers={"Content-Type": "application/json"}, method='POST')
+        try:
+            with urllib.request.urlopen(request) as response:
+                print(json.dumps(json.load(response), indent=2))
+        except urllib.error.HTTPError as e:
+            print(e.read().decode(), file=sys.stderr)
+            return 1
+        return 0
+
+    # Offline: compare against the artifact the server was started from
+    artifact_path = default_artifact_path(args.map)
+    if not os.path.exists(artifact_path):
+        print(f"reload-layout: no compiled map at {artifact_path}", file=sys.stderr)
+        return 1
+    current = Warehouse.from_artifact(MapArtifact.open(artifact_path))
+    with tempfile.TemporaryDirectory() as tmp:
+        target = Warehouse.load(args.map, args.lookup, os.path.join(tmp, 'map.bin'))
+        diff = diff_layout(current, target)
+    print(json.dumps(diff.to_dict(), indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,234 @@
+""" Thread-safe node locking.
+    Lock ownership lives in the NodeStore owner table (one int per node). `LockManager` guards
+    it with a fixed set of striped mutexes: a node maps to one stripe, so a lock or unlock only
+    serializes with operations on nodes of the same stripe. Multi-node acquires take their
+    stripes in index order, which keeps them deadlock-free, and either take every node or none.
+    Waiters with a timeout sleep on the stripe's condition and are woken by releases.
+
+    When the owner table is shared between processes (see core.fleet_state), a guard adds a
+    process-level lock per stripe, and waiters poll because releases in other processes do not
+    reach their condition.
+"""
+
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack, nullcontext
+from dataclasses import dataclass, field
+from typing import Callable, ContextManager, Iterable, List, Optional, Sequence
+import numpy as np
+
+DEFAULT_STRIPES = 64
+POLL_INTERVAL = 0.005  # Seconds between retries while waiting on a guarded stripe
+
+# Returns a context manager holding a stripe against other processes
+StripeGuard = Callable[[int], ContextManager]
+
+
+@dataclass
+class LockStats:
+    """Lock manager counters.
+
+    Attributes:
+        acquired (int): Node locks taken
+        released (int): Node locks given back
+        contended (int): Acquire attempts that found a node held by someone else
+        waits (int): Times a caller slept waiting for a node
+        timeouts (int): Acquire attempts that gave up
+        node_contention (Counter): Contended attempts per node name
+    """
+    acquired: int = 0
+    released: int = 0
+    contended: int = 0
+    waits: int = 0
+    timeouts: int = 0
+    node_contention: Counter = field(default_factory=Counter)
+
+    def to_dict(self, top: int = 10) -> dict:
+        return {
+            "acquired": self.acquired,
+            "released": self.released,
+            "contended": self.contended,
+            "waits": self.waits,
+            "timeouts": self.timeouts,
+            "hottest_nodes": dict(self.node_contention.most_common(top)),
+        }
+
+
+class LockManager:
+    """Striped mutexes over the node owner tables.
+
+    Owners are agents (matched by identity) or plain ids such as the maintenance lock string.
+
+    Attributes:
+        stripes (int): Number of mutexes nodes are spread over
+        guard (Optional[StripeGuard]): Process-level stripe lock, set when the owners are shared
+    """
+
+    def __init__(self, stripes: int = DEFAULT_STRIPES, guard: Optional[StripeGuard] = None):
+        if stripes < 1:
+            raise ValueError("stripes must be at least 1")
+        self.stripes = stripes
+        self.guard = guard
+        self._conditions = [threading.Condition(threading.Lock()) for _ in range(stripes)]
+        # Counters per stripe, only written while holding that stripe
+        self._acquired = np.zeros(stripes, dtype=np.int64)
+        self._released = np.zeros(stripes, dtype=np.int64)
+        self._contended = np.zeros(stripes, dtype=np.int64)
+        self._waits = np.zeros(stripes, dtype=np.int64)
+        self._timeouts = np.zeros(stripes, dtype=np.int64)
+        self._node_contention: List[Counter] = [Counter() for _ in range(stripes)]
+
+    def _stripe(self, node) -> int:
+        if self.guard is not None:
+            # Must pick the same stripe in every process
+            return node.index % self.stripes
+        return hash((id(node.store), node.index)) % self.stripes
+
+    def _guarded(self, stripe: int) -> ContextManager:
+        return self.guard(stripe) if self.guard is not None else nullcontext()
+
+    def _wait(self, condition: threading.Condition, remaining: float) -> None:
+        condition.wait(min(remaining, POLL_INTERVAL) if self.guard is not None else remaining)
+
+    def _take(self, stripe: int, node, owner) -> bool:
+        """Takes a node for an owner; the caller holds the node's stripe."""
+        store, i = node.store, node.index
+        if store.holds(i, owner):
+            return True
+        if store.lock(i, owner):
+            self._acquired[stripe] += 1
+            return True
+        self._contended[stripe] += 1
+        self._node_contention[stripe][node.name] += 1
+        return False
+
+    def try_acquire(self, node, owner, timeout: float = 0.0) -> bool:
+        """Locks a node for an owner, waiting up to `timeout` seconds if it is held.
+
+        Locking a node the owner already holds succeeds.
+
+        Returns:
+            bool: Whether the owner holds the node
+        """
+        stripe = self._stripe(node)
+        condition = self._conditions[stripe]
+        deadline = time.monotonic() + timeout
+        with condition:
+            while True:
+                with self._guarded(stripe):
+                    if self._take(stripe, node, owner):
+                        return True
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    if timeout > 0:
+                        self._timeouts[stripe] += 1
+                    return False
+                self._waits[stripe] += 1
+                self._wait(condition, remaining)
+
+    def release(self, node, owner) -> bool:
+        """Unlocks a node if the owner holds it, waking anyone waiting on its stripe."""
+        stripe = self._stripe(node)
+        condition = self._conditions[stripe]
+        with condition, self._guarded(stripe):
+            if not node.store.unlock(node.index, owner):
+                return False
+            self._released[stripe] += 1
+            condition.notify_all()
+        return True
+
+    def acquire_all(self, nodes: Sequence, owner, timeout: float = 0.0):
+        """Locks every node for an owner, or none of them.
+
+        Nodes the owner already holds count as taken (and stay held on failure).
+
+        Args:
+            nodes (Sequence[Node]): Nodes to lock
+            owner: Lock owner
+            timeout (float): Seconds to keep retrying while some node is held
+
+        Returns:
+            Optional[Node]: None on success, otherwise the first node that was held by someone else
+        """
+        nodes = list(nodes)
+        stripes = sorted({self._stripe(node) for node in nodes})
+        deadline = time.monotonic() + timeout
+        while True:
+            for stripe in stripes:
+                self._conditions[stripe].acquire()
+            try:
+                with ExitStack() as guards:
+                    for stripe in stripes:
+                        guards.enter_context(self._guarded(stripe))
+                    blocked = self._take_all(nodes, owner)
+            finally:
+                for stripe in reversed(stripes):
+                    self._conditions[stripe].release()
+            if blocked is None:
+                return None
+            stripe = self._stripe(blocked)
+            condition = self._conditions[stripe]
+            with condition:
+                remaining = deadline - time.monotonic()
+                if not blocked.store.alive[blocked.index]:
+                    return blocked  # Removed by a layout reload; it will never be released
+                if remaining <= 0:
+                    if timeout > 0:
+                        self._timeouts[stripe] += 1
+                    return blocked
+                with self._guarded(stripe):
+                    held = not blocked.store.is_free(blocked.index) and not blocked.store.holds(blocked.index, owner)
+                if held:
+                    self._waits[stripe] += 1
+                    self._wait(condition, remaining)
+
+    def _take_all(self, nodes: List, owner):
+        """Takes every node or none; the caller holds all their stripes."""
+        for node in nodes:
+            store, i = node.store, node.index
+            if not store.is_free(i) and not store.holds(i, owner):
+                stripe = self._stripe(node)
+                self._contended[stripe] += 1
+                self._node_contention[stripe][node.name] += 1
+                return node
+        for node in nodes:
+            if node.store.lock(node.index, owner):
+                self._acquired[self._stripe(node)] += 1
+        return None
+
+    def release_all(self, nodes: Iterable, owner) -> int:
+        """Unlocks every node the owner holds among `nodes` and returns how many were released."""
+        return sum(self.release(node, owner) for node in nodes)
+
+    def move(self, owner, current, target, timeout: float = 0.0) -> bool:
+        """Takes `target` for an owner standing on `current`, then lets go of `current`.
+
+        Returns:
+            bool: False (holding on to `current`) if `target` could not be taken in time
+        """
+        if not self.try_acquire(target, owner, timeout):
+            return False
+        if current is not None and current is not target:
+            self.release(current, owner)
+        return True
+
+    @property
+    def stats(self) -> LockStats:
+        """Snapshot of the counters summed over the stripes."""
+        node_contention = Counter()
+        for condition, counts in zip(self._conditions, self._node_contention):
+            with condition:  # Writers hold the stripe, so the Counter does not change while copied
+                node_contention.update(counts)
+        return LockStats(
+            acquired=int(self._acquired.sum()),
+            released=int(self._released.sum()),
+            contended=int(self._contended.sum()),
+            waits=int(self._waits.sum()),
+            timeouts=int(self._timeouts.sum()),
+            node_contention=node_contention,
+        )
+
+
+# Process-wide manager used by Node.lock / Node.unlock
+default_lock_manager = LockManager()
@@ -0,0 +1,386 @@
+""" Compressed columnar archive of past event logs.
+    A compaction job (`python -m core.log_archive compact`, run nightly) turns the finished
+    days of Mixer logs into one archive per day, `warehouse_logs_YYYYMMDD.wla`. Events are
+    stored in hourly chunks, column by column, each column compressed on its own:
+
+      timestamp  microseconds, delta-encoded (first value kept in the footer)
+      type       codes into a per-file dictionary
+      agent_id   codes into a per-file dictionary (-1 for none)
+      task_id    codes into a per-file dictionary (-1 for none)
+      message    UTF-8 bytes plus per-row lengths
+      id         same as message
+      data       same as message, holding the JSON of structured event data
+
+    The footer (JSON) holds the dictionaries and, per chunk, its hour, time span, the type
+    codes it contains and where each column lives. Readers skip chunks outside the requested
+    time range or without the requested type, decode the filter columns first, and only then
+    decompress the columns asked for.
+
+    File layout: MAGIC, column blobs, footer, uint64 footer offset, MAGIC.
+"""
+
+import argparse
+import json
+import os
+import struct
+import zlib
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+import numpy as np
+from core.event_log import read_events
+
+MAGIC = b'WHLOGAR1'
+TRAILER = struct.Struct('<Q8s')
+COLUMNS = ('id', 'timestamp', 'type', 'message', 'agent_id', 'task_id', 'data')
+CODED_COLUMNS = ('type', 'agent_id', 'task_id')
+TEXT_COLUMNS = ('id', 'message', 'data')
+EPOCH = datetime(1970, 1, 1)
+NONE = -1
+COMPRESSION_LEVEL = 6
+
+
+def to_micros(timestamp: str) -> int:
+    """Microseconds since 1970 of a (naive, local) ISO timestamp."""
+    return (datetime.fromisoformat(timestamp) - EPOCH) // timedelta(microseconds=1)
+
+
+def from_micros(micros: int) -> str:
+    return (EPOCH + timedelta(microseconds=int(micros))).isoformat()
+
+
+@dataclass
+class CompactionResult:
+    """Outcome of compacting one day of logs.
+
+    Attributes:
+        day (str): Day compacted ('YYYYMMDD')
+        archive (str): Archive file written
+        events (int): Events archived
+        source_bytes (int): Size of the log files read
+        archive_bytes (int): Size of the archive
+        sources (List[str]): Log files read
+    """
+    day: str
+    archive: str
+    events: int
+    source_bytes: int
+    archive_bytes: int
+    sources: List[str]
+
+    @property
+    def ratio(self) -> float:
+        return self.source_bytes / self.archive_bytes if self.archive_bytes else 0.0
+
+
+class _Encoder:
+    """Appends compressed column blobs to an open archive file."""
+
+    def __init__(self, f):
+        self.f = f
+
+    def blob(self, data: bytes) -> Dict:
+        offset = self.f.tell()
+        compressed = zlib.compress(data, COMPRESSION_LEVEL)
+        self.f.write(compressed)
+        return {'offset': offset, 'length': len(compressed)}
+
+    def array(self, values: np.ndarray) -> Dict:
+        return {**self.blob(values.tobytes()), 'dtype': values.dtype.str}
+
+    def text(self, values: Sequence[Optional[str]]) -> Dict:
+        encoded = [(value or '').encode() for value in values]
+        return {'lengths': self.array(np.array([len(value) for value in encoded], dtype=np.uint32)),
+                'data': self.blob(b''.join(encoded))}
+
+
+def _smallest_unsigned(values: np.ndarray) -> np.ndarray:
+    for dtype in (np.uint8, np.uint16, np.uint32):
+        if not len(values) or values.max() <= np.iinfo(dtype).max:
+            return values.astype(dtype)
+    return values.astype(np.uint64)
+
+
+def write_archive(path: str, events: Iterable[Dict]) -> int:
+    """Writes events to an archive file (replacing it atomically) and returns how many there were."""
+    rows = sorted(((to_micros(event['timestamp']), event) for event in events), key=lambda row: row[0])
+    dictionaries = {column: {} for column in CODED_COLUMNS}
+    hours = defaultdict(list)
+    for micros, event in rows:
+        hours[event['timestamp'][:13]].append((micros, event))
+
+    chunks = []
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(MAGIC)
+        encoder = _Encoder(f)
+        for hour, chunk_rows in hours.items():
+            micros = np.array([row[0] for row in chunk_rows], dtype=np.int64)
+            chunk_events = [row[1] for row in chunk_rows]
+            columns = {'timestamp': encoder.array(_smallest_unsigned(np.diff(micros, prepend=micros[0])))}
+            type_codes = None
+            for column in CODED_COLUMNS:
+                codes = dictionaries[column]
+                values = np.array([NONE if event.get(column) is None else codes.setdefault(event[column], len(codes))
+                                   for event in chunk_events], dtype=np.int32)
+                if column == 'type':
+                    type_codes = sorted(set(values.tolist()))
+                columns[column] = encoder.array(values)
+            for column in ('id', 'message'):
+                columns[column] = encoder.text([event.get(column) for event in chunk_events])
+            columns['data'] = encoder.text([None if event.get('data') is None else json.dumps(event['data'], separators=(',', ':'))
+                                            for event in chunk_events])
+            chunks.append({'hour': hour, 'rows': len(chunk_rows), 'first': int(micros[0]), 'last': int(micros[-1]),
+                           'types': type_codes, 'columns': columns})
+        footer_offset = f.tell()
+        footer = {'version': 1, 'dictionaries': {column: list(codes) for column, codes in dictionaries.items()},
+                  'chunks': chunks}
+        f.write(zlib.compress(json.dumps(footer, separators=(',', ':')).encode()))
+        f.write(TRAILER.pack(footer_offset, MAGIC))
+    os.replace(tmp, path)
+    return len(rows)
+
+
+class LogArchive:
+    """Reader of one archive file.
+
+    Attributes:
+        path (str): Archive file
+        dictionaries (Dict[str, List[str]]): Values of the dictionary-encoded columns
+        chunks (List[dict]): Chunk metadata, one per hour
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a log archive")
+            size = f.seek(0, os.SEEK_END)
+            f.seek(size - TRAILER.size)
+            footer_offset, magic = TRAILER.unpack(f.read(TRAILER.size))
+            if magic != MAGIC:
+                raise ValueError(f"{path} is truncated")
+            f.seek(footer_offset)
+            footer = json.loads(zlib.decompress(f.read(size - TRAILER.size - footer_offset)))
+        self.dictionaries: Dict[str, List[str]] = footer['dictionaries']
+        self.chunks: List[dict] = footer['chunks']
+        self._lookups = {column: np.array(values + [None], dtype=object)  # code -1 reads the trailing None
+                         for column, values in self.dictionaries.items()}
+
+    def __len__(self) -> int:
+        return sum(chunk['rows'] for chunk in self.chunks)
+
+    def hours(self) -> List[str]:
+        return [chunk['hour'] for chunk in self.chunks]
+
+    def _blob(self, f, spec: Dict) -> bytes:
+        f.seek(spec['offset'])
+        return zlib.decompress(f.read(spec['length']))
+
+    def _array(self, f, spec: Dict) -> np.ndarray:
+        return np.frombuffer(self._blob(f, spec), dtype=np.dtype(spec['dtype']))
+
+    def _column(self, f, chunk: dict, column: str):
+        spec = chunk['columns'].get(column)
+        if spec is None:
+            return [None] * chunk['rows']  # Column added after this archive was written
+        if column == 'timestamp':
+            return chunk['first'] + np.cumsum(self._array(f, spec).astype(np.int64))
+        if column in CODED_COLUMNS:
+            return self._array(f, spec).astype(np.int64)
+        lengths = self._array(f, spec['lengths'])
+        data = self._blob(f, spec['data'])
+        ends = np.cumsum(lengths, dtype=np.int64)
+        values = [data[end - length:end].decode() for end, length in zip(ends.tolist(), lengths.tolist())]
+        if column == 'data':
+            return [json.loads(value) if value else None for value in values]
+        return values
+
+    def _code(self, column: str, value: str) -> Optional[int]:
+        try:
+            return self.dictionaries[column].index(value)
+        except ValueError:
+            return None
+
+    def scan(self, columns: Optional[Sequence[str]] = None, event_type: Optional[str] = None,
+             agent_id: Optional[str] = None, task_id: Optional[str] = None, since: Optional[str] = None,
+             until: Optional[str] = None) -> Iterator[Dict[str, list]]:
+        """Streams the matching rows chunk by chunk, as {column: values}.
+
+        Only the filter columns and the requested columns of chunks that can match are
+        decompressed. Timestamps come back as ISO strings and coded columns as their values.
+
+        Args:
+            columns (Sequence[str], optional): Columns to return, all by default
+            event_type, agent_id, task_id (str, optional): Equality filters
+            since (str, optional): ISO timestamp of the earliest row (inclusive)
+            until (str, optional): ISO timestamp of the latest row (exclusive)
+        """
+        columns = list(columns or COLUMNS)
+        unknown = set(columns) - set(COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown columns: {', '.join(sorted(unknown))}")
+        filters = {}
+        for column, value in (('type', event_type), ('agent_id', agent_id), ('task_id', task_id)):
+            if value is not None:
+                code = self._code(column, value)
+                if code is None:
+                    return  # Value never occurs in this archive
+                filters[column] = code
+        start = to_micros(since) if since else None
+        end = to_micros(until) if until else None
+        with open(self.path, 'rb') as f:
+            for chunk in self.chunks:
+                if (start is not None and chunk['last'] < start) or (end is not None and chunk['first'] >= end):
+                    continue
+                if 'type' in filters and filters['type'] not in chunk['types']:
+                    continue
+                decoded = {}
+                mask = np.ones(chunk['rows'], dtype=bool)
+                for column, code in filters.items():
+                    decoded[column] = self._column(f, chunk, column)
+                    mask &= decoded[column] == code
+                if start is not None or end is not None:
+                    decoded['timestamp'] = self._column(f, chunk, 'timestamp')
+                    if start is not None:
+                        mask &= decoded['timestamp'] >= start
+                    if end is not None:
+                        mask &= decoded['timestamp'] < end
+                if not mask.any():
+                    continue
+                rows = np.flatnonzero(mask)
+                batch = {}
+                for column in columns:
+                    values = decoded[column] if column in decoded else self._column(f, chunk, column)
+                    if column == 'timestamp':
+                        batch[column] = [from_micros(value) for value in values[rows]]
+                    elif column in CODED_COLUMNS:
+                        batch[column] = self._lookups[column][values[rows]].tolist()
+                    else:
+                        batch[column] = [values[i] for i in rows.tolist()]
+                yield batch
+
+    def read(self, columns: Optional[Sequence[str]] = None, **filters) -> Iterator[Dict]:
+        """Yields matching rows as dicts; takes the same arguments as `scan`."""
+        for batch in self.scan(columns, **filters):
+            names = list(batch)
+            for values in zip(*(batch[name] for name in names)):
+                yield dict(zip(names, values))
+
+
+def day_sources(log_dir: str, day: str, prefix: str = 'warehouse_logs') -> List[str]:
+    """Log files of one day: the legacy JSON file and the JSON-lines parts."""
+    names = [f"{prefix}_{day}.json", f"{prefix}_{day}.jsonl"]
+    part = 1
+    while os.path.exists(os.path.join(log_dir, f"{prefix}_{day}.{part}.jsonl")):
+        names.append(f"{prefix}_{day}.{part}.jsonl")
+        part += 1
+    return [os.path.join(log_dir, name) for name in names if os.path.exists(os.path.join(log_dir, name))]
+
+
+def _read_source(path: str) -> Iterator[Dict]:
+    if path.endswith('.jsonl'):
+        return read_events(path)
+    with open(path) as f:
+        return iter(json.load(f))  # Legacy pretty-printed list
+
+
+def archive_path(log_dir: str, day: str, prefix: str = 'warehouse_logs') -> str:
+    return os.path.join(log_dir, f"{prefix}_{day}.wla")
+
+
+def is_compacted(archive: str, sources: Sequence[str]) -> bool:
+    """Whether an archive exists and was written after every one of its source files."""
+    if not os.path.exists(archive):
+        return False
+    written = os.path.getmtime(archive)
+    return all(os.path.getmtime(source) <= written for source in sources)
+
+
+def _event_key(event: Dict):
+    """Identity of an event, used to merge sources into an earlier archive without duplicates."""
+    return event.get('id') or (event.get('timestamp'), event.get('type'), event.get('message'))
+
+
+def compact_day(log_dir: str, day: str, delete: bool = False, prefix: str = 'warehouse_logs') -> Optional[CompactionResult]:
+    """Archives one day of logs, optionally deleting the source files afterwards.
+
+    Compaction is idempotent: a day whose archive is newer than its log files is left alone,
+    and when log files kept from an earlier run are compacted again, archived events they
+    still contain are not added twice.
+
+    Returns:
+        Optional[CompactionResult]: None if the day has no logs or its archive is up to date
+    """
+    sources = day_sources(log_dir, day, prefix)
+    archive = archive_path(log_dir, day, prefix)
+    if not sources or is_compacted(archive, sources):
+        return None
+    events = [event for source in sources for event in _read_source(source)]
+    if os.path.exists(archive):
+        # Keep events of an earlier compaction whose log files were deleted since
+        seen = {_event_key(event) for event in events}
+        events.extend(event for event in LogArchive(archive).read() if _event_key(event) not in seen)
+    count = write_archive(archive, events)
+    result = CompactionResult(day, archive, count, sum(os.path.getsize(source) for source in sources),
+                              os.path.getsize(archive), sources)
+    if delete:
+        for source in sources:
+            os.remove(source)
+            if os.path.exists(source + '.idx'):
+                os.remove(source + '.idx')
+    return result
+
+
+def finished_days(log_dir: str, prefix: str = 'warehouse_logs', today: Optional[str] = None) -> List[str]:
+    """Days before today with log files not yet in an up-to-date archive."""
+    today = today or datetime.now().strftime('%Y%m%d')
+    days = set()
+    for name in os.listdir(log_dir):
+        if name.startswith(prefix + '_') and (name.endswith('.json') or name.endswith('.jsonl')):
+            day = name[len(prefix) + 1:len(prefix) + 9]
+            if day.isdigit() and day < today:
+                days.add(day)
+    return sorted(day for day in days
+                  if not is_compacted(archive_path(log_dir, day, prefix), day_sources(log_dir, day, prefix)))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    default_dir = os.path.join(os.path.dirname(__file__), '..', 'data', 'logs')
+    parser = argparse.ArgumentParser(prog='log-archive', description="Compact event logs into columnar archives and query them.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    compact = commands.add_parser('compact', help="Archive every finished day (or the given days)")
+    compact.add_argument('days', nargs='*', help="Days to compact (YYYYMMDD)")
+    compact.add_argument('--dir', default=default_dir, help="Log directory")
+    compact.add_argument('--delete', action='store_true', help="Delete the log files once archived")
+    query = commands.add_parser('query', help="Print matching rows of an archive as JSON lines")
+    query.add_argument('archive')
+    query.add_argument('--columns', help="Comma-separated columns")
+    query.add_argument('--type', dest='event_type')
+    query.add_argument('--agent', dest='agent_id')
+    query.add_argument('--task', dest='task_id')
+    query.add_argument('--since')
+    query.add_argument('--until')
+    args = parser.parse_args(argv)
+
+    if args.command == 'compact':
+        for day in args.days or finished_days(args.dir):
+            result = compact_day(args.dir, day, delete=args.delete)
+            if result is None:
+                print(f"{day}: no logs to compact")
+            else:
+                print(f"{day}: {result.events} events, {result.source_bytes} -> {result.archive_bytes} bytes "
+                      f"({result.ratio:.1f}x) in {os.path.basename(result.archive)}")
+        return 0
+
+    archive = LogArchive(args.archive)
+    columns = args.columns.split(',') if args.columns else None
+    for row in archive.read(columns, event_type=args.event_type, agent_id=args.agent_id,
+                            task_id=args.task_id, since=args.since, until=args.until):
+        print(json.dumps(row))
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,180 @@
+""" Background event logging.
+    Callers hand a compact record tuple to `LogPipeline.submit`, which only appends it to a
+    bounded in-memory queue. A worker thread drains the queue in batches, turns the records
+    into log entries (id, ISO timestamp, ...) and passes each batch to a sink, typically the
+    event log writer. When the queue is full the pipeline drops the new record, drops the
+    oldest queued one, or blocks the caller, depending on its policy.
+"""
+
+import logging
+import threading
+import time
+import uuid
+from collections import deque
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Callable, Deque, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DROP_NEWEST = 'drop_newest'  # Discard the record being submitted
+DROP_OLDEST = 'drop_oldest'  # Discard the oldest queued record to make room
+BLOCK = 'block'              # Wait for room (up to block_timeout), then discard
+POLICIES = (DROP_NEWEST, DROP_OLDEST, BLOCK)
+
+# (unix time, event type, message, agent id, task id, structured data)
+LogRecord = Tuple[float, str, str, Optional[str], Optional[str], Optional[dict]]
+
+# Receives every serialized batch, in submission order
+LogSink = Callable[[List[dict]], None]
+
+
+@dataclass
+class LogPipelineStats:
+    """Log pipeline counters.
+
+    Attributes:
+        submitted (int): Records handed to submit
+        written (int): Records passed to the sink
+        dropped (int): Records discarded because the queue was full
+        batches (int): Sink calls
+        errors (int): Sink calls that raised
+        depth (int): Records queued right now
+        max_depth (int): Highest queue depth seen
+        capacity (int): Queue capacity
+    """
+    submitted: int = 0
+    written: int = 0
+    dropped: int = 0
+    batches: int = 0
+    errors: int = 0
+    depth: int = 0
+    max_depth: int = 0
+    capacity: int = 0
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def to_entry(record: LogRecord) -> dict:
+    """Builds the stored log entry of a record."""
+    created, event_type, message, agent_id, task_id, data = record
+    entry = {
+        'id': str(uuid.uuid4()),
+        'timestamp': datetime.fromtimestamp(created).isoformat(),
+        'type': event_type,
+        'message': message,
+        'agent_id': agent_id,
+        'task_id': task_id
+    }
+    if data is not None:
+        entry['data'] = data
+    return entry
+
+
+class LogPipeline:
+    """Bounded queue of log records drained by a background thread.
+
+    Attributes:
+        sink (LogSink): Where serialized batches go
+        capacity (int): Maximum number of queued records
+        policy (str): One of POLICIES, applied when the queue is full
+        batch_size (int): Maximum records per sink call
+        block_timeout (Optional[float]): Longest wait under the 'block' policy (None waits forever)
+    """
+
+    def __init__(self, sink: LogSink, capacity: int = 10000, policy: str = DROP_NEWEST,
+                 batch_size: int = 256, block_timeout: Optional[float] = 1.0):
+        if policy not in POLICIES:
+            raise ValueError(f"policy must be one of {', '.join(POLICIES)}")
+        if capacity < 1 or batch_size < 1:
+            raise ValueError("capacity and batch_size must be at least 1")
+        self.sink = sink
+        self.capacity = capacity
+        self.policy = policy
+        self.batch_size = batch_size
+        self.block_timeout = block_timeout
+        self._queue: Deque[LogRecord] = deque()
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+        self._idle = threading.Condition(self._lock)
+        self._in_flight = 0
+        self._closed = False
+        self._stats = LogPipelineStats(capacity=capacity)
+        self._thread = threading.Thread(target=self._run, name='log-pipeline', daemon=True)
+        self._thread.start()
+
+    def submit(self, record: LogRecord) -> bool:
+        """Queues a record; returns False if it was dropped (or the pipeline is closed)."""
+        with self._lock:
+            stats = self._stats
+            stats.submitted += 1
+            if self._closed:
+                stats.dropped += 1
+                return False
+            if len(self._queue) >= self.capacity:
+                if self.policy == DROP_OLDEST:
+                    self._queue.popleft()
+                    stats.dropped += 1
+                elif self.policy == BLOCK:
+                    deadline = None if self.block_timeout is None else time.monotonic() + self.block_timeout
+                    while len(self._queue) >= self.capacity and not self._closed:
+                        remaining = None if deadline is None else deadline - time.monotonic()
+                        if remaining is not None and remaining <= 0:
+                            break
+                        self._not_full.wait(remaining)
+                    if len(self._queue) >= self.capacity or self._closed:
+                        stats.dropped += 1
+                        return False
+                else:
+                    stats.dropped += 1
+                    return False
+            self._queue.append(record)
+            stats.max_depth = max(stats.max_depth, len(self._queue))
+            self._not_empty.notify()
+        return True
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                while not self._queue and not self._closed:
+                    self._not_empty.wait()
+                if not self._queue:
+                    return
+                count = min(self.batch_size, len(self._queue))
+                records = [self._queue.popleft() for _ in range(count)]
+                self._in_flight = count
+                self._not_full.notify_all()
+            try:
+                self.sink([to_entry(record) for record in records])
+                failed = False
+            except Exception as e:
+                logger.error(f"Log sink failed on {len(records)} records: {e}")
+                failed = True
+            with self._lock:
+                self._stats.batches += 1
+                self._stats.errors += failed
+                self._stats.written += 0 if failed else len(records)
+                self._in_flight = 0
+                if not self._queue:
+                    self._idle.notify_all()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Waits until every queued record reached the sink; returns False on timeout."""
+        with self._lock:
+            return self._idle.wait_for(lambda: not self._queue and not self._in_flight, timeout)
+
+    def close(self, timeout: Optional[float] = 5.0) -> None:
+        """Stops accepting records, writes out the queued ones and stops the worker."""
+        with self._lock:
+            self._closed = True
+            self._not_empty.notify_all()
+            self._not_full.notify_all()
+        self._thread.join(timeout)
+
+    @property
+    def stats(self) -> LogPipelineStats:
+        """Snapshot of the counters."""
+        with self._lock:
+            return LogPipelineStats(**{**asdict(self._stats), 'depth': len(self._queue)})
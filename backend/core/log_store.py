@@ -0,0 +1,143 @@
+""" Queryable event history.
+    Log entries are inserted in batches into an SQLite database in WAL mode, so queries from
+    request threads run alongside the background writer. Indexes on (type, timestamp),
+    (agent_id, timestamp), (task_id) and (timestamp) keep filtered, time-ranged and paginated
+    queries fast over millions of events.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+COLUMNS = ('id', 'timestamp', 'type', 'message', 'agent_id', 'task_id', 'data')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    seq INTEGER PRIMARY KEY,
+    id TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    type TEXT NOT NULL,
+    message TEXT,
+    agent_id TEXT,
+    task_id TEXT,
+    data TEXT
+);
+CREATE INDEX IF NOT EXISTS events_type_time ON events (type, timestamp);
+CREATE INDEX IF NOT EXISTS events_agent_time ON events (agent_id, timestamp);
+CREATE INDEX IF NOT EXISTS events_task ON events (task_id);
+CREATE INDEX IF NOT EXISTS events_time ON events (timestamp);
+"""
+
+MAX_PAGE = 1000
+
+
+def normalize_time(value: str) -> str:
+    """Returns an ISO timestamp in the stored format, so it compares correctly as text.
+
+    Raises:
+        ValueError: If the value is not an ISO date or date-time
+    """
+    return datetime.fromisoformat(value).isoformat()
+
+
+class LogStore:
+    """SQLite store of log entries.
+
+    Attributes:
+        path (str): Database file
+    """
+
+    def __init__(self, path: str, busy_timeout: float = 5.0):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._write_lock = threading.Lock()
+        self._local = threading.local()
+        self._writer = self._connect()
+        self._writer.execute("PRAGMA journal_mode=WAL")
+        self._writer.execute("PRAGMA synchronous=NORMAL")  # Durable at checkpoints, never corrupt
+        self._writer.executescript(SCHEMA)
+        existing = {row[1] for row in self._writer.execute("PRAGMA table_info(events)")}
+        if 'data' not in existing:
+            self._writer.execute("ALTER TABLE events ADD COLUMN data TEXT")  # Stores created before structured data
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, timeout=self.busy_timeout, check_same_thread=False)
+        connection.row_factory = sqlite3.Row
+        return connection
+
+    def _reader(self) -> sqlite3.Connection:
+        """Connection of the calling thread, for queries."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = self._local.connection = self._connect()
+        return connection
+
+    def insert(self, entries: List[Dict]) -> None:
+        """Inserts a batch of log entries in one transaction."""
+        rows = [tuple(entry.get(column) for column in COLUMNS[:-1])
+                + (None if entry.get('data') is None else json.dumps(entry['data'], separators=(',', ':')),)
+                for entry in entries]
+        with self._write_lock, self._writer:
+            self._writer.executemany(
+                f"INSERT INTO events ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})", rows)
+
+    def query(self, event_type: Optional[str] = None, agent_id: Optional[str] = None,
+              task_id: Optional[str] = None, since: Optional[str] = None, until: Optional[str] = None,
+              limit: Optional[int] = None, offset: int = 0, newest_first: bool = False) -> List[Dict]:
+        """Returns log entries matching every given filter, in time order.
+
+        Args:
+            event_type (str, optional): Filter by event type
+            agent_id (str, optional): Filter by agent ID
+            task_id (str, optional): Filter by task ID
+            since (str, optional): ISO timestamp of the earliest entry (inclusive)
+            until (str, optional): ISO timestamp of the latest entry (exclusive)
+            limit (int, optional): Maximum number of entries returned
+            offset (int): Number of matching entries skipped
+            newest_first (bool): Return the latest entries first
+
+        Returns:
+            List[dict]: Matching log entries
+
+        Raises:
+            ValueError: If a timestamp is not ISO formatted or limit/offset is negative
+        """
+        if (limit is not None and limit < 0) or offset < 0:
+            raise ValueError("limit and offset cannot be negative")
+        clauses, params = [], []
+        for column, value in (('type', event_type), ('agent_id', agent_id), ('task_id', task_id)):
+            if value:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if since:
+            clauses.append("timestamp >= ?")
+            params.append(normalize_time(since))
+        if until:
+            clauses.append("timestamp < ?")
+            params.append(normalize_time(until))
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        direction = "DESC" if newest_first else "ASC"
+        sql = (f"SELECT {', '.join(COLUMNS)} FROM events {where} "
+               f"ORDER BY timestamp {direction}, seq {direction} LIMIT ? OFFSET ?")
+        params.extend([-1 if limit is None else limit, offset])
+        logs = []
+        for row in self._reader().execute(sql, params):
+            log = dict(row)
+            log['data'] = None if log['data'] is None else json.loads(log['data'])
+            logs.append(log)
+        return logs
+
+    def count(self) -> int:
+        return self._reader().execute("SELECT COUNT(*) FROM events").fetchone()[0]
+
+    def close(self) -> None:
+        with self._write_lock:
+            self._writer.close()
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
@@ -0,0 +1,332 @@
+""" Compiled binary form of map.json (and lookup_table.json) for fast startup.
+    `compile_map` runs the sources through the validation stage and writes a single file with the node arrays,
+    the CSR edges, the rack and shelf tables, the lookup-table indexes and a SHA-256 of the
+    sources. `MapArtifact.open` maps that file into memory and exposes every section as a typed
+    memoryview, so a worker restart costs a few page faults instead of a JSON parse.
+
+    Usage:
+        python -m core.map_artifact data/map.json --lookup data/lookup_table.json
+"""
+
+import argparse
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+from typing import Dict, List, Optional, Tuple
+from core.graph import METRICS, Graph
+from core.map_validation import FLAG_GOAL, FLAG_LOCKED, NODE_TYPES, MapValidationError, normalize_map, validate_map
+from core.types import NodeType
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'SWMAPBIN'
+FORMAT_VERSION = 1
+# magic, format version, little-endian flag, source hash, section count
+HEADER = struct.Struct('<8sHBx32sI')
+# section name, array typecode, byte offset, item count
+SECTION = struct.Struct('<8sc3xQQ')
+ALIGNMENT = 8
+
+
+def source_hash(map_path: str, lookup_path: Optional[str] = None) -> bytes:
+    """Returns the SHA-256 digest of the map source (and lookup table, if any)."""
+    digest = hashlib.sha256()
+    with open(map_path, 'rb') as f:
+        digest.update(f.read())
+    if lookup_path is not None:
+        digest.update(b'\0')
+        with open(lookup_path, 'rb') as f:
+            digest.update(f.read())
+    return digest.digest()
+
+
+def default_artifact_path(map_path: str) -> str:
+    """Returns the artifact path used for a map source (map.json -> map.bin)."""
+    return os.path.splitext(map_path)[0] + '.bin'
+
+
+def _strings(values: List[str]) -> Tuple[array, array]:
+    """Packs strings into an offsets array and one UTF-8 blob."""
+    offsets, blob = array('I', [0]), bytearray()
+    for value in values:
+        blob += value.encode('utf-8')
+        offsets.append(len(blob))
+    return offsets, array('B', bytes(blob))
+
+
+def compile_map(map_path: str, lookup_path: Optional[str] = None, output_path: Optional[str] = None,
+                metric: str = 'euclidean', shelves_per_rack: int = 3, track_memory: bool = False) -> str:
+    """Validates the map sources and writes the binary artifact.
+
+    The sources go through the validation stage first: any error aborts the compilation with
+    the full report, and the artifact is written from the normalized layout (warnings are
+    logged, not fatal).
+
+    Args:
+        map_path (str): Path to map.json
+        lookup_path (Optional[str]): Path to lookup_table.json
+        output_path (Optional[str]): Artifact path, defaults to the map path with a .bin suffix
+        metric (str): Edge weight metric ('euclidean', 'manhattan' or 'hops')
+        shelves_per_rack (int): Shelves created for racks that do not list their own
+        track_memory (bool): Measure and log the peak memory of the validation pass
+
+    Returns:
+        str: Path of the written artifact
+
+    Raises:
+        MapValidationError: If the sources have errors
+    """
+    if metric not in METRICS:
+        raise ValueError(f"Unsupported metric '{metric}'. Use one of {', '.join(METRICS)}.")
+    output_path = output_path or default_artifact_path(map_path)
+    digest = source_hash(map_path, lookup_path)
+    normalized, report = normalize_map(map_path, lookup_path, track_memory)
+    logger.log(logging.WARNING if report.warnings else logging.INFO, report.summary(limit=5))
+    names = normalized.names
+    index = {name: i for i, name in enumerate(names)}
+
+    # Racks and shelves
+    rack_ids = list(normalized.racks)
+    rack_coords, capacity, frozen = array('d'), array('d'), array('B')
+    shelf_ids, shelf_rack, shelf_z = [], array('I'), array('d')
+    for r, rack_id in enumerate(rack_ids):
+        info = normalized.racks[rack_id]
+        for key in ('start_cords', 'center_cords', 'end_cords'):
+            rack_coords.extend(float(v) for v in info[key])
+        capacity.append(float(info.get('current_capacity', 0.0)))
+        frozen.append(1 if info.get('is_frozen') else 0)
+        shelves = info.get('shelves') or [f"{rack_id}_shelf_{level + 1}" for level in range(shelves_per_rack)]
+        for level, shelf_id in enumerate(shelves):
+            shelf_ids.append(shelf_id)
+            shelf_rack.append(r)
+            shelf_z.append(float(level + 1))
+
+    # Lookup table: rack side -> access nodes
+    sides = list(normalized.lookup)
+    lookup_offsets, lookup_nodes = array('I', [0]), array('I')
+    for side in sides:
+        lookup_nodes.extend(index[name] for name in normalized.lookup[side])
+        lookup_offsets.append(len(lookup_nodes))
+
+    string_offsets, string_data = _strings(names + rack_ids + shelf_ids + sides)
+    sections = {
+        'node_x': normalized.xs, 'node_y': normalized.ys, 'node_h': normalized.heuristics,
+        'node_typ': normalized.types, 'node_flg': normalized.flags,
+        'edge_off': normalized.offsets, 'edge_tgt': normalized.targets, 'edge_wt': normalized.edge_weights(metric),
+        'rack_crd': rack_coords, 'rack_cap': capacity, 'rack_frz': frozen,
+        'shlf_rck': shelf_rack, 'shlf_z': shelf_z,
+        'look_off': lookup_offsets, 'look_nod': lookup_nodes,
+        'str_off': string_offsets, 'str_data': string_data,
+        'metric': array('B', metric.encode('ascii')),
+    }
+    _write(output_path, digest, sections)
+    return output_path
+
+
+def _write(path: str, digest: bytes, sections: Dict[str, array]) -> None:
+    """Writes the sections to a temporary file and swaps it in, so readers never see a partial file."""
+    directory_end = HEADER.size + SECTION.size * len(sections)
+    offset = -(-directory_end // ALIGNMENT) * ALIGNMENT
+    entries, payload = [], bytearray()
+    for name, values in sections.items():
+        entries.append(SECTION.pack(name.encode('ascii'), values.typecode.encode('ascii'), offset + len(payload), len(values)))
+        payload += values.tobytes()
+        payload += b'\0' * (-len(payload) % ALIGNMENT)
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, sys.byteorder == 'little', digest, len(sections)))
+        f.writelines(entries)
+        f.write(b'\0' * (offset - directory_end))
+        f.write(payload)
+    os.replace(tmp_path, path)
+
+
+class MapArtifact:
+    """Read-only view of a compiled map, backed by a memory-mapped file.
+
+    Attributes:
+        path (str): Artifact file
+        source_hash (bytes): SHA-256 of the sources the artifact was compiled from
+        arrays (Dict[str, memoryview]): Typed views over every section
+        metric (str): Metric the edge weights were compiled with
+    """
+
+    def __init__(self, path: str, buffer: mmap.mmap, source_hash: bytes, arrays: Dict[str, memoryview]):
+        self.path = path
+        self.source_hash = source_hash
+        self.arrays = arrays
+        self.metric = bytes(arrays['metric']).decode('ascii')
+        self._buffer = buffer
+        self._strings: Optional[List[str]] = None
+
+    @classmethod
+    def open(cls, path: str) -> 'MapArtifact':
+        """Maps an artifact into memory.
+
+        Raises:
+            ValueError: If the file is not an artifact of this format version and byte order
+        """
+        with open(path, 'rb') as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if len(buffer) < HEADER.size:
+                raise ValueError(f"{path} is too short to be a map artifact")
+            magic, version, little_endian, digest, count = HEADER.unpack_from(buffer, 0)
+            if magic != MAGIC or version != FORMAT_VERSION:
+                raise ValueError(f"{path} is not a version {FORMAT_VERSION} map artifact")
+            if bool(little_endian) != (sys.byteorder == 'little'):
+                raise ValueError(f"{path} was compiled on a machine with a different byte order")
+            view = memoryview(buffer)
+            arrays = {}
+            for k in range(count):
+                name, typecode, offset, length = SECTION.unpack_from(buffer, HEADER.size + k * SECTION.size)
+                typecode = typecode.decode('ascii')
+                end = offset + length * array(typecode).itemsize
+                if end > len(buffer):
+                    raise ValueError(f"{path} is truncated")
+                arrays[name.rstrip(b'\0').decode('ascii')] = view[offset:end].cast(typecode)
+        except (ValueError, struct.error):
+            buffer.close()
+            raise
+        return cls(path, buffer, digest, arrays)
+
+    def close(self) -> None:
+        """Releases the views and unmaps the file."""
+        for values in self.arrays.values():
+            values.release()
+        self.arrays = {}
+        self._buffer.close()
+
+    def __enter__(self) -> 'MapArtifact':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    @property
+    def node_count(self) -> int:
+        return len(self.arrays['node_x'])
+
+    @property
+    def rack_count(self) -> int:
+        return len(self.arrays['rack_cap'])
+
+    @property
+    def shelf_count(self) -> int:
+        return len(self.arrays['shlf_rck'])
+
+    def strings(self) -> List[str]:
+        """Returns the string pool: node names, then rack ids, shelf ids and lookup sides."""
+        if self._strings is None:
+            offsets, data = self.arrays['str_off'], self.arrays['str_data'].tobytes()
+            self._strings = [data[offsets[k]:offsets[k + 1]].decode('utf-8') for k in range(len(offsets) - 1)]
+        return self._strings
+
+    def node_names(self) -> List[str]:
+        return self.strings()[:self.node_count]
+
+    def rack_ids(self) -> List[str]:
+        start = self.node_count
+        return self.strings()[start:start + self.rack_count]
+
+    def shelf_ids(self) -> List[str]:
+        start = self.node_count + self.rack_count
+        return self.strings()[start:start + self.shelf_count]
+
+    def lookup_sides(self) -> List[str]:
+        return self.strings()[self.node_count + self.rack_count + self.shelf_count:]
+
+    def node_type(self, i: int) -> NodeType:
+        return NODE_TYPES[self.arrays['node_typ'][i]]
+
+    def node_flags(self, i: int) -> Tuple[bool, bool]:
+        """Returns the (locked, is_goal) flags of node i."""
+        flags = self.arrays['node_flg'][i]
+        return bool(flags & FLAG_LOCKED), bool(flags & FLAG_GOAL)
+
+    def rack_coords(self, r: int) -> List[Tuple[float, float]]:
+        """Returns the start, center and end coordinates of rack r."""
+        coords = self.arrays['rack_crd']
+        return [(coords[6 * r + 2 * k], coords[6 * r + 2 * k + 1]) for k in range(3)]
+
+    def lookup_table(self) -> Dict[str, List[str]]:
+        """Returns the rack side -> access node names table."""
+        offsets, nodes, names = self.arrays['look_off'], self.arrays['look_nod'], self.node_names()
+        return {side: [names[j] for j in nodes[offsets[k]:offsets[k + 1]]] for k, side in enumerate(self.lookup_sides())}
+
+    def graph(self, nodes=None) -> Graph:
+        """Returns a Graph reading coordinates and edges straight from the mapped arrays."""
+        a = self.arrays
+        locked = [self.node_flags(i)[0] for i in range(self.node_count)]
+        return Graph(self.node_names(), a['node_x'], a['node_y'], a['edge_off'], a['edge_tgt'], a['edge_wt'],
+                     locked=locked, nodes=nodes, metric=self.metric)
+
+
+def load_map(map_path: str, lookup_path: Optional[str] = None, artifact_path: Optional[str] = None,
+             **compile_options) -> MapArtifact:
+    """Opens the compiled map, recompiling it first if it is missing or its source hash is stale.
+
+    Args:
+        map_path (str): Path to map.json
+        lookup_path (Optional[str]): Path to lookup_table.json
+        artifact_path (Optional[str]): Artifact path, defaults to the map path with a .bin suffix
+        **compile_options: Passed to compile_map when a recompilation is needed
+
+    Returns:
+        MapArtifact: The mapped artifact
+    """
+    artifact_path = artifact_path or default_artifact_path(map_path)
+    digest = source_hash(map_path, lookup_path)
+    if os.path.exists(artifact_path):
+        try:
+            artifact = MapArtifact.open(artifact_path)
+            if artifact.source_hash == digest:
+                return artifact
+            artifact.close()
+            logger.info(f"{artifact_path} is stale, recompiling")
+        except ValueError as e:
+            logger.warning(f"Ignoring unreadable map artifact: {e}")
+    compile_map(map_path, lookup_path, artifact_path, **compile_options)
+    return MapArtifact.open(artifact_path)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='compile-map', description="Compile map.json into a binary map artifact.")
+    parser.add_argument('map', help="Path to map.json")
+    parser.add_argument('--lookup', help="Path to lookup_table.json")
+    parser.add_argument('-o', '--output', help="Artifact path (default: next to the map, with a .bin suffix)")
+    parser.add_argument('--metric', choices=METRICS, default='euclidean', help="Edge weight metric")
+    parser.add_argument('--check', action='store_true', help="Only validate the sources and print every problem")
+    parser.add_argument('--memory', action='store_true', help="Report the peak memory of the load")
+    args = parser.parse_args(argv)
+
+    if args.check:
+        _, report = validate_map(args.map, args.lookup, track_memory=args.memory)
+        print(report.summary(limit=len(report.issues)))
+        return 0 if report.ok else 1
+
+    try:
+        started = time.perf_counter()
+        path = compile_map(args.map, args.lookup, args.output, metric=args.metric, track_memory=args.memory)
+        with MapArtifact.open(path) as artifact:
+            print(f"Compiled {artifact.node_count} nodes, {len(artifact.arrays['edge_tgt'])} edges, "
+                  f"{artifact.rack_count} racks into {path} in {(time.perf_counter() - started) * 1000:.1f} ms "
+                  f"(sha256 {artifact.source_hash.hex()[:12]})")
+    except MapValidationError as e:
+        print(f"compile-map: {e.report.summary()}", file=sys.stderr)
+        return 1
+    except (OSError, ValueError) as e:
+        print(f"compile-map: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(main())
@@ -0,0 +1,284 @@
+""" Incremental reader for the map sources.
+    The map files are a top-level object of sections ("nodes", "racks", ...), each an object of
+    small records. `iter_sections` walks that structure with chunked reads and hands
+    out one (section, key, record) triple at a time, so a layout is never held in memory as one
+    parsed dict. `ColumnBuffer` gives the consumer preallocated typed arrays to fill.
+"""
+
+import json
+import os
+import time
+import tracemalloc
+from array import array
+from dataclasses import dataclass
+from typing import Callable, Iterator, Optional, Tuple
+
+MERGE_MARKERS = ('<<<<<<<', '=======', '>>>>>>>')
+CHUNK_SIZE = 1 << 16
+BYTES_PER_NODE = 220  # Rough size of a pretty-printed node record, used to size the arrays up front
+EDGES_PER_NODE = 8
+
+
+class MapStreamError(ValueError):
+    """Raised when a source cannot be read as a map (bad JSON or merge markers).
+
+    Attributes:
+        code (str): "invalid_json" or "merge_marker"
+        line (int): 1-based line of the problem
+    """
+
+    def __init__(self, code: str, line: int, message: str):
+        super().__init__(f"line {line}: {message}")
+        self.code = code
+        self.line = line
+        self.message = message
+
+
+class _Reader:
+    """Chunked character buffer with JSON value decoding on top of it."""
+
+    def __init__(self, f, on_marker: Callable[[int, str], None]):
+        self.f = f
+        self.on_marker = on_marker
+        self.decoder = json.JSONDecoder()
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+        self.lines_before = 0  # Newlines in the part of the buffer already dropped
+        self.read_lines = 0    # Newlines read from the file so far
+        self.partial = ''      # Unterminated last line of the previous chunk, for marker checks
+        self.bytes_read = 0
+
+    def line(self) -> int:
+        return self.lines_before + self.buf.count('\n', 0, self.pos) + 1
+
+    def _fill(self) -> bool:
+        if self.eof:
+            return False
+        # Read at least as much as is pending, so re-decoding a long value stays linear overall
+        chunk = self.f.read(max(CHUNK_SIZE, len(self.buf) - self.pos))
+        if not chunk:
+            self.eof = True
+            if self.partial.startswith(MERGE_MARKERS):
+                self.on_marker(self.read_lines + 1, self.partial.strip())
+            return False
+        self._scan(chunk)
+        if self.pos > CHUNK_SIZE:
+            self.lines_before += self.buf.count('\n', 0, self.pos)
+            self.buf = self.buf[self.pos:]
+            self.pos = 0
+        self.buf += chunk
+        return True
+
+    def _scan(self, chunk: str) -> None:
+        """Counts the lines of a chunk and reports the merge markers in it."""
+        self.bytes_read += len(chunk)
+        lines = (self.partial + chunk).split('\n')
+        self.partial = lines.pop()
+        for line in lines:
+            self.read_lines += 1
+            if line.startswith(MERGE_MARKERS):
+                self.on_marker(self.read_lines, line.strip())
+
+    def drain(self) -> None:
+        """Reads the rest of the file for its merge markers only, without buffering it."""
+        while not self.eof:
+            chunk = self.f.read(CHUNK_SIZE)
+            if not chunk:
+                self._fill()
+            else:
+                self._scan(chunk)
+
+    def peek(self) -> str:
+        """Returns the next non-whitespace character without consuming it ('' at the end)."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in ' \t\r\n':
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ''
+
+    def expect(self, chars: str) -> str:
+        char = self.peek()
+        if not char or char not in chars:
+            found = repr(char) if char else 'end of file'
+            raise MapStreamError('invalid_json', self.line(), f"Expected {' or '.join(map(repr, chars))}, found {found}")
+        self.pos += 1
+        return char
+
+    def value(self):
+        """Decodes the next JSON value, reading more of the file while it is incomplete."""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError as e:
+                if self._fill():
+                    continue
+                raise MapStreamError('invalid_json', self.line(), e.msg) from None
+            if end == len(self.buf) and not self.eof and isinstance(value, (int, float)):
+                # A number may continue in the next chunk
+                if self._fill():
+                    continue
+            self.pos = end
+            return value
+
+
+def iter_sections(path: str, on_marker: Optional[Callable[[int, str], None]] = None) -> Iterator[Tuple[str, str, object]]:
+    """Yields (section, key, record) for every entry of the top-level sections of a map file.
+
+    Sections whose value is not an object are yielded once with an empty key.
+
+    Args:
+        path (str): Source file
+        on_marker (optional): Called with (line, text) for every merge marker line; if not
+            given, the first marker raises
+
+    Raises:
+        MapStreamError: If the file is not valid JSON of the expected shape
+    """
+    markers = []
+
+    def marker(line: int, text: str):
+        markers.append((line, text))
+        if on_marker is not None:
+            on_marker(line, text)
+
+    with open(path, 'r') as f:
+        reader = _Reader(f, marker)
+        try:
+            reader.expect('{')
+            if reader.peek() == '}':
+                return
+            while True:
+                section = reader.value()
+                if not isinstance(section, str):
+                    raise MapStreamError('invalid_json', reader.line(), "Expected a section name")
+                reader.expect(':')
+                if reader.peek() == '{':
+                    reader.expect('{')
+                    if reader.peek() != '}':
+                        while True:
+                            key = reader.value()
+                            if not isinstance(key, str):
+                                raise MapStreamError('invalid_json', reader.line(), f"Expected a key in '{section}'")
+                            reader.expect(':')
+                            yield section, key, reader.value()
+                            if reader.expect(',}') == '}':
+                                break
+                    else:
+                        reader.expect('}')
+                else:
+                    yield section, '', reader.value()
+                if reader.expect(',}') == '}':
+                    break
+            if reader.peek():
+                raise MapStreamError('invalid_json', reader.line(), "Extra data after the top-level object")
+        except MapStreamError:
+            # A merge marker is the likely cause of a parse error; finish scanning to find them all
+            reader.drain()
+            if not markers:
+                raise
+            if on_marker is None:
+                line, text = markers[0]
+                raise MapStreamError('merge_marker', line, f"Unresolved merge marker '{text}'") from None
+
+
+class ColumnBuffer:
+    """Typed array allocated up front and grown by doubling, written by index or appended to.
+
+    Attributes:
+        typecode (str): array typecode
+        size (int): Number of slots in use
+    """
+
+    def __init__(self, typecode: str, capacity: int):
+        self.typecode = typecode
+        self.size = 0
+        self._data = array(typecode, bytes(array(typecode).itemsize * max(capacity, 1)))
+
+    def _reserve(self, size: int) -> None:
+        capacity = len(self._data)
+        if size > capacity:
+            self._data.extend(array(self.typecode, bytes(self._data.itemsize * max(capacity, size - capacity))))
+
+    def append(self, value) -> None:
+        self._reserve(self.size + 1)
+        self._data[self.size] = value
+        self.size += 1
+
+    def set(self, i: int, value) -> None:
+        """Writes slot i, growing the buffer (zero-filled) if needed."""
+        if i >= self.size:
+            self._reserve(i + 1)
+            self.size = i + 1
+        self._data[i] = value
+
+    def __getitem__(self, i: int):
+        return self._data[i]
+
+    def __len__(self) -> int:
+        return self.size
+
+    def finish(self) -> array:
+        """Trims the unused capacity and returns the array."""
+        del self._data[self.size:]
+        return self._data
+
+
+def estimate_nodes(path: str) -> int:
+    """Guesses the node count of a map file from its size."""
+    return max(os.path.getsize(path) // BYTES_PER_NODE, 16)
+
+
+@dataclass
+class LoadStats:
+    """Cost of streaming a map in.
+
+    Attributes:
+        bytes_read (int): Source bytes read
+        elapsed (float): Wall-clock time in seconds
+        peak_memory (Optional[int]): Peak traced Python allocations in bytes, if tracked
+    """
+    bytes_read: int = 0
+    elapsed: float = 0.0
+    peak_memory: Optional[int] = None
+
+
+class MemoryTracker:
+    """Context manager measuring peak Python allocations with tracemalloc.
+
+    If tracemalloc is already running, its peak is reset and the tracer is left running.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.peak: Optional[int] = None
+        self._started = False
+        self._baseline = 0
+        self._start_time = 0.0
+        self.elapsed = 0.0
+
+    def __enter__(self) -> 'MemoryTracker':
+        if self.enabled:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started = True
+            tracemalloc.reset_peak()
+            self._baseline = tracemalloc.get_traced_memory()[0]
+        self._start_time = time.perf_counter()
+        return self
+
+    def current(self) -> Optional[int]:
+        """Returns the allocations made since entering, or None when not tracking."""
+        if not self.enabled:
+            return None
+        return tracemalloc.get_traced_memory()[0] - self._baseline
+
+    def __exit__(self, *exc) -> None:
+        self.elapsed = time.perf_counter() - self._start_time
+        if self.enabled:
+            self.peak = tracemalloc.get_traced_memory()[1] - self._baseline
+            if self._started:
+                tracemalloc.stop()
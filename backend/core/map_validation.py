@@ -0,0 +1,438 @@
+""" Validation stage of the map-loading pipeline.
+    `validate_map` streams map.json (and lookup_table.json) in a single pass, collects every
+    problem it finds instead of stopping at the first one, and produces the normalized layout the
+    compiler and every path planning engine work from: known neighbours only, symmetric edges, no
+    self-loops and node types resolved to NodeType. Node data goes straight into preallocated
+    typed arrays; the raw JSON is never held as one dict.
+"""
+
+import os
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional, Tuple
+from core.graph import Graph
+from core.map_stream import (EDGES_PER_NODE, ColumnBuffer, LoadStats, MapStreamError, MemoryTracker,
+                             estimate_nodes, iter_sections)
+from core.types import NODE_TYPES, NodeType
+
+FLAG_LOCKED = 1
+FLAG_GOAL = 2
+
+ERROR = 'error'
+WARNING = 'warning'
+
+# Problems that normalization cannot repair; anything else is fixed up and reported as a warning.
+ERROR_CODES = {
+    'merge_marker', 'invalid_json', 'missing_section', 'missing_field', 'invalid_type',
+    'unknown_neighbour', 'duplicate_node', 'duplicate_coordinates', 'unknown_lookup_node', 'invalid_rack',
+}
+
+
+@dataclass
+class MapIssue:
+    """A single problem found in a map source.
+
+    Attributes:
+        code (str): Machine-readable problem kind (e.g. "asymmetric_edge")
+        subject (str): Node, rack side or source line the problem is about
+        message (str): Human-readable description
+    """
+    code: str
+    subject: str
+    message: str
+
+    @property
+    def severity(self) -> str:
+        return ERROR if self.code in ERROR_CODES else WARNING
+
+
+@dataclass
+class ValidationReport:
+    """Every problem found while validating a map.
+
+    Attributes:
+        sources (List[str]): Files that were validated
+        issues (List[MapIssue]): Problems in the order they were found
+        node_count (int): Nodes in the normalized map
+        edge_count (int): Directed edges in the normalized map
+        load (Optional[LoadStats]): Bytes read, time taken and peak memory of the pass
+    """
+    sources: List[str]
+    issues: List[MapIssue] = field(default_factory=list)
+    node_count: int = 0
+    edge_count: int = 0
+    load: Optional[LoadStats] = None
+
+    def add(self, code: str, subject: str, message: str) -> None:
+        self.issues.append(MapIssue(code, subject, message))
+
+    @property
+    def errors(self) -> List[MapIssue]:
+        return [issue for issue in self.issues if issue.severity == ERROR]
+
+    @property
+    def warnings(self) -> List[MapIssue]:
+        return [issue for issue in self.issues if issue.severity == WARNING]
+
+    @property
+    def ok(self) -> bool:
+        """Whether the map can be compiled (warnings allowed)."""
+        return not self.errors
+
+    def counts(self) -> Dict[str, int]:
+        """Returns the number of issues per code."""
+        return dict(Counter(issue.code for issue in self.issues))
+
+    def summary(self, limit: int = 20) -> str:
+        """Returns a readable report listing up to `limit` issues."""
+        lines = [f"{', '.join(self.sources)}: {len(self.errors)} error(s), {len(self.warnings)} warning(s)"]
+        if self.load is not None:
+            peak = f", peak {self.load.peak_memory / 2 ** 20:.1f} MiB" if self.load.peak_memory is not None else ""
+            lines.append(f"  {self.node_count} nodes, {self.edge_count} edges, "
+                         f"{self.load.bytes_read / 2 ** 20:.1f} MiB read in {self.load.elapsed * 1000:.0f} ms{peak}")
+        for code, n in sorted(self.counts().items()):
+            lines.append(f"  {code}: {n}")
+        for issue in (self.errors + self.warnings)[:limit]:
+            lines.append(f"  [{issue.severity}] {issue.subject}: {issue.message}")
+        if len(self.issues) > limit:
+            lines.append(f"  ... {len(self.issues) - limit} more")
+        return '\n'.join(lines)
+
+    def to_dict(self) -> dict:
+        return {
+            "sources": self.sources,
+            "ok": self.ok,
+            "node_count": self.node_count,
+            "edge_count": self.edge_count,
+            "counts": self.counts(),
+            "load": asdict(self.load) if self.load is not None else None,
+            "issues": [{"severity": i.severity, "code": i.code, "subject": i.subject, "message": i.message}
+                       for i in self.issues],
+        }
+
+
+class MapValidationError(ValueError):
+    """Raised when a map has problems normalization cannot repair."""
+
+    def __init__(self, report: ValidationReport):
+        super().__init__(report.summary())
+        self.report = report
+
+
+@dataclass
+class NormalizedMap:
+    """A validated layout in array form, ready to be compiled.
+
+    Node i has name names[i]; its neighbours are targets[offsets[i]:offsets[i + 1]], sorted and
+    symmetric.
+
+    Attributes:
+        names (List[str]): Node names, in source order
+        xs (array): X coordinate per node
+        ys (array): Y coordinate per node
+        heuristics (array): Stored heuristic value per node
+        types (array): Index into NODE_TYPES per node
+        flags (array): FLAG_LOCKED / FLAG_GOAL bits per node
+        offsets (array): Start of each node's neighbour slice (length n + 1)
+        targets (array): Neighbour indices
+        racks (Dict[str, dict]): Rack records as found in map.json
+        lookup (Dict[str, List[str]]): Access node names per rack side
+    """
+    names: List[str]
+    xs: array
+    ys: array
+    heuristics: array
+    types: array
+    flags: array
+    offsets: array
+    targets: array
+    racks: Dict[str, dict]
+    lookup: Dict[str, List[str]]
+
+    @property
+    def node_count(self) -> int:
+        return len(self.names)
+
+    @property
+    def nodes(self) -> Dict[str, dict]:
+        """Node records keyed by name (x, y, type, locked, is_goal, heuristic, neighbours).
+
+        Builds a dict per node, so it is meant for small layouts and legacy callers.
+        """
+        names, offsets, targets = self.names, self.offsets, self.targets
+        return {
+            name: {
+                'x': _number(self.xs[i]),
+                'y': _number(self.ys[i]),
+                'type': NODE_TYPES[self.types[i]],
+                'locked': bool(self.flags[i] & FLAG_LOCKED),
+                'is_goal': bool(self.flags[i] & FLAG_GOAL),
+                'heuristic': _number(self.heuristics[i]),
+                'neighbours': [names[j] for j in targets[offsets[i]:offsets[i + 1]]],
+            }
+            for i, name in enumerate(names)
+        }
+
+    def edge_weights(self, metric: str = 'euclidean') -> array:
+        """Returns the weight of every edge, in `targets` order."""
+        xs, ys, offsets, targets = self.xs, self.ys, self.offsets, self.targets
+        weights = array('d', bytes(8 * len(targets)))
+        for i in range(self.node_count):
+            for e in range(offsets[i], offsets[i + 1]):
+                j = targets[e]
+                weights[e] = Graph._edge_weight(metric, xs[i], ys[i], xs[j], ys[j])
+        return weights
+
+    def graph(self, metric: str = 'euclidean') -> Graph:
+        """Returns the normalized layout as an indexed graph."""
+        locked = [bool(f & FLAG_LOCKED) for f in self.flags]
+        return Graph(self.names, self.xs, self.ys, self.offsets, self.targets, self.edge_weights(metric),
+                     locked=locked, metric=metric)
+
+
+def _number(value: float):
+    return int(value) if value.is_integer() else value
+
+
+def _is_pair(value) -> bool:
+    return isinstance(value, (list, tuple)) and len(value) == 2 and all(isinstance(v, (int, float)) for v in value)
+
+
+def _csr(count: int, sources: array, targets: array) -> Tuple[array, array]:
+    """Groups edges by source (counting sort) and sorts and deduplicates every row."""
+    degree = array('I', bytes(4 * (count + 1)))
+    for a in sources:
+        degree[a + 1] += 1
+    for i in range(count):
+        degree[i + 1] += degree[i]
+    fill = array('I', degree)
+    grouped = array('I', bytes(4 * len(sources)))
+    for a, b in zip(sources, targets):
+        grouped[fill[a]] = b
+        fill[a] += 1
+
+    offsets, out = array('I', [0]), array('I')
+    for i in range(count):
+        out.extend(sorted(set(grouped[degree[i]:degree[i + 1]])))
+        offsets.append(len(out))
+    return offsets, out
+
+
+class _NodeStream:
+    """Consumes node records one at a time into preallocated columns."""
+
+    def __init__(self, capacity: int, report: ValidationReport):
+        self.report = report
+        self.index: Dict[str, int] = {}   # Name -> id, ids handed out on first sight
+        self.names: List[str] = []
+        self.rank = ColumnBuffer('i', capacity)  # Id -> position in the source, -1 until defined
+        self.order = ColumnBuffer('I', capacity)  # Position in the source -> id
+        self.xs = ColumnBuffer('d', capacity)
+        self.ys = ColumnBuffer('d', capacity)
+        self.heuristics = ColumnBuffer('d', capacity)
+        self.types = ColumnBuffer('B', capacity)
+        self.flags = ColumnBuffer('B', capacity)
+        self.sources = ColumnBuffer('I', capacity * EDGES_PER_NODE)
+        self.targets = ColumnBuffer('I', capacity * EDGES_PER_NODE)
+        self.positions: Dict[Tuple[float, float], str] = {}
+
+    def _id(self, name: str) -> int:
+        i = self.index.get(name)
+        if i is None:
+            i = len(self.names)
+            self.index[name] = i
+            self.names.append(name)
+            self.rank.set(i, -1)
+        return i
+
+    def add(self, name: str, info) -> None:
+        report = self.report
+        if not isinstance(info, dict):
+            report.add('missing_field', name, "Node record is not an object")
+            return
+        if not isinstance(info.get('x'), (int, float)) or not isinstance(info.get('y'), (int, float)):
+            report.add('missing_field', name, "Missing or non-numeric coordinates")
+            return
+        i = self._id(name)
+        if self.rank[i] >= 0:
+            report.add('duplicate_node', name, "Defined more than once")
+            return
+        self.rank.set(i, len(self.order))
+        self.order.append(i)
+
+        position = (info['x'], info['y'])
+        if position in self.positions:
+            report.add('duplicate_coordinates', name, f"Same position {position} as {self.positions[position]}")
+        else:
+            self.positions[position] = name
+        raw_type = info.get('type')
+        try:
+            node_type = NodeType.NORMAL if raw_type is None else NodeType[str(raw_type).upper()]
+        except KeyError:
+            report.add('invalid_type', name, f"Unknown node type '{raw_type}'")
+            node_type = NodeType.NORMAL
+        heuristic = info.get('heuristic', 0)
+
+        self.xs.set(i, float(info['x']))
+        self.ys.set(i, float(info['y']))
+        self.heuristics.set(i, float(heuristic) if isinstance(heuristic, (int, float)) else 0.0)
+        self.types.set(i, NODE_TYPES.index(node_type))
+        self.flags.set(i, (FLAG_LOCKED if info.get('locked') else 0) | (FLAG_GOAL if info.get('is_goal') else 0))
+
+        seen = set()
+        for neighbour in info.get('neighbours', []):
+            if neighbour == name:
+                report.add('self_loop', name, "Lists itself as a neighbour (dropped)")
+            elif neighbour in seen:
+                report.add('duplicate_neighbour', name, f"Lists {neighbour} more than once (deduplicated)")
+            else:
+                self.sources.append(i)
+                self.targets.append(self._id(neighbour))
+            seen.add(neighbour)
+
+    def finish(self, racks: Dict[str, dict], lookup: Dict[str, List[str]]) -> NormalizedMap:
+        """Renumbers the nodes in source order, drops unknown neighbours and makes edges symmetric."""
+        report = self.report
+        names, rank = self.names, self.rank
+        order = self.order.finish()
+        count = len(order)
+
+        sources, targets = array('I'), array('I')
+        for a, b in zip(self.sources.finish(), self.targets.finish()):
+            if rank[b] < 0:
+                report.add('unknown_neighbour', names[a], f"Neighbour {names[b]} is not a node of the map")
+            else:
+                sources.append(rank[a])
+                targets.append(rank[b])
+
+        # Every edge a -> b needs b -> a; rows are sorted, so the check is a binary search
+        offsets, adjacency = _csr(count, sources, targets)
+        for a in range(count):
+            for b in adjacency[offsets[a]:offsets[a + 1]]:
+                lo, hi = offsets[b], offsets[b + 1]
+                k = bisect_left(adjacency, a, lo, hi)
+                if k == hi or adjacency[k] != a:
+                    report.add('asymmetric_edge', names[order[a]], f"{names[order[a]]} -> {names[order[b]]} has no reverse edge (added)")
+                    sources.append(b)
+                    targets.append(a)
+        if len(sources) > len(adjacency):
+            offsets, adjacency = _csr(count, sources, targets)
+
+        ordered_names = [names[i] for i in order]
+        for a in range(count):
+            if offsets[a] == offsets[a + 1]:
+                report.add('orphan_node', ordered_names[a], "Not connected to any other node")
+
+        def column(buffer: ColumnBuffer) -> array:
+            values = buffer.finish()
+            return array(values.typecode, (values[i] for i in order))
+
+        return NormalizedMap(
+            names=ordered_names,
+            xs=column(self.xs),
+            ys=column(self.ys),
+            heuristics=column(self.heuristics),
+            types=column(self.types),
+            flags=column(self.flags),
+            offsets=offsets,
+            targets=adjacency,
+            racks=racks,
+            lookup={side: [name for name in access if name in self.index and rank[self.index[name]] >= 0]
+                    for side, access in lookup.items()},
+        )
+
+
+def _stream(path: str, report: ValidationReport):
+    """Yields the entries of a source, turning stream problems into report issues."""
+    def marker(line: int, text: str):
+        report.add('merge_marker', f"{path}:{line}", f"Unresolved merge marker '{text}'")
+
+    try:
+        yield from iter_sections(path, marker)
+    except MapStreamError as e:
+        report.add(e.code, f"{path}:{e.line}", e.message)
+
+
+def validate_map(map_path: str, lookup_path: Optional[str] = None,
+                 track_memory: bool = False) -> Tuple[Optional[NormalizedMap], ValidationReport]:
+    """Validates the map sources and normalizes the layout in one streaming pass.
+
+    Checks for merge markers, unknown neighbour IDs, asymmetric edges, self-loops, orphan
+    nodes, duplicate nodes and coordinates, malformed racks and lookup-table entries that point
+    to missing nodes. Every problem is collected; nothing is raised.
+
+    Args:
+        map_path (str): Path to map.json
+        lookup_path (Optional[str]): Path to lookup_table.json
+        track_memory (bool): Measure peak memory with tracemalloc (slows the pass down)
+
+    Returns:
+        Tuple[Optional[NormalizedMap], ValidationReport]: The normalized map (None if the
+            sources could not be parsed) and the report, including the load statistics
+    """
+    report = ValidationReport(sources=[map_path] + ([lookup_path] if lookup_path else []))
+    with MemoryTracker(track_memory) as tracker:
+        normalized = _validate(map_path, lookup_path, report)
+    report.load = LoadStats(
+        bytes_read=sum(os.path.getsize(path) for path in report.sources),
+        elapsed=tracker.elapsed,
+        peak_memory=tracker.peak
+    )
+    return normalized, report
+
+
+def _validate(map_path: str, lookup_path: Optional[str], report: ValidationReport) -> Optional[NormalizedMap]:
+    nodes = _NodeStream(estimate_nodes(map_path), report)
+    racks: Dict[str, dict] = {}
+    racks_data: Dict[str, dict] = {}
+    for section, key, record in _stream(map_path, report):
+        if section == 'nodes':
+            nodes.add(key, record)
+        elif section == 'racks':
+            racks_data[key] = record
+            bad = [k for k in ('start_cords', 'center_cords', 'end_cords')
+                   if not isinstance(record, dict) or not _is_pair(record.get(k))]
+            if bad:
+                report.add('invalid_rack', key, f"Missing or malformed {', '.join(bad)}")
+            else:
+                racks[key] = record
+
+    lookup: Dict[str, List[str]] = {}
+    if lookup_path is not None:
+        for side, _, access in _stream(lookup_path, report):
+            if not isinstance(access, list):
+                report.add('invalid_json', side, "Access nodes must be a list")
+                continue
+            if side[:-1] not in racks_data:
+                report.add('unknown_lookup_rack', side, f"Rack {side[:-1]} is not in map.json")
+            for name in access:
+                i = nodes.index.get(name)
+                if i is None or nodes.rank[i] < 0:
+                    report.add('unknown_lookup_node', side, f"Access node {name} is not a node of the map")
+            lookup[side] = access
+
+    if any(issue.code in ('merge_marker', 'invalid_json') for issue in report.issues):
+        return None
+    if not nodes.order.size:
+        report.add('missing_section', map_path, "No 'nodes' section")
+        return None
+
+    normalized = nodes.finish(racks, lookup)
+    report.node_count = normalized.node_count
+    report.edge_count = len(normalized.targets)
+    return normalized
+
+
+def normalize_map(map_path: str, lookup_path: Optional[str] = None,
+                  track_memory: bool = False) -> Tuple[NormalizedMap, ValidationReport]:
+    """Like validate_map, but fails fast when the map has errors.
+
+    Raises:
+        MapValidationError: If any error was found, with the full report attached
+    """
+    normalized, report = validate_map(map_path, lookup_path, track_memory)
+    if normalized is None or not report.ok:
+        raise MapValidationError(report)
+    return normalized, report
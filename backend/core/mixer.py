@@ -1,12 +1,23 @@
-from typing import List, Dict, Optional, Any
-from queue import Queue
+from typing import List, Dict, Optional, Any, Sequence
+from collections import Counter, deque
 from core.task import Task
+import atexit
 import json
 import os
+import threading
+import time
 from datetime import datetime
-import uuid
 from core.agent import Agent
 from core.types import IMixer, IAgent, ITask
+from core.fleet_state import SharedFleetState
+from core.event_log import EventLogWriter
+from core.log_pipeline import DROP_NEWEST, LogPipeline
+from core.log_store import LogStore
+from core.scheduler import TaskScheduler
+from core.task_table import TaskTable
+from core.task_graph import TaskGraph, topological_order
+from core.wait_for import WaitEdge, WaitForGraph
+from core.types import TaskStatus
 
 class Mixer(IMixer):
     """Handles task assignment, prioritization, and monitoring for agents in the warehouse system.
@@ -14,13 +25,30 @@ class Mixer(IMixer):
     
     Attributes:
         warehouse (Dict[str, Any]): Reference to the warehouse configuration
-        tasks (Queue): Regular tasks queue
-        priority_tasks (Queue): High-priority tasks queue
+        scheduler (TaskScheduler): Pending tasks, by priority with aging and deadlines
+        task_table (TaskTable): Status of every task ordered here, from pending to completed
+        task_graph (TaskGraph): Unfinished tasks with their dependencies; tasks reach the
+            scheduler once their dependencies completed, and fail when one of them fails
+        wait_for (WaitForGraph): Which blocked agent waits for which other agent
+        deadlock_table (dict): Deadlock scenarios and their resolutions (data/deadlock_table.json)
+        deadlock_stats (Counter): Deadlocks detected, resolved and left unresolved
         agents (List[Agent]): List of agents in the system
+        fleet (Optional[SharedFleetState]): Shared state holding the task queues when several
+            processes serve the warehouse; the local scheduler is unused then
+        logs (deque): Most recent log entries, oldest first
+        log_pipeline (LogPipeline): Background queue writing the logs to disk
+        log_store (LogStore): Indexed history of every saved log, queried by get_logs
     """
     
     _instance = None
-    LOG_BATCH_SIZE = 100  # Number of logs to accumulate before saving
+    LOG_BATCH_SIZE = 100  # Maximum number of logs saved in one write
+    LOG_QUEUE_SIZE = 10000  # Logs waiting to be saved before the overflow policy applies
+    LOG_OVERFLOW_POLICY = DROP_NEWEST
+    RECENT_LOGS = 1000  # Logs kept in memory for get_logs
+    LOG_ECHO = True  # Print every saved log to stdout
+    CRITICAL_PATH_WEIGHT = 1  # Priority levels added per task left in the chain behind a task
+    LOG_SAMPLING: Dict[str, float] = {}  # Event type -> fraction of its events kept, see set_sampling
+    FULL_FIDELITY_EVENTS = frozenset({'backtrack', 'deadlock', 'trajectory'})  # Never sampled, nor any '*_failed'
     
     def __new__(cls, *args, **kwargs):
         if cls._instance is None:
@@ -28,17 +56,35 @@ class Mixer(IMixer):
             cls._instance._initialized = False
         return cls._instance
     
-    def __init__(self, warehouse: Any = None, agents: List[IAgent] = None):
+    def __init__(self, warehouse: Any = None, agents: List[IAgent] = None, fleet: Optional[SharedFleetState] = None,
+                 log_dir: Optional[str] = None):
         if self._initialized:
             return
             
         self.warehouse = warehouse  # FK
-        self.tasks = Queue()  # Regular tasks queue
-        self.priority_tasks = Queue()  # High-priority tasks queue
+        self.scheduler = TaskScheduler()
+        self.task_table = TaskTable(rack_of=getattr(warehouse, 'goal_rack', None))
+        self.task_graph = TaskGraph(is_done=self._is_completed)
+        self.wait_for = WaitForGraph()
+        self.deadlock_table = self._load_deadlock_table()
+        self.deadlock_stats = Counter()
+        self._resolving = threading.Lock()
         self.agents = agents or []  # FK
-        self.logs = []  # List to store all system logs
-        self._log_file_path = os.path.join(os.path.dirname(__file__), '..', 'data', 'logs')
+        self.fleet = fleet
+        self.logs = deque(maxlen=self.RECENT_LOGS)
+        self._log_file_path = log_dir or os.path.join(os.path.dirname(__file__), '..', 'data', 'logs')
         self._ensure_log_directory()
+        self._log_writer = EventLogWriter(self._log_file_path)
+        self.log_store = LogStore(os.path.join(self._log_file_path, 'events.db'))
+        self.log_pipeline = LogPipeline(self._save_logs, capacity=self.LOG_QUEUE_SIZE,
+                                        policy=self.LOG_OVERFLOW_POLICY, batch_size=self.LOG_BATCH_SIZE)
+        self._sampling = {}
+        self._sample_credit = Counter()
+        self._sampled_out = Counter()
+        self._sample_lock = threading.Lock()
+        for event_type, rate in self.LOG_SAMPLING.items():
+            self.set_sampling(event_type, rate)
+        atexit.register(self.close)
         self._initialized = True
 
     def _ensure_log_directory(self) -> None:
@@ -47,78 +93,120 @@ class Mixer(IMixer):
 
     def _get_log_file_path(self) -> str:
         """Returns the path to the current log file."""
-        timestamp = datetime.now().strftime("%Y%m%d")
-        return os.path.join(self._log_file_path, f"warehouse_logs_{timestamp}.json")
+        return self._log_writer.path or self._log_writer.path_for(datetime.now().strftime("%Y%m%d"))
 
-    def _save_logs(self) -> None:
-        """Saves the current logs to a file."""
-        if not self.logs:
-            return
-
-        log_file = self._get_log_file_path()
+    def _save_logs(self, entries: List[Dict]) -> None:
+        """Appends a batch of logs to the day's log file (runs on the log pipeline thread)."""
+        self.logs.extend(entries)
+        if self.LOG_ECHO:
+            print('\n'.join(f"[{entry['timestamp']}] {entry['type']}: {entry['message']}" for entry in entries))
         try:
-            # Read existing logs if file exists
-            existing_logs = []
-            if os.path.exists(log_file):
-                with open(log_file, 'r') as f:
-                    existing_logs = json.load(f)
-
-            # Append new logs
-            existing_logs.extend(self.logs)
-            
-            # Save all logs
-            with open(log_file, 'w') as f:
-                json.dump(existing_logs, f, indent=2)
-            
-            # Clear the in-memory logs
-            self.logs = []
-            
+            self._log_writer.write(entries)
         except Exception as e:
             print(f"Error saving logs: {e}")
+        try:
+            self.log_store.insert(entries)
+        except Exception as e:
+            print(f"Error storing logs: {e}")
+
+    def close(self) -> None:
+        """Saves the queued logs and closes the log file."""
+        self.log_pipeline.close()
+        self._log_writer.close()
+        self.log_store.close()
+
+    def is_full_fidelity(self, event_type: str) -> bool:
+        """Whether every event of a type must be kept (failures, backtracks, deadlocks, trajectories)."""
+        return event_type in self.FULL_FIDELITY_EVENTS or event_type.endswith('_failed')
+
+    def set_sampling(self, event_type: str, rate: float) -> None:
+        """Keeps only a fraction of the events of a high-frequency type.
 
-    def log_event(self, event_type: str, message: str, agent: Optional[IAgent] = None, task: Optional[ITask] = None) -> None:
-        """Logs an event in the system and saves logs if batch size is reached.
+        Sampling is deterministic: with a rate of 0.25 exactly one event in four is kept.
+
+        Args:
+            event_type (str): Event type to sample (e.g., 'movement')
+            rate (float): Fraction of events kept, 1 keeps them all
+
+        Raises:
+            ValueError: If the rate is not in (0, 1] or the type must be kept in full
+        """
+        if not 0 < rate <= 1:
+            raise ValueError("Sampling rate must be in (0, 1]")
+        if self.is_full_fidelity(event_type) and rate < 1:
+            raise ValueError(f"Events of type '{event_type}' cannot be sampled")
+        with self._sample_lock:
+            if rate == 1:
+                self._sampling.pop(event_type, None)
+            else:
+                self._sampling[event_type] = rate
+            self._sample_credit[event_type] = 0.0
+
+    def _sample(self, event_type: str) -> bool:
+        """Whether the next event of a type is kept."""
+        rate = self._sampling.get(event_type)
+        if rate is None:
+            return True
+        with self._sample_lock:
+            credit = self._sample_credit[event_type] + rate
+            keep = credit >= 1.0
+            self._sample_credit[event_type] = credit - 1.0 if keep else credit
+            if not keep:
+                self._sampled_out[event_type] += 1
+        return keep
+
+    def sampled_out(self) -> Dict[str, int]:
+        """Number of events left out by sampling, per type."""
+        with self._sample_lock:
+            return dict(self._sampled_out)
+
+    def log_event(self, event_type: str, message: str, agent: Optional[IAgent] = None, task: Optional[ITask] = None,
+                  data: Optional[dict] = None) -> None:
+        """Logs an event in the system. The event is queued and saved in the background.
         
         Args:
             event_type (str): Type of event (e.g., 'movement', 'task', 'deadlock')
             message (str): Description of the event
             agent (Agent, optional): Agent involved in the event
             task (Task, optional): Task involved in the event
+            data (dict, optional): Structured details, stored as JSON with the event
         """
-        log_entry = {
-            'id': str(uuid.uuid4()),
-            'timestamp': datetime.now().isoformat(),
-            'type': event_type,
-            'message': message,
-            'agent_id': agent.hash_id if agent else None,
-            'task_id': task.hash_id if task else None
-        }
-        self.logs.append(log_entry)
-        print(f"[{log_entry['timestamp']}] {event_type}: {message}")
-
-        # Save logs if batch size is reached
-        if len(self.logs) >= self.LOG_BATCH_SIZE:
-            self._save_logs()
-
-    def get_logs(self, event_type: Optional[str] = None, agent_id: Optional[str] = None, task_id: Optional[str] = None) -> List[Dict]:
-        """Retrieves logs based on filters.
+        if not self._sample(event_type):
+            return
+        self.log_pipeline.submit((time.time(), event_type, message,
+                                  agent.hash_id if agent else None, task.hash_id if task else None, data))
+
+    def log_trajectory(self, agent: IAgent, nodes: Sequence[Any], offsets: Sequence[int], task: Optional[ITask] = None) -> None:
+        """Logs a whole path execution as one 'trajectory' event.
+
+        Args:
+            agent (Agent): Agent that moved
+            nodes (Sequence[Node]): Nodes visited, the starting node first
+            offsets (Sequence[int]): Microseconds from the start to each node, 0 for the starting node
+            task (Task, optional): Task the path was executed for
+        """
+        self.log_event('trajectory', f"Moved {len(nodes) - 1} hops from {nodes[0]} to {nodes[-1]}", agent, task,
+                       {'nodes': [node.index for node in nodes], 'offsets_us': list(offsets)})
+
+    def get_logs(self, event_type: Optional[str] = None, agent_id: Optional[str] = None, task_id: Optional[str] = None,
+                 since: Optional[str] = None, until: Optional[str] = None, limit: Optional[int] = None,
+                 offset: int = 0, newest_first: bool = False) -> List[Dict]:
+        """Retrieves saved logs based on filters, in time order.
         
         Args:
             event_type (str, optional): Filter by event type
             agent_id (str, optional): Filter by agent ID
             task_id (str, optional): Filter by task ID
+            since (str, optional): ISO timestamp of the earliest log (inclusive)
+            until (str, optional): ISO timestamp of the latest log (exclusive)
+            limit (int, optional): Maximum number of logs returned
+            offset (int): Number of matching logs skipped, for pagination
+            newest_first (bool): Return the latest logs first
             
         Returns:
             List[dict]: Filtered log entries
         """
-        filtered_logs = self.logs
-        if event_type:
-            filtered_logs = [log for log in filtered_logs if log['type'] == event_type]
-        if agent_id:
-            filtered_logs = [log for log in filtered_logs if log['agent_id'] == agent_id]
-        if task_id:
-            filtered_logs = [log for log in filtered_logs if log['task_id'] == task_id]
-        return filtered_logs
+        return self.log_store.query(event_type, agent_id, task_id, since, until, limit, offset, newest_first)
 
     def _load_deadlock_table(self) -> dict:
         """Loads the deadlock table from the JSON file."""
@@ -141,91 +229,262 @@ class Mixer(IMixer):
                 }
             }
 
-    def _enqueue(self, agent: Agent, task: Task):
+    def _is_completed(self, task_id: str) -> bool:
+        record = self.task_table.get(task_id)
+        return record is not None and record.status == TaskStatus.COMPLETED
+
+    def _priority(self, task: ITask) -> int:
+        """Scheduling priority of a task: its own priority raised by the length of its critical path."""
+        return task.priority + self.CRITICAL_PATH_WEIGHT * max(self.task_graph.critical_path(task.hash_id) - 1, 0)
+
+    def _release(self, task: ITask, agent: Optional[Agent], deadline: Optional[float]) -> None:
+        """Hands a task whose dependencies completed to the scheduler, unless it was cancelled meanwhile."""
+        record = self.task_table.get(task.hash_id)
+        if record is None or record.status == TaskStatus.PENDING:
+            self.scheduler.push(task, priority=self._priority(task), deadline=deadline, agent=agent)
+
+    def _enqueue(self, agent: Agent, task: Task, deadline: Optional[float] = None):
         """Helper method to enqueue tasks based on priority."""
-        queue = self.priority_tasks if task.priority == 1 else self.tasks
-        queue.put({
-            'agent': agent,
-            'goal': task.goal_state,
-            'job': task.job
-        })
+        if self.fleet is not None:
+            if task.depends_on:
+                raise ValueError("Task dependencies are not supported with a shared fleet state")
+            self.fleet.push_task(task, agent.agent_id if agent else None)
+            return
+        if task.hash_id in self.task_table:
+            raise ValueError(f"Task {task.hash_id} was already ordered")
+        ready, lengthened = self.task_graph.add(task, (agent, deadline))
+        self.task_table.add(task, agent.agent_id if agent else None)
+        self._refresh_priorities(lengthened)
+        if ready:
+            self._release(task, agent, deadline)
+
+    def _refresh_priorities(self, task_ids: List[str]) -> None:
+        """Re-prioritizes the waiting tasks among `task_ids` after their critical paths changed."""
+        for task_id in task_ids:
+            waiting = self.scheduler.get(task_id)
+            if waiting is not None:
+                self.scheduler.reprioritize(task_id, self._priority(waiting.task))
+
+    def _prune(self, task_id: str, reason: Optional[str]) -> None:
+        """Drops a failed task from the task graph, failing the tasks that depended on it."""
+        dependents, shortened = self.task_graph.remove(task_id)
+        for dependent in dependents:
+            record = self.task_table.get(dependent)
+            if record is not None and record.status == TaskStatus.PENDING:
+                self.task_table.fail(dependent, f"Dependency {task_id} failed: {reason}")
+        self._refresh_priorities(shortened)
+
+    def order(self, agent: Agent, task: Task, deadline: Optional[float] = None):
+        """Orders a task for an agent. It is scheduled once the tasks it depends on completed.
+
+        Args:
+            agent (Agent): Agent the task is ordered for
+            task (Task): Task to perform
+            deadline (float, optional): Unix time the task should be assigned by
+
+        Raises:
+            ValueError: If the task was already ordered or depends on an unknown task
+        """
+        self._enqueue(agent, task, deadline)
+
+    def order_job(self, tasks: List[Task], agent: Optional[Agent] = None, deadline: Optional[float] = None) -> None:
+        """Orders the tasks of a job, in any order, each after the tasks it depends on.
+
+        Raises:
+            ValueError: If the dependencies form a cycle or refer to an unknown task
+        """
+        for task in topological_order(tasks):
+            self._enqueue(agent, task, deadline)
+
+    def cancel_task(self, task_id: str) -> bool:
+        """Withdraws a task that was not assigned yet; returns False if it is not waiting.
+
+        Tasks depending on it fail as well.
+        """
+        record = self.task_table.get(task_id)
+        blocked = self.task_graph.is_blocked(task_id) and record is not None and record.status == TaskStatus.PENDING
+        if not self.scheduler.cancel(task_id) and not blocked:
+            return False
+        if record is not None:
+            self.task_table.fail(task_id, "cancelled")
+        self._prune(task_id, "cancelled")
+        return True
+
+    def fail_task(self, task_id: str, reason: Optional[str] = None) -> bool:
+        """Fails a task that has not completed, and the tasks depending on it.
 
-    def order(self, agent: Agent, task: Task):
-        """Orders a task for an agent by enqueuing it into the appropriate queue."""
-        self._enqueue(agent, task)
+        Returns False if no such task is recorded.
+        """
+        record = self.task_table.get(task_id)
+        if record is None or record.status == TaskStatus.COMPLETED:
+            return False
+        self.scheduler.cancel(task_id)
+        if record.status != TaskStatus.FAILED:
+            self.task_table.fail(task_id, reason)
+        self._prune(task_id, reason)
+        return True
+
+    def retry_task(self, task_id: str, deadline: Optional[float] = None) -> bool:
+        """Schedules a failed task again; returns False if there is no failed task with that id.
+
+        Its dependencies must be completed, waiting, or retried first.
+
+        Raises:
+            ValueError: If a task it depends on failed and was not retried
+        """
+        record = self.task_table.get(task_id)
+        if record is None or record.status != TaskStatus.FAILED:
+            return False
+        if task_id in self.task_graph:
+            ready = not self.task_graph.is_blocked(task_id)
+        else:
+            ready, lengthened = self.task_graph.add(record.task, (None, deadline))
+            self._refresh_priorities(lengthened)
+        self.task_table.requeue(task_id)
+        if ready:
+            self.scheduler.push(record.task, priority=self._priority(record.task), deadline=deadline)
+        return True
+
+    def complete_task(self, task: ITask) -> None:
+        """Marks a task completed in the task table, if it is recorded there."""
+        record = self.task_table.get(task.hash_id)
+        if record is None or record.status == TaskStatus.COMPLETED:
+            return
+        if record.status != TaskStatus.IN_PROGRESS:
+            # Finished without going through the scheduler (e.g. assigned by hand)
+            self.scheduler.take(task.hash_id)
+            if record.status == TaskStatus.FAILED:
+                self.task_table.requeue(task.hash_id)
+            self.task_table.start(task.hash_id)
+        self.task_table.complete(task.hash_id)
+        for dependent, (agent, deadline) in self.task_graph.complete(task.hash_id):
+            self._release(dependent, agent, deadline)
+
+    def reprioritize_task(self, task_id: str, priority: int, deadline: Optional[float] = None) -> bool:
+        """Changes the priority (and optionally the deadline) of a waiting task.
+
+        The critical-path boost is added on top of the new priority.
+        """
+        waiting = self.scheduler.get(task_id)
+        if waiting is None:
+            return False
+        waiting.task.priority = priority
+        return self.scheduler.reprioritize(task_id, self._priority(waiting.task), deadline)
 
     def assign_task(self, agent: IAgent) -> None:
-        """Assigns tasks from the priority queue first, then from the regular queue."""
-        task_assigned = False
-
-        if not self.priority_tasks.empty():
-            task = self.priority_tasks.get()
-            agent.set_goal(task['goal'])
-            task_assigned = True
-            print(f"Assigned high-priority Task {task['job']} to Agent {agent}.")
-        
-        if not task_assigned and not self.tasks.empty():
-            task = self.tasks.get()
-            agent.set_goal(task['goal'])
-            print(f"Assigned Task {task['job']} to Agent {agent}.")
-
-    def detect_and_resolve_deadlock(self):
-        """Detects deadlock and resolves it using the deadlock table."""
-        blocked_agents = [agent for agent in self.agents if agent.state == "blocked"]
-
-        if len(blocked_agents) > 0:
-            # Identify deadlock scenario based on blocked agents
-            deadlock_type = self.identify_deadlock_type(blocked_agents)
-            scenario = self.deadlock_table["deadlock_scenarios"].get(deadlock_type)
-            
-            if scenario:
-                print(f"Deadlock detected: {scenario['description']}")
-                print(f"Resolution: {scenario['resolution']}")
-                self.resolve_deadlock(deadlock_type, blocked_agents, scenario)
+        """Assigns the next task of the scheduler to the agent."""
+        if self.fleet is not None:
+            task = self.fleet.pop_task()
+            if task:
+                agent.set_goal(task['goal'])
+                print(f"Assigned {'high-priority ' if task['priority'] == 1 else ''}Task {task['job']} to Agent {agent}.")
+            return
+
+        scheduled = self.scheduler.pop()
+        if scheduled is not None:
+            if scheduled.task_id in self.task_table:
+                self.task_table.start(scheduled.task_id, agent.agent_id)
+            agent.set_goal(scheduled.task.goal_state)
+            print(f"Assigned Task {scheduled.task.job} (priority {scheduled.priority}) to Agent {agent}.")
+
+    def agent_blocked(self, agent: IAgent, node: Any) -> None:
+        """Adds the wait-for edge of an agent that could not take a node, and resolves the
+        deadlock it closes, if any. Only the chain of agents the edge leads to is examined."""
+        cycle = self.wait_for.wait(agent, node)
+        if cycle:
+            self._handle_deadlock(cycle)
+
+    def agent_unblocked(self, agent: IAgent) -> None:
+        """Removes the wait-for edge of an agent that moved again."""
+        self.wait_for.clear(agent)
+
+    def detect_and_resolve_deadlock(self) -> int:
+        """Finds every deadlock cycle in the wait-for graph and resolves it using the deadlock table.
+
+        Cycles are normally resolved as soon as the failed move closing them is recorded; this
+        sweep catches those that could not be resolved then.
+
+        Returns:
+            int: Number of deadlocks found
+        """
+        cycles = self.wait_for.cycles()
+        for cycle in cycles:
+            self._handle_deadlock(cycle)
+        return len(cycles)
+
+    def _handle_deadlock(self, cycle: List[WaitEdge]) -> None:
+        """Logs a deadlock cycle and applies the resolution of its scenario to the cycle members."""
+        if not self._resolving.acquire(blocking=False):
+            return  # A resolution is under way (its moves can close cycles too); the next sweep sees this one
+        try:
+            agents = [edge.waiter for edge in cycle]
+            deadlock_type = self.identify_deadlock_type(cycle)
+            scenario = self.deadlock_table["deadlock_scenarios"].get(deadlock_type) or self.deadlock_table["default_resolution"]
+            self.deadlock_stats['detected'] += 1
+            self.log_event('deadlock', f"Agents {' -> '.join(str(agent.agent_id) for agent in agents)} wait for each other; "
+                                       f"resolving with {scenario['action']}", agents[0],
+                           data={'type': deadlock_type, 'agents': [agent.agent_id for agent in agents],
+                                 'nodes': [edge.node.name for edge in cycle]})
+            if self.resolve_deadlock(deadlock_type, agents, scenario):
+                self.deadlock_stats['resolved'] += 1
             else:
-                # Use default resolution if scenario not found
-                default = self.deadlock_table["default_resolution"]
-                print(f"Deadlock detected. Using default resolution: {default['action']}")
-                self.resolve_deadlock(deadlock_type, blocked_agents, default)
-
-    def identify_deadlock_type(self, blocked_agents: List[Agent]) -> str:
-        """Identifies the type of deadlock based on the blocked agents' situation."""
-        if len(blocked_agents) == 1:
-            return "agent_blocked"
-        elif len(blocked_agents) > 1:
-            return "agents_blocked"
-        else:
-            return "path_blocked"
+                self.deadlock_stats['unresolved'] += 1
+                self.log_event('deadlock_resolution_failed', f"Could not resolve deadlock between agents "
+                                                             f"{', '.join(str(agent.agent_id) for agent in agents)}", agents[0])
+        finally:
+            self._resolving.release()
+
+    def identify_deadlock_type(self, cycle: List[WaitEdge]) -> str:
+        """Identifies the deadlock scenario of a wait-for cycle.
+
+        Agents meeting head-on form a cycle of two; like longer cycles it is a circular wait,
+        since neither agent can take the other's node.
+        """
+        return "circular_wait" if len(cycle) > 1 else "agent_blocked"
 
-    def resolve_deadlock(self, deadlock_type: str, blocked_agents: List[Agent], scenario: dict):
-        """Resolves the deadlock based on the deadlock type and blocked agents."""
+    def resolve_deadlock(self, deadlock_type: str, blocked_agents: List[Agent], scenario: dict) -> bool:
+        """Resolves the deadlock based on the deadlock type and blocked agents; returns whether an agent moved."""
         action = scenario["action"]
         params = scenario.get("parameters", {})
 
         if action == "move_agent_back":
-            self.move_agent_back(blocked_agents, params)
+            return self.move_agent_back(blocked_agents, params)
         elif action == "switch_agent_positions":
             self.switch_agent_positions(blocked_agents, params)
         elif action == "recalculate_path":
             self.recalculate_path(blocked_agents, params)
         elif action == "break_circular_wait":
-            self.break_circular_wait(blocked_agents, params)
+            return self.break_circular_wait(blocked_agents, params)
         elif action == "release_resources":
             self.release_resources(blocked_agents, params)
+        return False
 
-    def move_agent_back(self, agents: List[Agent], params: dict):
-        """Moves a blocked agent back along its path history."""
+    def move_agent_back(self, agents: List[Agent], params: dict) -> bool:
+        """Moves a blocked agent back along its path history; returns whether it moved.
+
+        The agent is only moved if its motion lock is free or held by this thread, so a path
+        another request is executing for it is never changed under that request. Once moved,
+        the agent also releases the nodes it had reserved ahead of itself.
+        """
         agent = agents[0]
         steps = params.get("steps", 1)
-        
-        # Try to backtrack the specified number of steps
-        success = agent.backtrack(steps)
-        if not success:
-            print(f"Warning: Could not backtrack {steps} steps for {agent}. Not enough path history.")
-            # If we can't backtrack, try to move back one step at a time
-            for _ in range(steps):
-                if not agent.backtrack(1):
-                    break
+        if not agent.motion_lock.acquire(blocking=False):
+            return False
+        try:
+            # Try to backtrack the specified number of steps
+            success = agent.backtrack(steps)
+            if not success:
+                print(f"Warning: Could not backtrack {steps} steps for {agent}. Not enough path history.")
+                # If we can't backtrack, try to move back one step at a time
+                for _ in range(steps):
+                    if not agent.backtrack(1):
+                        break
+                    success = True
+            if success:
+                agent.release_reservations()
+            return success
+        finally:
+            agent.motion_lock.release()
 
     def switch_agent_positions(self, agents: List[Agent], params: dict):
         """Switches positions between two blocked agents."""
@@ -250,13 +509,17 @@ class Mixer(IMixer):
         max_attempts = params.get("max_attempts", 3)
         print(f"Recalculating path for {agents} using {algorithm} (max attempts: {max_attempts})")
 
-    def break_circular_wait(self, agents: List[Agent], params: dict):
-        """Breaks circular wait by moving the lowest weight agent back."""
+    def break_circular_wait(self, agents: List[Agent], params: dict) -> bool:
+        """Breaks circular wait by moving the lowest weight agent back (the next lightest if it
+        cannot, e.g. because another request is moving it)."""
         priority = params.get("priority", "lowest_weight")
+        steps = params.get("backtrack_steps", 1)
         if priority == "lowest_weight":
-            agent = min(agents, key=lambda a: a.weight)
-            self.move_agent_back([agent], {"steps": 1})
-            print(f"Broke circular wait by moving lowest weight agent: {agent}")
+            for agent in sorted(agents, key=lambda a: a.weight):
+                if self.move_agent_back([agent], {"steps": steps}):
+                    print(f"Broke circular wait by moving lowest weight agent: {agent}")
+                    return True
+        return False
 
     def release_resources(self, agents: List[Agent], params: dict):
         """Releases and reacquires resources for deadlocked agents."""
@@ -1,12 +1,282 @@
-from typing import Dict, Optional, List
-from enum import Enum, auto
-from core.types import NodeType, INode, IAgent # type: ignore
-from dataclasses import dataclass, field
+import threading
+from typing import Callable, Dict, List, Optional
+import numpy as np
+from core.lock_manager import default_lock_manager
+from core.types import NODE_TYPES, NodeType, INode, IAgent # type: ignore
+
+FREE = 0          # Owner id of an unlocked node
+ANONYMOUS = 1     # Owner id of a node locked without an owner (e.g. locked in the map file)
+
+
+class NodeStore:
+    """Struct-of-arrays storage for node state, indexed by int.
+
+    Coordinates, type codes, lock owners and goal flags live in NumPy arrays, so bulk queries
+    (lock scans, type filters, coordinate lookups) are vectorized. Lock owners are interned to
+    int ids; agents are compared by identity, strings and ints by value. The owner column can
+    be moved into shared memory with `share`, so several processes lock the same nodes. `Node` objects are
+    views over one slot, created on demand and cached, so the same index always gives the same
+    Node object.
+
+    Attributes:
+        names (List[str]): Node name per index
+        xs (np.ndarray): X coordinate per index
+        ys (np.ndarray): Y coordinate per index
+        types (np.ndarray): Index into NODE_TYPES per index
+        owners (np.ndarray): Owner id per index (FREE if unlocked)
+        goals (np.ndarray): Goal flag per index
+        alive (np.ndarray): False for slots whose node was removed
+    """
+
+    def __init__(self, capacity: int = 16):
+        capacity = max(capacity, 1)
+        self.size = 0
+        self.names: List[str] = []
+        self.xs = np.zeros(capacity, dtype=np.float64)
+        self.ys = np.zeros(capacity, dtype=np.float64)
+        self.types = np.zeros(capacity, dtype=np.uint8)
+        self.owners = np.zeros(capacity, dtype=np.int32)
+        self.goals = np.zeros(capacity, dtype=bool)
+        self.alive = np.zeros(capacity, dtype=bool)
+        self._views: List[Optional['Node']] = []
+        self._owners: Dict[int, object] = {FREE: None, ANONYMOUS: None}
+        self._owner_ids: Dict[object, int] = {None: ANONYMOUS}
+        self._owner_lock = threading.Lock()
+        self._owner_code: Optional[Callable[[object], int]] = None  # Set once the owners are shared
+
+    @classmethod
+    def from_arrays(cls, names: List[str], xs, ys, types, locked, goals) -> 'NodeStore':
+        """Builds a store in one go from per-node columns.
+
+        Args:
+            names (List[str]): Node names
+            xs, ys: Coordinates
+            types: Indices into NODE_TYPES
+            locked: Whether each node starts locked (without an owner)
+            goals: Goal flags
+        """
+        n = len(names)
+        store = cls(n)
+        store.size = n
+        store.names = list(names)
+        store.xs[:n] = np.asarray(xs, dtype=np.float64)
+        store.ys[:n] = np.asarray(ys, dtype=np.float64)
+        store.types[:n] = np.asarray(types, dtype=np.uint8)
+        store.owners[:n] = np.where(np.asarray(locked, dtype=bool), ANONYMOUS, FREE)
+        store.goals[:n] = np.asarray(goals, dtype=bool)
+        store.alive[:n] = True
+        store._views = [None] * n
+        return store
+
+    def __len__(self) -> int:
+        return self.size
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the column arrays."""
+        return sum(column.nbytes for column in (self.xs, self.ys, self.types, self.owners, self.goals, self.alive))
+
+    def _grow(self, size: int) -> None:
+        if self._owner_code is not None and size > len(self.owners):
+            raise RuntimeError(f"The shared owner table holds {len(self.owners)} nodes")
+        capacity = len(self.xs)
+        if size <= capacity:
+            return
+        capacity = max(size, 2 * capacity)
+        columns = ['xs', 'ys', 'types', 'goals', 'alive']
+        if self._owner_code is None:
+            columns.append('owners')  # A shared owner table keeps its size
+        for attr in columns:
+            column = getattr(self, attr)
+            grown = np.zeros(capacity, dtype=column.dtype)
+            grown[:len(column)] = column
+            setattr(self, attr, grown)
+
+    def add(self, x: float, y: float, node_type: NodeType, name: str, locked: bool = False, owner=None,
+            is_goal: bool = False) -> int:
+        """Appends a node and returns its index."""
+        i = self.size
+        self._grow(i + 1)
+        self.size = i + 1
+        self.names.append(name)
+        self._views.append(None)
+        self.xs[i], self.ys[i] = x, y
+        self.types[i] = NODE_TYPES.index(node_type)
+        self.owners[i] = self.owner_id(owner) if locked else FREE
+        self.goals[i] = is_goal
+        self.alive[i] = True
+        return i
+
+    def node(self, i: int) -> 'Node':
+        """Returns the Node view of index i."""
+        view = self._views[i]
+        if view is None:
+            view = Node._view(self, i)
+            self._views[i] = view
+        return view
+
+    def views(self) -> List['Node']:
+        """Returns the Node views of every live index, in index order."""
+        return [self.node(i) for i in range(self.size) if self.alive[i]]
+
+    def adopt(self, node: 'Node') -> 'Node':
+        """Moves a node from another store into this one, keeping the same Node object."""
+        if node._store is self:
+            return node
+        old, j = node._store, node._index
+        i = self.add(old.xs[j], old.ys[j], NODE_TYPES[old.types[j]], old.names[j],
+                     locked=old.owners[j] != FREE, owner=old.owner(j), is_goal=bool(old.goals[j]))
+        old.release(j)
+        node._store, node._index = self, i
+        self._views[i] = node
+        return node
+
+    def release(self, i: int) -> None:
+        """Marks index i as removed; its view no longer counts in bulk queries."""
+        self.alive[i] = False
+        self.owners[i] = FREE
+        self._views[i] = None
+
+    # Lock owners
+
+    @staticmethod
+    def _key(owner):
+        return owner if owner is None or isinstance(owner, (str, int)) else ('object', id(owner))
+
+    def owner_id(self, owner) -> int:
+        """Interns a lock owner and returns its id."""
+        key = self._key(owner)
+        owner_id = self._owner_ids.get(key)
+        if owner_id is None:
+            with self._owner_lock:
+                owner_id = self._owner_ids.get(key)
+                if owner_id is None:
+                    owner_id = len(self._owners) if self._owner_code is None else self._owner_code(owner)
+                    self._owners[owner_id] = owner  # Keeps the object alive, so its id() cannot be reused
+                    self._owner_ids[key] = owner_id
+        return owner_id
+
+    def _known_id(self, owner) -> Optional[int]:
+        """Id of an owner without interning it, unless ids are shared (then any owner has one)."""
+        if self._owner_code is not None:
+            return self.owner_id(owner)
+        return self._owner_ids.get(self._key(owner))
+
+    def owner(self, i: int):
+        """Returns whoever holds the lock on index i (None if free, locked anonymously, or
+        held by an owner this process has not seen)."""
+        return self._owners.get(int(self.owners[i]))
+
+    def share(self, owners: np.ndarray, owner_code: Callable[[object], int], initialize: bool) -> None:
+        """Moves the owner column into an array other processes also map.
+
+        Shared owner ids must mean the same in every process, so they come from `owner_code`
+        instead of the interning order.
+
+        Args:
+            owners (np.ndarray): int32 array with room for at least every current node
+            owner_code (Callable[[object], int]): Process-independent id of an owner
+            initialize (bool): Copy this store's locks into the array (for the first process);
+                otherwise the array's locks are kept
+        """
+        n = self.size
+        if len(owners) < n:
+            raise ValueError(f"Shared owner table holds {len(owners)} nodes, the store has {n}")
+        local, objects = self.owners[:n].copy(), self._owners
+        with self._owner_lock:
+            self._owner_code = owner_code
+            self._owners = {FREE: None, ANONYMOUS: None}
+            self._owner_ids = {None: ANONYMOUS}
+        if initialize:
+            codes = {owner_id: (owner_id if owner_id in (FREE, ANONYMOUS) else self.owner_id(owner))
+                     for owner_id, owner in objects.items()}
+            owners[:n] = [codes[owner_id] for owner_id in local.tolist()]
+            owners[n:] = FREE
+        else:
+            for owner_id, owner in objects.items():
+                if owner_id not in (FREE, ANONYMOUS):
+                    self.owner_id(owner)
+        self.owners = owners
+
+    def is_free(self, i: int) -> bool:
+        """Whether index i is a live node nobody holds; removed nodes are never free."""
+        return bool(self.alive[i]) and self.owners[i] == FREE
+
+    def holds(self, i: int, owner) -> bool:
+        """Whether the owner holds the lock on index i."""
+        return self.owners[i] != FREE and self.owners[i] == self._known_id(owner)
+
+    # The primitives below check and set without synchronization; concurrent callers go through
+    # a LockManager (Node.lock and Node.unlock do).
+
+    def lock(self, i: int, owner) -> bool:
+        """Locks index i for an owner if it is free (and not removed)."""
+        if not self.is_free(i):
+            return False
+        self.owners[i] = self.owner_id(owner)
+        return True
+
+    def unlock(self, i: int, owner) -> bool:
+        """Unlocks index i if the owner holds it."""
+        if not self.holds(i, owner):
+            return False
+        self.owners[i] = FREE
+        return True
+
+    # Bulk queries
+
+    def locked_mask(self) -> np.ndarray:
+        """Boolean mask of the locked live nodes."""
+        n = self.size
+        return (self.owners[:n] != FREE) & self.alive[:n]
+
+    def locked_indices(self) -> np.ndarray:
+        return np.flatnonzero(self.locked_mask())
+
+    def held_by(self, owner) -> np.ndarray:
+        """Indices of the nodes locked by an owner."""
+        owner_id = self._known_id(owner)
+        if owner_id is None:
+            return np.empty(0, dtype=np.intp)
+        n = self.size
+        return np.flatnonzero((self.owners[:n] == owner_id) & self.alive[:n])
+
+    def unlock_all(self, owner) -> int:
+        """Releases every lock an owner holds and returns how many there were."""
+        held = self.held_by(owner)
+        self.owners[held] = FREE
+        return len(held)
+
+    def of_type(self, node_type: NodeType) -> np.ndarray:
+        """Indices of the live nodes of a type."""
+        n = self.size
+        return np.flatnonzero((self.types[:n] == NODE_TYPES.index(node_type)) & self.alive[:n])
+
+    def goal_indices(self) -> np.ndarray:
+        n = self.size
+        return np.flatnonzero(self.goals[:n] & self.alive[:n])
+
+    def find(self, x: float, y: float) -> Optional[int]:
+        """Returns the index of the live node at (x, y), if any."""
+        n = self.size
+        hits = np.flatnonzero((self.xs[:n] == x) & (self.ys[:n] == y) & self.alive[:n])
+        return int(hits[0]) if len(hits) else None
+
+
+def _number(value: float):
+    """Returns an array coordinate as int when integral, like the map files store them."""
+    value = float(value)
+    return int(value) if value.is_integer() else value
+
 
-@dataclass
 class Node:
     """Represents a node in the warehouse grid.
-    
+
+    A Node is a view over one slot of a NodeStore. Loaders put all nodes of a map in one
+    store (pass `store=` when building nodes by hand); a Node built on its own gets a private
+    one-slot store, with a full set of column arrays, so standalone nodes are meant for tests
+    and scripts only.
+
     Attributes:
         x (int): X coordinate
         y (int): Y coordinate
@@ -14,15 +284,76 @@ class Node:
         name (str): Name of the node (e.g., "A1", "B2")
         neighbours (Dict[Node, float]): Dictionary of neighboring nodes and their distances
         locked_by (Optional[str]): ID of the agent that has locked this node
+        locked (bool): Whether the node is locked
+        is_goal (bool): Whether the node is a goal node
     """
-    x: int
-    y: int
-    node_type: NodeType
-    name: str
-    neighbours: Dict['Node', float] = field(default_factory=dict)
-    locked_by: Optional[str] = None
-    locked: bool = False
-    is_goal: bool = False
+    __slots__ = ('_store', '_index', '_hash', 'neighbours')
+
+    def __init__(self, x: int, y: int, node_type: NodeType, name: str,
+                 neighbours: Optional[Dict['Node', float]] = None, locked_by: Optional[str] = None,
+                 locked: bool = False, is_goal: bool = False, store: Optional[NodeStore] = None):
+        self._store = store if store is not None else NodeStore(1)
+        self._index = self._store.add(x, y, node_type, name, locked=locked or locked_by is not None,
+                                      owner=locked_by, is_goal=is_goal)
+        self._store._views[self._index] = self
+        self._hash = hash((x, y))
+        self.neighbours = neighbours if neighbours is not None else {}
+
+    @classmethod
+    def _view(cls, store: NodeStore, i: int) -> 'Node':
+        node = cls.__new__(cls)
+        node._store = store
+        node._index = i
+        node._hash = hash((_number(store.xs[i]), _number(store.ys[i])))
+        node.neighbours = {}
+        return node
+
+    @property
+    def store(self) -> NodeStore:
+        return self._store
+
+    @property
+    def index(self) -> int:
+        """Index of the node in its store."""
+        return self._index
+
+    @property
+    def name(self) -> str:
+        return self._store.names[self._index]
+
+    @property
+    def x(self):
+        return _number(self._store.xs[self._index])
+
+    @x.setter
+    def x(self, value) -> None:
+        self._store.xs[self._index] = value
+        self._hash = hash((value, self.y))
+
+    @property
+    def y(self):
+        return _number(self._store.ys[self._index])
+
+    @y.setter
+    def y(self, value) -> None:
+        self._store.ys[self._index] = value
+        self._hash = hash((self.x, value))
+
+    @property
+    def node_type(self) -> NodeType:
+        return NODE_TYPES[self._store.types[self._index]]
+
+    @property
+    def locked(self) -> bool:
+        return self._store.owners[self._index] != FREE
+
+    @property
+    def locked_by(self):
+        return self._store.owner(self._index)
+
+    @property
+    def is_goal(self) -> bool:
+        return bool(self._store.goals[self._index])
 
     def add_neighbor(self, node: 'Node', distance: float = 1.0) -> None:
         """Adds a neighboring node with the given distance."""
@@ -31,44 +362,38 @@ class Node:
 
     def is_locked(self) -> bool:
         """Returns whether the node is currently locked by an agent."""
-        return self.locked
+        return self._store.owners[self._index] != FREE
 
     def lock(self, agent_id: str) -> bool:
         """Attempts to lock the node for an agent.
-        
+
         Args:
             agent_id (str): ID of the agent attempting to lock the node
-            
+
         Returns:
             bool: True if the node was successfully locked, False otherwise
         """
-        if not self.is_locked():
-            self.locked = True
-            self.locked_by = agent_id
-            return True
-        return False
+        return default_lock_manager.try_acquire(self, agent_id)
 
     def unlock(self, agent_id: str) -> bool:
         """Attempts to unlock the node for an agent.
-        
+
         Args:
             agent_id (str): ID of the agent attempting to unlock the node
-            
+
         Returns:
             bool: True if the node was successfully unlocked, False otherwise
         """
-        if self.locked and self.locked_by == agent_id:
-            self.locked = False
-            self.locked_by = None
-            return True
-        return False
+        return default_lock_manager.release(self, agent_id)
 
     def __hash__(self) -> int:
-        """Returns a hash value for the node."""
-        return hash((self.x, self.y))
+        """Returns a hash value for the node (cached; coordinates change only through the setters)."""
+        return self._hash
 
     def __eq__(self, other: object) -> bool:
         """Checks if two nodes are equal."""
+        if self is other:
+            return True
         if not isinstance(other, Node):
             return False
         return self.x == other.x and self.y == other.y
@@ -77,6 +402,9 @@ class Node:
         """Returns a string representation of the node."""
         return f"{self.name} ({self.x}, {self.y})"
 
+    def __repr__(self) -> str:
+        return f"Node({self.name!r}, x={self.x}, y={self.y}, node_type={self.node_type.name})"
+
     def get_locking_agent(self) -> Optional[str]:
         """Gets the agent that currently has the node locked.
 
@@ -91,7 +419,7 @@ class Node:
         Args:
             node_type (NodeType): The new type for the node
         """
-        self.node_type = node_type
+        self._store.types[self._index] = NODE_TYPES.index(node_type)
 
     def set_goal(self, is_goal: bool = True) -> None:
         """Sets whether this node is a goal node.
@@ -99,4 +427,4 @@ class Node:
         Args:
             is_goal (bool, optional): Whether this is a goal node. Defaults to True.
         """
-        self.is_goal = is_goal
+        self._store.goals[self._index] = is_goal
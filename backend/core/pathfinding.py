@@ -0,0 +1,296 @@
+""" Path planning engine over the shared integer-indexed Graph.
+    Algorithms register themselves by name and every call goes through `find_path`, which
+    returns a PathResult with the path, its cost and the search metrics (nodes expanded, heap
+    pushes, elapsed time), so all planners are measured the same way.
+"""
+
+import heapq
+import time
+from dataclasses import dataclass, field
+from itertools import count
+from typing import Callable, Dict, List, Optional, Set, Tuple, Union
+from core.graph import Graph
+from core.kinematics import KinematicProfile, heading_of, heading_steps
+
+INF = float('inf')
+
+Heuristic = Union[None, str, Dict[str, float], Callable[[int], float]]
+
+
+@dataclass
+class SearchStats:
+    """Counters filled in by an algorithm while it searches."""
+    nodes_expanded: int = 0
+    heap_pushes: int = 0
+    explored: Optional[List[int]] = None
+
+
+@dataclass
+class PathResult:
+    """Outcome of a path search.
+
+    Attributes:
+        algorithm (str): Name of the algorithm that produced the result
+        indices (List[int]): Node indices from start to goal (empty if no path)
+        path (List[str]): Node names from start to goal (empty if no path)
+        cost (float): Cost of the path in the algorithm's unit (inf if no path)
+        nodes_expanded (int): Nodes taken off the open set and expanded
+        heap_pushes (int): Entries pushed onto the open set
+        elapsed (float): Wall-clock search time in seconds
+        explored (Optional[List[str]]): Expanded node names, only when requested with trace=True
+    """
+    algorithm: str
+    indices: List[int]
+    path: List[str]
+    cost: float
+    nodes_expanded: int
+    heap_pushes: int
+    elapsed: float
+    explored: Optional[List[str]] = field(default=None, repr=False)
+
+    @property
+    def found(self) -> bool:
+        """Whether a path was found."""
+        return bool(self.indices)
+
+
+AlgorithmFn = Callable[..., Tuple[List[int], float]]
+ALGORITHMS: Dict[str, AlgorithmFn] = {}
+
+
+def register_algorithm(name: str) -> Callable[[AlgorithmFn], AlgorithmFn]:
+    """Registers a search function under a name.
+
+    The function is called as fn(graph, start, goal, stats, **options) and must return the
+    path as a list of indices (empty if unreachable) and its cost.
+    """
+    def decorator(fn: AlgorithmFn) -> AlgorithmFn:
+        if name in ALGORITHMS:
+            raise ValueError(f"Algorithm '{name}' is already registered")
+        ALGORITHMS[name] = fn
+        return fn
+    return decorator
+
+
+def available_algorithms() -> List[str]:
+    """Returns the names of all registered algorithms."""
+    return sorted(ALGORITHMS)
+
+
+def find_path(graph: Graph, start, goal, algorithm: str = 'astar', trace: bool = False, **options) -> PathResult:
+    """Runs a registered algorithm between two nodes.
+
+    Args:
+        graph (Graph): Graph to search
+        start: Start node, as an index, a name or a Node
+        goal: Goal node, as an index, a name or a Node
+        algorithm (str): Registered algorithm name
+        trace (bool): Record the expanded nodes in the result
+        **options: Algorithm options (heuristic, profile, banned_nodes, respect_locks, ...)
+
+    Returns:
+        PathResult: The path and the search metrics
+
+    Raises:
+        ValueError: If the algorithm or a node is unknown
+    """
+    fn = ALGORITHMS.get(algorithm)
+    if fn is None:
+        raise ValueError(f"Unknown algorithm {algorithm}. Use one of {', '.join(available_algorithms())}.")
+    start_index = graph.resolve(start)
+    goal_index = graph.resolve(goal)
+    stats = SearchStats(explored=[] if trace else None)
+
+    started = time.perf_counter()
+    indices, cost = fn(graph, start_index, goal_index, stats, **options)
+    elapsed = time.perf_counter() - started
+
+    return PathResult(
+        algorithm=algorithm,
+        indices=indices,
+        path=[graph.names[i] for i in indices],
+        cost=cost if indices else INF,
+        nodes_expanded=stats.nodes_expanded,
+        heap_pushes=stats.heap_pushes,
+        elapsed=elapsed,
+        explored=[graph.names[i] for i in stats.explored] if trace else None
+    )
+
+
+def make_heuristic(graph: Graph, goal: int, heuristic: Heuristic = None) -> Callable[[int], float]:
+    """Builds an index -> estimate function.
+
+    Args:
+        graph (Graph): Graph being searched
+        goal (int): Goal index
+        heuristic: 'euclidean', 'manhattan', 'zero', a dict of values per node name, a callable
+            taking a node index, or None to pick the one matching the graph's edge metric
+    """
+    if callable(heuristic):
+        return heuristic
+    if isinstance(heuristic, dict):
+        names = graph.names
+        return lambda i: heuristic.get(names[i], 0)
+    if heuristic is None:
+        heuristic = graph.metric if graph.metric in ('euclidean', 'manhattan') else 'zero'
+    if heuristic == 'euclidean':
+        return lambda i: graph.euclidean(i, goal)
+    if heuristic == 'manhattan':
+        return lambda i: graph.manhattan(i, goal)
+    if heuristic == 'zero':
+        return lambda i: 0.0
+    raise ValueError(f"Unknown heuristic {heuristic}")
+
+
+def _blocked_set(graph: Graph, start: int, banned_nodes: Optional[Set[int]], respect_locks: bool) -> Callable[[int], bool]:
+    """Returns a predicate telling whether a node may not be entered."""
+    banned = banned_nodes or set()
+    if not respect_locks:
+        return lambda i: i in banned
+    return lambda i: i in banned or (i != start and graph.is_locked(i))
+
+
+def _reconstruct(came_from: Dict, state) -> List:
+    """Follows the parent links back from `state` and returns the states in order."""
+    states = [state]
+    while came_from[state] is not None:
+        state = came_from[state]
+        states.append(state)
+    return states[::-1]
+
+
+def _path_cost(graph: Graph, path: List[int]) -> float:
+    return sum(graph.weight(a, b) for a, b in zip(path, path[1:]))
+
+
+@register_algorithm('greedy')
+def greedy_best_first(graph: Graph, start: int, goal: int, stats: SearchStats, heuristic: Heuristic = None,
+                      banned_nodes: Optional[Set[int]] = None, respect_locks: bool = True) -> Tuple[List[int], float]:
+    """Greedy best-first search: always expands the node that looks closest to the goal."""
+    h = make_heuristic(graph, goal, heuristic)
+    blocked = _blocked_set(graph, start, banned_nodes, respect_locks)
+    tie = count()
+    open_set = [(h(start), next(tie), start)]
+    stats.heap_pushes += 1
+    came_from: Dict[int, Optional[int]] = {start: None}
+    explored: Set[int] = set()
+
+    while open_set:
+        _, _, current = heapq.heappop(open_set)
+        if current in explored:
+            continue
+        explored.add(current)
+        stats.nodes_expanded += 1
+        if stats.explored is not None:
+            stats.explored.append(current)
+        if current == goal:
+            path = _reconstruct(came_from, current)
+            return path, _path_cost(graph, path)
+        for neighbour, _ in graph.edges(current):
+            if neighbour in came_from or blocked(neighbour):
+                continue
+            came_from[neighbour] = current
+            heapq.heappush(open_set, (h(neighbour), next(tie), neighbour))
+            stats.heap_pushes += 1
+    return [], INF
+
+
+@register_algorithm('astar')
+def a_star(graph: Graph, start: int, goal: int, stats: SearchStats, heuristic: Heuristic = None,
+           banned_nodes: Optional[Set[int]] = None, banned_edges: Optional[Set[Tuple[int, int]]] = None,
+           respect_locks: bool = True) -> Tuple[List[int], float]:
+    """A* search over the graph's edge weights."""
+    h = make_heuristic(graph, goal, heuristic)
+    blocked = _blocked_set(graph, start, banned_nodes, respect_locks)
+    banned_edges = banned_edges or set()
+    tie = count()
+    g_costs = {start: 0.0}
+    came_from: Dict[int, Optional[int]] = {start: None}
+    open_set = [(h(start), next(tie), 0.0, start)]
+    stats.heap_pushes += 1
+
+    while open_set:
+        _, _, g, current = heapq.heappop(open_set)
+        if g > g_costs[current]:
+            continue  # Stale entry
+        stats.nodes_expanded += 1
+        if stats.explored is not None:
+            stats.explored.append(current)
+        if current == goal:
+            return _reconstruct(came_from, current), g
+        for neighbour, weight in graph.edges(current):
+            if blocked(neighbour) or (current, neighbour) in banned_edges:
+                continue
+            new_g = g + weight
+            if new_g < g_costs.get(neighbour, INF):
+                g_costs[neighbour] = new_g
+                came_from[neighbour] = current
+                heapq.heappush(open_set, (new_g + h(neighbour), next(tie), new_g, neighbour))
+                stats.heap_pushes += 1
+    return [], INF
+
+
+@register_algorithm('dijkstra')
+def dijkstra(graph: Graph, start: int, goal: int, stats: SearchStats, **options) -> Tuple[List[int], float]:
+    """Uniform-cost search (A* without a heuristic)."""
+    options['heuristic'] = 'zero'
+    return a_star(graph, start, goal, stats, **options)
+
+
+@register_algorithm('travel_time')
+def travel_time(graph: Graph, start: int, goal: int, stats: SearchStats, profile: Optional[KinematicProfile] = None,
+                banned_nodes: Optional[Set[int]] = None, respect_locks: bool = True) -> Tuple[List[int], float]:
+    """Fastest path for an agent starting and ending at rest.
+
+    The search state is (node, heading on arrival), so the cost of leaving a node depends on
+    how the agent entered it: gentle turns and full stops are charged with the agent's
+    kinematic profile. The cost is the estimated travel time in seconds, and the heuristic
+    (straight-line distance at cruise speed) never overestimates it.
+    """
+    if profile is None:
+        raise ValueError("The travel_time algorithm needs a kinematic profile")
+    if start == goal:
+        return [start], 0.0
+
+    xs, ys = graph.xs, graph.ys
+    speed = profile.max_speed
+    ramp = profile.ramp_penalty()
+    blocked = _blocked_set(graph, start, banned_nodes, respect_locks)
+
+    def h(i: int) -> float:
+        return graph.euclidean(i, goal) / speed
+
+    tie = count()
+    start_state = (start, -1)
+    g_costs = {start_state: ramp}
+    came_from = {start_state: None}
+    open_set = [(ramp + h(start), next(tie), start_state)]
+    stats.heap_pushes += 1
+
+    while open_set:
+        f, _, state = heapq.heappop(open_set)
+        node, heading = state
+        g = g_costs[state]
+        if f > g + h(node):
+            continue  # Stale entry
+        stats.nodes_expanded += 1
+        if stats.explored is not None:
+            stats.explored.append(node)
+        if node == goal:
+            return [i for i, _ in _reconstruct(came_from, state)], g + ramp
+        for neighbour, _ in graph.edges(node):
+            if blocked(neighbour):
+                continue
+            dx, dy = xs[neighbour] - xs[node], ys[neighbour] - ys[node]
+            new_heading = heading_of(dx, dy)
+            cost = (dx * dx + dy * dy) ** 0.5 / speed
+            if heading >= 0:
+                cost += profile.turn_cost(heading_steps(heading, new_heading))
+            next_state = (neighbour, new_heading)
+            new_g = g + cost
+            if new_g < g_costs.get(next_state, INF):
+                g_costs[next_state] = new_g
+                came_from[next_state] = state
+                heapq.heappush(open_set, (new_g + h(neighbour), next(tie), next_state))
+                stats.heap_pushes += 1
+    return [], INF
@@ -0,0 +1,190 @@
+""" Lookahead reservation of path nodes during execution.
+    Instead of locking one node at a time, an agent holds a sliding window of the next k nodes
+    of its path. The initial window is taken all-or-nothing, so a path that is blocked right
+    ahead fails before the agent moves, and nodes are released as the agent passes them.
+
+    A reservation refused because another agent holds the node is reported to the agent's
+    mixer as a wait-for edge, so deadlocks between executing agents are detected.
+"""
+
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from math import ceil
+from typing import Iterable, List, Optional
+from core.node import Node
+from core.kinematics import segment_length
+from core.lock_manager import LockManager, default_lock_manager
+
+
+@dataclass
+class ReservationStats:
+    """Contention counters for path execution.
+
+    Attributes:
+        executions (int): Number of paths executed
+        completed (int): Executions that reached the end of their path
+        rejected (int): Executions refused because the initial window was not free
+        stalls (int): Window extensions refused while the agent was already moving
+        mid_path_failures (int): Executions that stopped after moving at least one node
+        conflicts (int): Individual node reservations that failed
+        window_total (int): Sum of the window sizes used, for averaging
+        node_conflicts (Counter): Failed reservations per node name
+    """
+    executions: int = 0
+    completed: int = 0
+    rejected: int = 0
+    stalls: int = 0
+    mid_path_failures: int = 0
+    conflicts: int = 0
+    window_total: int = 0
+    node_conflicts: Counter = field(default_factory=Counter)
+
+    @property
+    def mean_window(self) -> float:
+        """Average window size over all executions."""
+        return self.window_total / self.executions if self.executions else 0.0
+
+
+@dataclass
+class ExecutionResult:
+    """Outcome of executing a path.
+
+    Attributes:
+        success (bool): Whether the agent reached the end of the path
+        moves (List[Node]): Nodes the agent actually moved to
+        blocked_node (Optional[Node]): Node that could not be reserved, if any
+        window (int): Window size used for this execution
+    """
+    success: bool
+    moves: List[Node]
+    blocked_node: Optional[Node] = None
+    window: int = 0
+
+
+class ReservationManager:
+    """Executes agent paths while holding a sliding window of reserved nodes.
+
+    The window covers the agent's braking distance (from its kinematic profile) plus a safety
+    margin, so fast agents look further ahead than slow ones.
+
+    Attributes:
+        min_window (int): Smallest window size
+        max_window (int): Largest window size
+        margin (int): Extra nodes reserved beyond the braking distance
+        locks (LockManager): Lock manager the reservations go through
+        stats (ReservationStats): Contention counters
+    """
+
+    def __init__(self, min_window: int = 2, max_window: int = 8, margin: int = 1,
+                 locks: Optional[LockManager] = None):
+        if min_window < 1 or max_window < min_window:
+            raise ValueError("Window sizes must satisfy 1 <= min_window <= max_window")
+        self.min_window = min_window
+        self.max_window = max_window
+        self.margin = margin
+        self.locks = locks or default_lock_manager
+        self.stats = ReservationStats()
+
+    def window_size(self, agent, path: List[Node]) -> int:
+        """Returns the number of nodes the agent should hold ahead of itself on `path`."""
+        profile = agent.kinematics
+        hops = list(zip([agent.node] + path[:-1], path))
+        if profile is None or not hops:
+            return self.min_window
+        mean_segment = sum(segment_length(a, b) for a, b in hops) / len(hops)
+        if mean_segment <= 0:
+            return self.max_window
+        braking = profile.max_speed ** 2 / (2 * profile.acceleration)
+        window = ceil(braking / mean_segment) + self.margin
+        return max(self.min_window, min(self.max_window, window))
+
+    def try_reserve(self, agent, nodes: Iterable[Node]) -> Optional[Node]:
+        """Reserves all nodes for the agent, or none of them.
+
+        A refusal makes the agent wait for the node's holder (`Agent.block`), which may resolve
+        a deadlock right away, by backing this agent or an idle one off.
+
+        Returns:
+            Optional[Node]: None on success, otherwise the first node that was taken
+        """
+        blocked = self.locks.acquire_all(nodes, agent)
+        if blocked is not None:
+            self.stats.conflicts += 1
+            self.stats.node_conflicts[blocked.name] += 1
+            agent.block(blocked)
+        return blocked
+
+    def release(self, agent, nodes: Iterable[Node]) -> None:
+        """Releases reservations the agent holds on nodes it is not standing on."""
+        for node in nodes:
+            if node is not agent.node:
+                self.locks.release(node, agent)
+
+    def execute(self, agent, path: List[Node]) -> ExecutionResult:
+        """Moves an agent along a path, reserving the next nodes ahead of it.
+
+        The agent's motion lock is held throughout. If the agent is backed off to resolve a
+        deadlock while its window is stalled, the execution stops where the agent now stands.
+
+        Args:
+            agent (Agent): Agent to move
+            path (List[Node]): Nodes to visit, excluding the agent's current node
+
+        Returns:
+            ExecutionResult: The nodes moved to and, on failure, the node that blocked the agent
+        """
+        with agent.motion_lock:
+            return self._execute(agent, path)
+
+    def _execute(self, agent, path: List[Node]) -> ExecutionResult:
+        window = self.window_size(agent, path)
+        self.stats.executions += 1
+        self.stats.window_total += window
+
+        blocked = self.try_reserve(agent, path[:window])
+        if blocked is not None:
+            self.stats.rejected += 1
+            return ExecutionResult(False, [], blocked, window)
+
+        ahead = deque(path[:window])
+        next_index = len(ahead)
+        moves: List[Node] = []
+        blocked = None
+        with agent.recording_trajectory():
+            while ahead:
+                node = ahead.popleft()
+                if not agent.move(node):
+                    blocked = node
+                    break
+                moves.append(node)
+                if next_index < len(path):
+                    blocked = self.try_reserve(agent, [path[next_index]])
+                    if blocked is None:
+                        ahead.append(path[next_index])
+                        next_index += 1
+                    else:
+                        self.stats.stalls += 1
+                        if agent.node is not node:
+                            break  # Backed off to resolve a deadlock; its window was released
+
+        if blocked is None and next_index >= len(path):
+            self.stats.completed += 1
+            return ExecutionResult(True, moves, None, window)
+
+        self.release(agent, ahead)
+        if moves:
+            self.stats.mid_path_failures += 1
+        return ExecutionResult(False, moves, blocked or path[next_index], window)
+
+    def snapshot(self, top: int = 10) -> dict:
+        """Returns the counters as a JSON-friendly dict with the most contended nodes."""
+        return {
+            "executions": self.stats.executions,
+            "completed": self.stats.completed,
+            "rejected": self.stats.rejected,
+            "stalls": self.stats.stalls,
+            "mid_path_failures": self.stats.mid_path_failures,
+            "conflicts": self.stats.conflicts,
+            "mean_window": self.stats.mean_window,
+            "most_contended": self.stats.node_conflicts.most_common(top)
+        }
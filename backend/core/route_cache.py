@@ -0,0 +1,309 @@
+""" Bounded cache of k-shortest loopless routes (Yen's algorithm) between node pairs.
+    When a node on an agent's route gets locked, the agent can switch to the best precomputed
+    alternative that is still free instead of running a new search.
+
+    Alternatives are keyed by the (origin, goal) pair an agent planned before it started moving,
+    and computed by a background worker when a pair is first planned, since Yen's search costs
+    far more than a single A* run. Recovery splices the agent's current position into a cached
+    alternative passing through it, and falls back to A* when nothing usable is cached.
+"""
+
+import heapq
+import logging
+import queue
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from itertools import count
+from typing import FrozenSet, Iterable, List, Optional, Set, Tuple
+from core.graph import Graph
+from core.pathfinding import find_path
+
+Route = Tuple[int, ...]
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RouteCacheStats:
+    """Counters describing how the route cache is used."""
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    reroutes: int = 0
+    fallbacks: int = 0  # Reroutes found by A* because no cached alternative was usable
+    prefetched: int = 0
+
+
+def route_cost(graph: Graph, route: Route) -> float:
+    """Returns the sum of the edge weights along a route."""
+    return sum(graph.weight(a, b) for a, b in zip(route, route[1:]))
+
+
+def k_shortest_routes(graph: Graph, start: int, goal: int, k: int) -> List[Route]:
+    """Computes up to k loopless routes from start to goal, cheapest first (Yen's algorithm).
+
+    Equal-cost candidates are common on the 8-connected grid; among those, the one sharing the
+    fewest nodes with routes already accepted wins, so the alternatives spread out instead of
+    differing only in their last hop. Lock state is ignored: the routes describe the layout,
+    and locks are checked when a route is picked.
+
+    Args:
+        graph (Graph): Graph to search
+        start (int): First node of every route
+        goal (int): Last node of every route
+        k (int): Maximum number of routes to return
+
+    Returns:
+        List[Route]: Routes ordered by cost, possibly fewer than k
+    """
+    first = find_path(graph, start, goal, 'dijkstra', respect_locks=False)
+    if not first.found:
+        return []
+    routes = [tuple(first.indices)]
+    seen = set(routes)
+    used_nodes = set(routes[0])
+    candidates: List[Tuple[float, int, int, Route]] = []
+    tie = count()
+
+    while len(routes) < k:
+        previous = routes[-1]
+        for i in range(len(previous) - 1):
+            spur = previous[i]
+            root = previous[:i + 1]
+            # Ban the next edge of every accepted route sharing this root
+            banned_edges = {(r[i], r[i + 1]) for r in routes if len(r) > i + 1 and r[:i + 1] == root}
+            spur_result = find_path(graph, spur, goal, 'dijkstra', banned_nodes=set(root[:-1]),
+                                    banned_edges=banned_edges, respect_locks=False)
+            if not spur_result.found:
+                continue
+            candidate = root[:-1] + tuple(spur_result.indices)
+            if candidate not in seen:
+                seen.add(candidate)
+                overlap = sum(node in used_nodes for node in candidate)
+                heapq.heappush(candidates, (route_cost(graph, candidate), overlap, next(tie), candidate))
+        if not candidates:
+            break
+        route = heapq.heappop(candidates)[3]
+        routes.append(route)
+        used_nodes.update(route)
+    return routes
+
+
+class RouteCache:
+    """LRU cache of k-shortest routes keyed by (start, goal) node index. Thread-safe.
+
+    Routes are computed lazily on first request (or in the background by `prefetch`), so only
+    pairs that are actually planned take memory, and the least recently used pair is evicted
+    once `max_pairs` is reached.
+
+    Attributes:
+        graph (Graph): Graph the routes are computed on
+        k (int): Number of alternative routes kept per pair
+        max_pairs (int): Maximum number of pairs held in the cache
+        stats (RouteCacheStats): Usage counters
+    """
+
+    def __init__(self, graph: Graph, k: int = 4, max_pairs: int = 256):
+        if k < 1:
+            raise ValueError("k must be at least 1")
+        if max_pairs < 1:
+            raise ValueError("max_pairs must be at least 1")
+        self.graph = graph
+        self.k = k
+        self.max_pairs = max_pairs
+        self.stats = RouteCacheStats()
+        self._routes: 'OrderedDict[Tuple[int, int], List[Route]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._pending: Set[Tuple[int, int]] = set()
+        self._queue: 'queue.Queue[Tuple[Graph, Tuple[int, int]]]' = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+
+    def __len__(self) -> int:
+        return len(self._routes)
+
+    def _store(self, graph: Graph, key: Tuple[int, int], routes: List[Route]) -> None:
+        with self._lock:
+            if graph is not self.graph:
+                return  # Computed on a layout that has since been replaced
+            self._routes[key] = routes
+            self._routes.move_to_end(key)
+            if len(self._routes) > self.max_pairs:
+                self._routes.popitem(last=False)
+                self.stats.evictions += 1
+
+    def cached(self, start, goal) -> Optional[List[Route]]:
+        """Returns the alternatives for a pair if they are cached, without computing them."""
+        key = (self.graph.resolve(start), self.graph.resolve(goal))
+        with self._lock:
+            routes = self._routes.get(key)
+            if routes is None:
+                self.stats.misses += 1
+                return None
+            self.stats.hits += 1
+            self._routes.move_to_end(key)
+            return routes
+
+    def routes(self, start, goal) -> List[Route]:
+        """Returns the cached alternatives for a pair, computing them on first use."""
+        routes = self.cached(start, goal)
+        if routes is None:
+            graph = self.graph
+            key = (graph.resolve(start), graph.resolve(goal))
+            routes = k_shortest_routes(graph, key[0], key[1], self.k)
+            self._store(graph, key, routes)
+        return routes
+
+    def prefetch(self, start, goal) -> None:
+        """Queues the alternatives of a planned pair for computation in the background."""
+        graph = self.graph
+        key = (graph.resolve(start), graph.resolve(goal))
+        with self._lock:
+            if key in self._routes or key in self._pending:
+                return
+            self._pending.add(key)
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name='route-cache', daemon=True)
+                self._worker.start()
+        self._queue.put((graph, key))
+
+    def _run(self) -> None:
+        while True:
+            graph, key = self._queue.get()
+            try:
+                self._store(graph, key, k_shortest_routes(graph, key[0], key[1], self.k))
+                self.stats.prefetched += 1
+            except Exception as e:
+                # One bad pair (e.g. indices of a layout replaced meanwhile) must not stop the worker
+                logger.error(f"Route prefetch failed for pair {key}: {e}", exc_info=True)
+            finally:
+                with self._lock:
+                    self._pending.discard(key)
+
+    def best_unblocked(self, start, goal, agent=None) -> Optional[List[int]]:
+        """Returns the cheapest cached route whose nodes are free, in O(k * route length).
+
+        Args:
+            start: Node the agent is standing on (index, name or Node)
+            goal: Target node (index, name or Node)
+            agent (optional): Locks held by this agent do not count as blocking
+
+        Returns:
+            Optional[List[int]]: The route including start, or None if every alternative is blocked
+        """
+        graph = self.graph
+        for route in self.routes(start, goal):
+            if all(not graph.is_locked(i) or graph.owner(i) is agent for i in route[1:]):
+                return list(route)
+        return None
+
+    def reroute(self, origin, goal, position, agent=None) -> Optional[List[int]]:
+        """Finds a free route to the goal for an agent whose move failed part way.
+
+        The cached alternatives of the planned pair are tried first: the cheapest one passing
+        through the agent's position is followed from there if its remaining nodes are free.
+        Otherwise, or when the pair is not cached (yet), A* searches around the locked nodes.
+
+        Args:
+            origin: Node the failed route was planned from (index, name or Node)
+            goal: Target node (index, name or Node)
+            position: Node the agent is standing on now
+            agent (optional): Locks held by this agent do not count as blocking
+
+        Returns:
+            Optional[List[int]]: The route including the position, or None if the goal cannot
+                be reached around the locked nodes
+        """
+        graph = self.graph
+        here = graph.resolve(position)
+        try:
+            routes = self.cached(origin, goal) or ()
+        except ValueError:  # The origin was removed by a layout reload
+            routes = ()
+        for route in routes:
+            if here not in route:
+                continue
+            rest = route[route.index(here):]
+            if all(not graph.is_locked(i) or graph.owner(i) is agent for i in rest[1:]):
+                self.stats.reroutes += 1
+                return list(rest)
+
+        search = find_path(graph, here, goal, 'astar')
+        if not search.found:
+            return None
+        self.stats.reroutes += 1
+        self.stats.fallbacks += 1
+        return list(search.indices)
+
+    def rebind(self, graph: Graph, remap: List[int], touched: Set[int],
+               new_edges: Iterable[Tuple[int, int, float]] = ()) -> int:
+        """Moves the cache onto an edited graph, keeping only pairs the edit cannot affect.
+
+        A pair is dropped if one of its routes runs through a touched node, or if a new (or
+        shortened) edge could take part in a route cheaper than its last alternative. The
+        second test uses a straight-line lower bound, so it only keeps pairs for graphs whose
+        weights are at least that bound (euclidean and manhattan metrics).
+
+        Args:
+            graph (Graph): The edited graph
+            remap (List[int]): New index of every old index (-1 for removed nodes)
+            touched (Set[int]): Old indices of removed or moved nodes and of endpoints of
+                removed edges
+            new_edges (Iterable[Tuple[int, int, float]]): Added or re-weighted edges
+                (from, to, weight) in new indices, one entry per direction
+
+        Returns:
+            int: Number of pairs dropped
+        """
+        with self._lock:
+            return self._rebind(graph, remap, touched, list(new_edges))
+
+    def _rebind(self, graph: Graph, remap: List[int], touched: Set[int],
+                new_edges: List[Tuple[int, int, float]]) -> int:
+        if graph.metric == 'euclidean':
+            bound = graph.euclidean
+        elif graph.metric == 'manhattan':
+            bound = graph.manhattan
+        else:
+            bound = None
+
+        kept: 'OrderedDict[Tuple[int, int], List[Route]]' = OrderedDict()
+        for (start, goal), routes in self._routes.items():
+            if start in touched or goal in touched or any(i in touched for route in routes for i in route):
+                continue
+            start, goal = remap[start], remap[goal]
+            if new_edges:
+                # Fewer than k routes means a new edge may open one more
+                if bound is None or len(routes) < self.k:
+                    continue
+                worst = route_cost(self.graph, routes[-1])
+                if any(bound(start, u) + w + bound(v, goal) < worst for u, v, w in new_edges):
+                    continue
+            kept[(start, goal)] = [tuple(remap[i] for i in route) for route in routes]
+
+        dropped = len(self._routes) - len(kept)
+        self._routes = kept
+        self.graph = graph
+        return dropped
+
+    def invalidate(self, nodes: Optional[FrozenSet[str]] = None) -> int:
+        """Drops cached pairs whose routes touch any of the given node names (all pairs if None).
+
+        Returns:
+            int: Number of pairs dropped
+        """
+        with self._lock:
+            return self._invalidate(nodes)
+
+    def _invalidate(self, nodes: Optional[FrozenSet[str]]) -> int:
+        if nodes is None:
+            dropped = len(self._routes)
+            self._routes.clear()
+            return dropped
+        touched = {self.graph.index[name] for name in nodes if name in self.graph.index}
+        stale = [key for key, routes in self._routes.items()
+                 if key[0] in touched or key[1] in touched
+                 or any(i in touched for route in routes for i in route)]
+        for key in stale:
+            del self._routes[key]
+        return len(stale)
@@ -0,0 +1,266 @@
+""" Priority scheduling of pending tasks.
+    Tasks wait in a binary heap ordered by integer priority (higher first) with aging: every
+    `aging_interval` seconds spent waiting counts as one priority level, so low-priority tasks
+    cannot starve. Since all waiting tasks age at the same rate, the heap key
+    `enqueued - priority * aging_interval` never changes while a task waits and the heap stays
+    valid without re-sorting.
+
+    Tasks with an SLA deadline are also kept in a heap ordered by deadline; once the earliest
+    deadline is less than `deadline_slack` seconds away that task is served first, whatever
+    its priority.
+
+    Cancelling and re-prioritizing use lazy deletion: the old heap entry is only marked dead
+    (O(1)) and skipped when it reaches the top. The heaps are rebuilt when dead entries make
+    up most of them.
+"""
+
+import heapq
+import threading
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from itertools import count
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from core.task import Task
+
+DEFAULT_AGING_INTERVAL = 30.0
+DEFAULT_DEADLINE_SLACK = 10.0
+MIN_COMPACT_SIZE = 64
+
+
+@dataclass
+class ScheduledTask:
+    """A task waiting in the scheduler.
+
+    Attributes:
+        task (Task): The task
+        priority (int): Priority level, higher is served first
+        enqueued (float): Clock time the task was submitted at
+        deadline (Optional[float]): Clock time the task should be assigned by
+        agent (Optional[Any]): Agent the task was ordered for, if any
+        live (bool): False once the entry was cancelled, re-prioritized or popped
+    """
+    task: Task
+    priority: int
+    enqueued: float
+    deadline: Optional[float] = None
+    agent: Optional[Any] = field(default=None, repr=False)
+    live: bool = True
+
+    @property
+    def task_id(self) -> str:
+        return self.task.hash_id
+
+
+@dataclass
+class SchedulerStats:
+    """Counters describing how the scheduler is used."""
+    pushed: int = 0
+    popped: int = 0
+    cancelled: int = 0
+    reprioritized: int = 0
+    deadline_pops: int = 0  # Pops served by deadline rather than priority
+    late: int = 0  # Tasks popped after their deadline
+    compactions: int = 0
+
+
+class TaskScheduler:
+    """Heap-based scheduler with integer priorities, aging, deadlines and cancellation.
+
+    Push, pop and re-prioritize take O(log n); cancel takes O(1). Thread-safe.
+
+    Attributes:
+        aging_interval (float): Seconds of waiting worth one priority level
+        deadline_slack (float): Seconds before its deadline a task is served ahead of priority
+        clock (Callable[[], float]): Time source, in seconds (deadlines use the same clock)
+        stats (SchedulerStats): Usage counters
+    """
+
+    def __init__(self, aging_interval: float = DEFAULT_AGING_INTERVAL, deadline_slack: float = DEFAULT_DEADLINE_SLACK,
+                 clock: Callable[[], float] = time.time):
+        if aging_interval <= 0:
+            raise ValueError("aging_interval must be positive")
+        if deadline_slack < 0:
+            raise ValueError("deadline_slack cannot be negative")
+        self.aging_interval = aging_interval
+        self.deadline_slack = deadline_slack
+        self.clock = clock
+        self.stats = SchedulerStats()
+        self._heap: List[Tuple[float, int, ScheduledTask]] = []
+        self._deadlines: List[Tuple[float, int, ScheduledTask]] = []
+        self._live: Dict[str, ScheduledTask] = {}
+        self._levels: Counter = Counter()
+        self._dead = 0  # Dead entries still in the heaps
+        self._tie = count()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._live)
+
+    def __contains__(self, task_id: str) -> bool:
+        return task_id in self._live
+
+    def _key(self, entry: ScheduledTask) -> float:
+        return entry.enqueued - entry.priority * self.aging_interval
+
+    def _insert(self, entry: ScheduledTask) -> None:
+        tie = next(self._tie)
+        heapq.heappush(self._heap, (self._key(entry), tie, entry))
+        if entry.deadline is not None:
+            heapq.heappush(self._deadlines, (entry.deadline, tie, entry))
+        self._live[entry.task_id] = entry
+        self._levels[entry.priority] += 1
+
+    def _kill(self, entry: ScheduledTask) -> None:
+        entry.live = False
+        del self._live[entry.task_id]
+        self._levels[entry.priority] -= 1
+        if not self._levels[entry.priority]:
+            del self._levels[entry.priority]
+        self._dead += 1 + (entry.deadline is not None)
+
+    def push(self, task: Task, priority: Optional[int] = None, deadline: Optional[float] = None,
+             agent: Optional[Any] = None) -> ScheduledTask:
+        """Adds a task.
+
+        Args:
+            task (Task): Task to schedule
+            priority (int, optional): Priority level, defaults to the task's priority
+            deadline (float, optional): Clock time the task should be assigned by
+            agent (Agent, optional): Agent the task is ordered for
+
+        Returns:
+            ScheduledTask: The scheduler entry of the task
+
+        Raises:
+            ValueError: If the task is already scheduled or the priority is negative
+        """
+        priority = task.priority if priority is None else priority
+        if priority < 0:
+            raise ValueError("Priority cannot be negative")
+        with self._lock:
+            if task.hash_id in self._live:
+                raise ValueError(f"Task {task.hash_id} is already scheduled")
+            entry = ScheduledTask(task, priority, self.clock(), deadline, agent)
+            self._insert(entry)
+            self.stats.pushed += 1
+            return entry
+
+    def _top(self, heap: List[Tuple[float, int, ScheduledTask]]) -> Optional[ScheduledTask]:
+        """Returns the live entry at the top of a heap, dropping dead ones above it."""
+        while heap and not heap[0][2].live:
+            heapq.heappop(heap)
+            self._dead -= 1
+        return heap[0][2] if heap else None
+
+    def _next(self, now: float) -> Tuple[Optional[ScheduledTask], bool]:
+        """Returns the next task and whether it is served for its deadline."""
+        urgent = self._top(self._deadlines)
+        if urgent is not None and urgent.deadline - now <= self.deadline_slack:
+            return urgent, True
+        return self._top(self._heap), False
+
+    def peek(self) -> Optional[ScheduledTask]:
+        """Returns the task pop would return, without removing it."""
+        with self._lock:
+            return self._next(self.clock())[0]
+
+    def pop(self) -> Optional[ScheduledTask]:
+        """Removes and returns the next task, or None if no task is waiting.
+
+        The task whose deadline is closest goes first once it is within `deadline_slack`
+        seconds; otherwise the task with the highest aged priority does.
+        """
+        with self._lock:
+            now = self.clock()
+            entry, by_deadline = self._next(now)
+            if entry is None:
+                return None
+            self.stats.deadline_pops += by_deadline
+            self.stats.late += entry.deadline is not None and entry.deadline < now
+            self._kill(entry)
+            self.stats.popped += 1
+            self._compact()
+            return entry
+
+    def cancel(self, task_id: str) -> bool:
+        """Removes a waiting task; returns False if it is not scheduled."""
+        with self._lock:
+            entry = self._live.get(task_id)
+            if entry is None:
+                return False
+            self._kill(entry)
+            self.stats.cancelled += 1
+            self._compact()
+            return True
+
+    def reprioritize(self, task_id: str, priority: int, deadline: Optional[float] = None) -> bool:
+        """Changes the priority (and optionally the deadline) of a waiting task.
+
+        The task keeps the time it has already waited. Returns False if it is not scheduled.
+
+        Raises:
+            ValueError: If the priority is negative
+        """
+        if priority < 0:
+            raise ValueError("Priority cannot be negative")
+        with self._lock:
+            entry = self._live.get(task_id)
+            if entry is None:
+                return False
+            self._kill(entry)
+            self._insert(ScheduledTask(entry.task, priority, entry.enqueued,
+                                       entry.deadline if deadline is None else deadline, entry.agent))
+            self.stats.reprioritized += 1
+            self._compact()
+            return True
+
+    def _compact(self) -> None:
+        """Rebuilds the heaps without dead entries once these outnumber the live ones."""
+        if self._dead < MIN_COMPACT_SIZE or self._dead * 2 < len(self._heap) + len(self._deadlines):
+            return
+        self._heap = [item for item in self._heap if item[2].live]
+        self._deadlines = [item for item in self._deadlines if item[2].live]
+        heapq.heapify(self._heap)
+        heapq.heapify(self._deadlines)
+        self._dead = 0
+        self.stats.compactions += 1
+
+    def take(self, task_id: str) -> Optional[ScheduledTask]:
+        """Removes and returns a specific waiting task, as if it had been popped."""
+        with self._lock:
+            entry = self._live.get(task_id)
+            if entry is None:
+                return None
+            now = self.clock()
+            self.stats.late += entry.deadline is not None and entry.deadline < now
+            self._kill(entry)
+            self.stats.popped += 1
+            self._compact()
+            return entry
+
+    def get(self, task_id: str) -> Optional[ScheduledTask]:
+        return self._live.get(task_id)
+
+    def pending(self, limit: Optional[int] = None) -> List[ScheduledTask]:
+        """Waiting tasks in the order they would be popped right now (the first `limit` of them)."""
+        with self._lock:
+            now = self.clock()
+            entries = list(self._live.values())
+        urgent = [e for e in entries if e.deadline is not None and e.deadline - now <= self.deadline_slack]
+        rest = [e for e in entries if e.deadline is None or e.deadline - now > self.deadline_slack]
+        if limit is None:
+            return sorted(urgent, key=lambda e: e.deadline) + sorted(rest, key=self._key)
+        urgent = heapq.nsmallest(limit, urgent, key=lambda e: e.deadline)
+        return urgent + heapq.nsmallest(limit - len(urgent), rest, key=self._key)
+
+    def snapshot(self) -> dict:
+        """Returns the counters, queue length and waiting tasks per priority level."""
+        with self._lock:
+            return {
+                **asdict(self.stats),
+                "pending": len(self._live),
+                "levels": {str(level): n for level, n in sorted(self._levels.items(), reverse=True)},
+                "heap_size": len(self._heap),
+            }
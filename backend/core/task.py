@@ -1,6 +1,6 @@
-from typing import Optional
+from typing import Iterable, Optional
 import uuid
-from core.types import TaskType, ITask
+from core.types import TaskStatus, TaskType, ITask
 
 class Task(ITask):
     """Represents a task to be performed by an agent within the warehouse environment.
@@ -11,9 +11,12 @@ class Task(ITask):
         goal_state (str): Target state/location for the task
         job (TaskType): Type of job to be performed
         priority (int): Priority level of the task (0 = normal, 1 = high)
+        status (TaskStatus): Lifecycle state of the task
+        depends_on (Tuple[str, ...]): Ids of the tasks that must complete before this one starts
     """
 
-    def __init__(self, goal_state: str, job: TaskType, priority: int = 0, initial_state: str = "", hash_id: Optional[str] = None):
+    def __init__(self, goal_state: str, job: TaskType, priority: int = 0, initial_state: str = "", hash_id: Optional[str] = None,
+                 status: TaskStatus = TaskStatus.PENDING, depends_on: Optional[Iterable[str]] = None):
         """Initializes a Task instance.
 
         Args:
@@ -22,6 +25,8 @@ class Task(ITask):
             priority (int, optional): The priority level of the task (0 = normal, 1 = high)
             initial_state (str, optional): Description or identifier of the starting state/location
             hash_id (Optional[str], optional): A unique identifier (Primary Key) for the task
+            status (TaskStatus, optional): Lifecycle state of the task
+            depends_on (Iterable[str], optional): Ids of the tasks that must complete first
 
         Raises:
             ValueError: If goal_state or job is empty, or if priority is negative
@@ -38,6 +43,8 @@ class Task(ITask):
         self.goal_state: str = goal_state
         self.job: TaskType = job
         self.priority: int = priority
+        self.status: TaskStatus = status
+        self.depends_on: tuple = tuple(depends_on or ())
 
     def __str__(self) -> str:
         """Return a string representation of the task.
@@ -45,7 +52,7 @@ class Task(ITask):
         Returns:
             str: A human-readable string representation of the task
         """
-        return f"Task(Job='{self.job.name}', Goal='{self.goal_state}', Priority={self.priority}, ID='{self.hash_id}')"
+        return f"Task(Job='{self.job.name}', Goal='{self.goal_state}', Priority={self.priority}, Status={self.status.name}, ID='{self.hash_id}')"
 
     def __repr__(self) -> str:
         """Return a detailed string representation for debugging.
@@ -54,7 +61,7 @@ class Task(ITask):
             str: A detailed string representation of the task
         """
         return (f"Task(hash_id='{self.hash_id}', initial_state='{self.initial_state}', "
-                f"goal_state='{self.goal_state}', job='{self.job.name}', priority={self.priority})")
+                f"goal_state='{self.goal_state}', job='{self.job.name}', priority={self.priority}, status='{self.status.name}')")
 
     def __eq__(self, other: object) -> bool:
         """Check if two tasks are equal based on their unique hash_id.
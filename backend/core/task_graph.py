@@ -0,0 +1,214 @@
+""" Dependencies between tasks.
+    A task may declare the ids of tasks that must complete before it can start (e.g. PICK at a
+    rack -> MOVE to staging -> PLACE at the dock). The task graph holds every unfinished task
+    with its dependencies; a task is released to the scheduler only once all of them completed.
+
+    Each task also gets its critical-path length: the number of tasks on the longest chain
+    from it to the end of its job, itself included. Ready tasks heading long chains are
+    scheduled first, so multi-step jobs finish sooner. Adding a dependent task lengthens the
+    chains of its ancestors; the increase is propagated upwards and reported, so tasks already
+    waiting in the scheduler can be re-prioritized.
+
+    A cancelled or failed task is removed with every task depending on it, directly or not,
+    since none of them can run any more; the chains of its ancestors shrink accordingly.
+"""
+
+import threading
+from collections import deque
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from core.task import Task
+
+
+def topological_order(tasks: Iterable[Task]) -> List[Task]:
+    """Orders tasks so that each comes after the tasks of the batch it depends on.
+
+    Dependencies on tasks outside the batch are ignored.
+
+    Raises:
+        ValueError: If the dependencies within the batch form a cycle
+    """
+    tasks = list(tasks)
+    by_id = {task.hash_id: task for task in tasks}
+    waiting = {task.hash_id: sum(1 for dep in task.depends_on if dep in by_id) for task in tasks}
+    dependents: Dict[str, List[str]] = {}
+    for task in tasks:
+        for dep in task.depends_on:
+            if dep in by_id:
+                dependents.setdefault(dep, []).append(task.hash_id)
+
+    ready = deque(task.hash_id for task in tasks if not waiting[task.hash_id])
+    ordered = []
+    while ready:
+        task_id = ready.popleft()
+        ordered.append(by_id[task_id])
+        for dependent in dependents.get(task_id, ()):
+            waiting[dependent] -= 1
+            if not waiting[dependent]:
+                ready.append(dependent)
+    if len(ordered) < len(tasks):
+        cycle = sorted(task_id for task_id, count in waiting.items() if count)
+        raise ValueError(f"Task dependencies form a cycle: {', '.join(cycle)}")
+    return ordered
+
+
+class TaskGraph:
+    """Unfinished tasks, their dependencies and critical-path lengths. Thread-safe.
+
+    A task can only depend on tasks already in the graph or reported done by `is_done`, so
+    the graph never contains a cycle.
+
+    Attributes:
+        is_done (Callable[[str], bool]): Tells whether a task not in the graph has completed
+    """
+
+    def __init__(self, is_done: Optional[Callable[[str], bool]] = None):
+        self.is_done = is_done or (lambda task_id: False)
+        self._tasks: Dict[str, Task] = {}
+        self._payloads: Dict[str, Any] = {}
+        self._dependents: Dict[str, Set[str]] = {}
+        self._dependencies: Dict[str, Set[str]] = {}  # Unfinished dependencies only
+        self._chain: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    def __contains__(self, task_id: str) -> bool:
+        return task_id in self._tasks
+
+    def add(self, task: Task, payload: Any = None) -> Tuple[bool, List[str]]:
+        """Adds a task.
+
+        Args:
+            task (Task): Task whose `depends_on` lists its dependencies
+            payload (Any): Kept with the task and returned when it is released
+
+        Returns:
+            Tuple[bool, List[str]]: Whether the task is ready now, and the ids of other tasks
+                whose critical-path length grew
+
+        Raises:
+            ValueError: If the task is already in the graph or a dependency is unknown
+        """
+        with self._lock:
+            task_id = task.hash_id
+            if task_id in self._tasks:
+                raise ValueError(f"Task {task_id} is already in the task graph")
+            pending = set()
+            for dep in task.depends_on:
+                if dep == task_id:
+                    raise ValueError(f"Task {task_id} cannot depend on itself")
+                if dep in self._tasks:
+                    pending.add(dep)
+                elif not self.is_done(dep):
+                    raise ValueError(f"Task {task_id} depends on unknown task {dep}")
+            self._tasks[task_id] = task
+            self._payloads[task_id] = payload
+            self._dependencies[task_id] = pending
+            self._dependents[task_id] = set()
+            self._chain[task_id] = 1
+            for dep in pending:
+                self._dependents[dep].add(task_id)
+            return not pending, self._lengthen(pending, 1)
+
+    def _lengthen(self, tasks: Iterable[str], chain: int) -> List[str]:
+        """Raises the critical paths of tasks heading a chain of `chain` tasks, and of their ancestors."""
+        changed = []
+        queue = deque((task_id, chain + 1) for task_id in tasks)
+        while queue:
+            task_id, length = queue.popleft()
+            if length <= self._chain[task_id]:
+                continue
+            self._chain[task_id] = length
+            changed.append(task_id)
+            queue.extend((dep, length + 1) for dep in self._dependencies[task_id])
+        return list(dict.fromkeys(changed))
+
+    def complete(self, task_id: str) -> List[Tuple[Task, Any]]:
+        """Removes a completed task and returns the tasks (with payloads) it was the last
+        unfinished dependency of. Unknown ids are ignored."""
+        with self._lock:
+            if task_id not in self._tasks:
+                return []
+            del self._tasks[task_id]
+            del self._chain[task_id]
+            self._payloads.pop(task_id)
+            for dep in self._dependencies.pop(task_id):
+                self._dependents[dep].discard(task_id)
+            released = []
+            for dependent in self._dependents.pop(task_id):
+                waiting = self._dependencies[dependent]
+                waiting.discard(task_id)
+                if not waiting:
+                    released.append((self._tasks[dependent], self._payloads[dependent]))
+            return released
+
+    def remove(self, task_id: str) -> Tuple[List[str], List[str]]:
+        """Removes a cancelled or failed task together with the tasks depending on it.
+
+        Args:
+            task_id (str): Id of the task; unknown ids are ignored
+
+        Returns:
+            Tuple[List[str], List[str]]: Ids of the dependents removed with it, and ids of the
+                remaining tasks whose critical-path length shrank
+        """
+        with self._lock:
+            if task_id not in self._tasks:
+                return [], []
+            removed = [task_id]
+            seen = {task_id}
+            for current in removed:  # Grows while iterating: breadth-first over the dependents
+                for dependent in self._dependents[current]:
+                    if dependent not in seen:
+                        seen.add(dependent)
+                        removed.append(dependent)
+            parents = set()
+            for current in removed:
+                for dep in self._dependencies.pop(current):
+                    self._dependents[dep].discard(current)
+                    parents.add(dep)
+            for current in removed:
+                del self._tasks[current]
+                del self._payloads[current]
+                del self._dependents[current]
+                del self._chain[current]
+            return removed[1:], self._shorten(parents - seen)
+
+    def _shorten(self, tasks: Iterable[str]) -> List[str]:
+        """Recomputes the critical paths of tasks that lost a dependent, and of their ancestors."""
+        changed = []
+        queue = deque(tasks)
+        while queue:
+            task_id = queue.popleft()
+            length = 1 + max((self._chain[dependent] for dependent in self._dependents[task_id]), default=0)
+            if length == self._chain[task_id]:
+                continue
+            self._chain[task_id] = length
+            changed.append(task_id)
+            queue.extend(self._dependencies[task_id])
+        return list(dict.fromkeys(changed))
+
+    def is_blocked(self, task_id: str) -> bool:
+        """Whether a task in the graph still waits for a dependency."""
+        return bool(self._dependencies.get(task_id))
+
+    def waiting_on(self, task_id: str) -> List[str]:
+        """Unfinished dependencies of a task."""
+        with self._lock:
+            return sorted(self._dependencies.get(task_id, ()))
+
+    def critical_path(self, task_id: str) -> int:
+        """Tasks on the longest chain from a task to the end of its job (1 for a lone task, 0 if unknown)."""
+        return self._chain.get(task_id, 0)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            blocked = sum(1 for deps in self._dependencies.values() if deps)
+            return {
+                "tasks": len(self._tasks),
+                "blocked": blocked,
+                "ready": len(self._tasks) - blocked,
+                "longest_chain": max(self._chain.values(), default=0),
+            }
@@ -0,0 +1,250 @@
+""" In-memory table of task lifecycles.
+    Every task ordered through the Mixer gets a record whose status follows TaskStatus
+    (PENDING -> IN_PROGRESS -> COMPLETED or FAILED). Secondary indexes by status, agent and goal
+    rack are updated on each transition, so dashboards and retries can list the tasks in a given
+    state, of a given agent or bound for a given rack without scanning the table, and counts
+    per status are O(1). Completed tasks are dropped once they are older than the retention
+    window; failed ones stay until retried or removed.
+"""
+
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+from core.task import Task
+from core.types import TaskStatus
+
+DEFAULT_RETENTION = 3600.0
+
+# Status changes allowed by transition()
+TRANSITIONS: Dict[TaskStatus, Tuple[TaskStatus, ...]] = {
+    TaskStatus.PENDING: (TaskStatus.IN_PROGRESS, TaskStatus.FAILED),
+    TaskStatus.IN_PROGRESS: (TaskStatus.COMPLETED, TaskStatus.FAILED, TaskStatus.PENDING),
+    TaskStatus.FAILED: (TaskStatus.PENDING,),
+    TaskStatus.COMPLETED: (),
+}
+
+
+@dataclass
+class TaskRecord:
+    """Lifecycle of one task.
+
+    Attributes:
+        task (Task): The task; its status mirrors the record's
+        agent_id (Optional[int]): Agent the task is ordered for or assigned to
+        rack (Optional[str]): Rack the task's goal belongs to, if any
+        created (float): Time the task was added
+        updated (float): Time of the last transition
+        attempts (int): Number of times the task was started
+        reason (Optional[str]): Why the task last failed
+    """
+    task: Task
+    agent_id: Optional[int] = None
+    rack: Optional[str] = None
+    created: float = 0.0
+    updated: float = 0.0
+    attempts: int = 0
+    reason: Optional[str] = None
+
+    @property
+    def task_id(self) -> str:
+        return self.task.hash_id
+
+    @property
+    def status(self) -> TaskStatus:
+        return self.task.status
+
+    def to_dict(self) -> dict:
+        return {
+            "task_id": self.task_id,
+            "job": self.task.job.name,
+            "goal": self.task.goal_state,
+            "priority": self.task.priority,
+            "status": self.status.name,
+            "depends_on": list(self.task.depends_on),
+            "agent_id": self.agent_id,
+            "rack": self.rack,
+            "created": self.created,
+            "updated": self.updated,
+            "attempts": self.attempts,
+            "reason": self.reason,
+        }
+
+
+class TaskTable:
+    """Task records indexed by id, status, agent and goal rack. Thread-safe.
+
+    Attributes:
+        retention (float): Seconds completed tasks are kept
+        rack_of (Optional[Callable[[str], Optional[str]]]): Maps a goal to its rack id
+        clock (Callable[[], float]): Time source, in seconds
+    """
+
+    def __init__(self, retention: float = DEFAULT_RETENTION, rack_of: Optional[Callable[[str], Optional[str]]] = None,
+                 clock: Callable[[], float] = time.time):
+        if retention < 0:
+            raise ValueError("retention cannot be negative")
+        self.retention = retention
+        self.rack_of = rack_of
+        self.clock = clock
+        self._records: Dict[str, TaskRecord] = {}
+        # Dicts used as insertion-ordered sets: O(1) add and remove, oldest first when listed
+        self._by_status: Dict[TaskStatus, Dict[str, None]] = {status: {} for status in TaskStatus}
+        self._by_agent: Dict[int, Dict[str, None]] = {}
+        self._by_rack: Dict[str, Dict[str, None]] = {}
+        self._completed: Deque[Tuple[float, str]] = deque()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __contains__(self, task_id: str) -> bool:
+        return task_id in self._records
+
+    @staticmethod
+    def _index_add(index: Dict, key, task_id: str) -> None:
+        if key is not None:
+            index.setdefault(key, {})[task_id] = None
+
+    @staticmethod
+    def _index_remove(index: Dict, key, task_id: str) -> None:
+        members = index.get(key)
+        if members is not None:
+            members.pop(task_id, None)
+            if not members:
+                del index[key]
+
+    def add(self, task: Task, agent_id: Optional[int] = None) -> TaskRecord:
+        """Records a new task as PENDING.
+
+        Raises:
+            ValueError: If the task is already in the table
+        """
+        with self._lock:
+            if task.hash_id in self._records:
+                raise ValueError(f"Task {task.hash_id} is already recorded")
+            now = self.clock()
+            task.status = TaskStatus.PENDING
+            record = TaskRecord(task, agent_id, self.rack_of(task.goal_state) if self.rack_of else None, now, now)
+            self._records[task.hash_id] = record
+            self._by_status[TaskStatus.PENDING][task.hash_id] = None
+            self._index_add(self._by_agent, agent_id, task.hash_id)
+            self._index_add(self._by_rack, record.rack, task.hash_id)
+            self._expire(now)
+            return record
+
+    def transition(self, task_id: str, status: TaskStatus, agent_id: Optional[int] = None,
+                   reason: Optional[str] = None) -> TaskRecord:
+        """Moves a task to a new status in O(1).
+
+        Args:
+            task_id (str): Task to update
+            status (TaskStatus): New status, one of TRANSITIONS[current status]
+            agent_id (int, optional): Agent now responsible for the task (kept if None)
+            reason (str, optional): Failure reason, for FAILED
+
+        Returns:
+            TaskRecord: The updated record
+
+        Raises:
+            KeyError: If the task is not in the table
+            ValueError: If the transition is not allowed
+        """
+        with self._lock:
+            record = self._records[task_id]
+            current = record.status
+            if status not in TRANSITIONS[current]:
+                raise ValueError(f"Task {task_id} cannot go from {current.name} to {status.name}")
+            now = self.clock()
+            del self._by_status[current][task_id]
+            self._by_status[status][task_id] = None
+            record.task.status = status
+            record.updated = now
+            if agent_id is not None and agent_id != record.agent_id:
+                self._index_remove(self._by_agent, record.agent_id, task_id)
+                self._index_add(self._by_agent, agent_id, task_id)
+                record.agent_id = agent_id
+            if status == TaskStatus.IN_PROGRESS:
+                record.attempts += 1
+            record.reason = reason if status == TaskStatus.FAILED else None
+            if status == TaskStatus.COMPLETED:
+                self._completed.append((now, task_id))
+            self._expire(now)
+            return record
+
+    def start(self, task_id: str, agent_id: Optional[int] = None) -> TaskRecord:
+        return self.transition(task_id, TaskStatus.IN_PROGRESS, agent_id)
+
+    def complete(self, task_id: str) -> TaskRecord:
+        return self.transition(task_id, TaskStatus.COMPLETED)
+
+    def fail(self, task_id: str, reason: Optional[str] = None) -> TaskRecord:
+        return self.transition(task_id, TaskStatus.FAILED, reason=reason)
+
+    def requeue(self, task_id: str) -> TaskRecord:
+        """Puts a failed or interrupted task back to PENDING."""
+        return self.transition(task_id, TaskStatus.PENDING)
+
+    def _drop(self, task_id: str) -> None:
+        record = self._records.pop(task_id)
+        del self._by_status[record.status][task_id]
+        self._index_remove(self._by_agent, record.agent_id, task_id)
+        self._index_remove(self._by_rack, record.rack, task_id)
+
+    def remove(self, task_id: str) -> bool:
+        """Deletes a task record; returns False if it is not in the table."""
+        with self._lock:
+            if task_id not in self._records:
+                return False
+            self._drop(task_id)
+            return True
+
+    def _expire(self, now: float) -> None:
+        """Drops completed tasks older than the retention window."""
+        completed = self._completed
+        while completed and completed[0][0] <= now - self.retention:
+            _, task_id = completed.popleft()
+            record = self._records.get(task_id)
+            if record is not None and record.status == TaskStatus.COMPLETED:
+                self._drop(task_id)
+
+    def get(self, task_id: str) -> Optional[TaskRecord]:
+        return self._records.get(task_id)
+
+    def _select(self, ids, limit: Optional[int], status: Optional[TaskStatus]) -> List[TaskRecord]:
+        records = []
+        for task_id in ids:
+            record = self._records[task_id]
+            if status is None or record.status == status:
+                records.append(record)
+                if limit is not None and len(records) >= limit:
+                    break
+        return records
+
+    def by_status(self, status: TaskStatus, limit: Optional[int] = None) -> List[TaskRecord]:
+        """Tasks in a status, oldest transition first."""
+        with self._lock:
+            self._expire(self.clock())
+            return self._select(self._by_status[status], limit, None)
+
+    def by_agent(self, agent_id: int, status: Optional[TaskStatus] = None,
+                 limit: Optional[int] = None) -> List[TaskRecord]:
+        """Tasks of an agent, optionally in one status."""
+        with self._lock:
+            self._expire(self.clock())
+            return self._select(self._by_agent.get(agent_id, ()), limit, status)
+
+    def by_rack(self, rack: str, status: Optional[TaskStatus] = None,
+                limit: Optional[int] = None) -> List[TaskRecord]:
+        """Tasks bound for a rack, optionally in one status."""
+        with self._lock:
+            self._expire(self.clock())
+            return self._select(self._by_rack.get(rack, ()), limit, status)
+
+    def counts(self) -> Dict[str, int]:
+        """Number of tasks per status."""
+        with self._lock:
+            self._expire(self.clock())
+            return {status.name: len(ids) for status, ids in self._by_status.items()}
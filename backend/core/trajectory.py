@@ -0,0 +1,213 @@
+""" Bounded path history for agents.
+    `Trajectory` keeps the most recent nodes an agent visited in a fixed-size ring buffer, so
+    append and backtrack are O(1) and memory does not grow over a shift. Nodes falling out of
+    the buffer are handed in batches to a spill callback, typically `TrajectoryArchive.spill`,
+    which appends them to a compact binary file.
+"""
+
+import os
+import struct
+import threading
+from typing import Callable, Iterator, List, Optional, Tuple
+from core.node import Node
+
+DEFAULT_DEPTH = 256
+DEFAULT_SPILL_BATCH = 64
+CHUNK_SIZE = 1 << 20
+
+# Called with (first step number, nodes) for every batch of evicted history
+SpillFn = Callable[[int, List[Node]], None]
+
+
+class Trajectory:
+    """Fixed-capacity ring buffer of the nodes an agent visited, oldest first.
+
+    Every appended node gets a step number (0 for the first). Indexing works like a list over
+    the buffered nodes, so `trajectory[-1]` is the current node.
+
+    Attributes:
+        capacity (int): Maximum number of buffered nodes
+        spill (Optional[SpillFn]): Receives evicted nodes; without one they are dropped
+        spill_batch (int): Evicted nodes collected before each spill call
+    """
+
+    def __init__(self, capacity: int = DEFAULT_DEPTH, spill: Optional[SpillFn] = None,
+                 spill_batch: int = DEFAULT_SPILL_BATCH):
+        if capacity < 2:
+            raise ValueError("capacity must be at least 2")
+        if spill_batch < 1:
+            raise ValueError("spill_batch must be at least 1")
+        self.capacity = capacity
+        self.spill = spill
+        self.spill_batch = spill_batch
+        self._slots: List[Optional[Node]] = [None] * capacity
+        self._head = 0       # Slot of the oldest buffered node
+        self._size = 0
+        self._first = 0      # Step number of the oldest buffered node
+        self._pending: List[Node] = []
+        self._pending_first = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __bool__(self) -> bool:
+        return self._size > 0
+
+    @property
+    def steps(self) -> int:
+        """Step number the next appended node will get."""
+        return self._first + self._size
+
+    def _slot(self, i: int) -> int:
+        if i < 0:
+            i += self._size
+        if not 0 <= i < self._size:
+            raise IndexError("trajectory index out of range")
+        return (self._head + i) % self.capacity
+
+    def __getitem__(self, i: int) -> Node:
+        return self._slots[self._slot(i)]
+
+    def __iter__(self) -> Iterator[Node]:
+        for i in range(self._size):
+            yield self._slots[(self._head + i) % self.capacity]
+
+    def append(self, node: Node) -> None:
+        """Adds a node, evicting the oldest one if the buffer is full."""
+        if self._size == self.capacity:
+            self._evict(self._slots[self._head])
+            self._head = (self._head + 1) % self.capacity
+            self._first += 1
+            self._size -= 1
+        self._slots[(self._head + self._size) % self.capacity] = node
+        self._size += 1
+
+    def drop_last(self, count: int) -> None:
+        """Forgets the `count` most recent nodes (used when backtracking)."""
+        if not 0 <= count <= self._size:
+            raise ValueError(f"Cannot drop {count} of {self._size} buffered nodes")
+        for _ in range(count):
+            self._size -= 1
+            self._slots[(self._head + self._size) % self.capacity] = None
+
+    def clear(self, keep_last: bool = True) -> None:
+        """Spills the buffered history, keeping only the current node if asked to."""
+        keep = 1 if keep_last and self._size else 0
+        while self._size > keep:
+            self._evict(self._slots[self._head])
+            self._slots[self._head] = None
+            self._head = (self._head + 1) % self.capacity
+            self._first += 1
+            self._size -= 1
+        self.flush()
+
+    def _evict(self, node: Node) -> None:
+        if self.spill is None:
+            return
+        if not self._pending:
+            self._pending_first = self._first
+        self._pending.append(node)
+        if len(self._pending) >= self.spill_batch:
+            self.flush()
+
+    def flush(self) -> None:
+        """Hands the evicted nodes collected so far to the spill callback."""
+        if self._pending and self.spill is not None:
+            pending, self._pending = self._pending, []
+            self.spill(self._pending_first, pending)
+
+    def to_list(self) -> List[Node]:
+        return list(self)
+
+
+class TrajectoryArchive:
+    """Append-only binary file of spilled trajectory steps, shared by all agents.
+
+    The file is a sequence of records: b'N' + uint16 length + UTF-8 name defines the next
+    name id, and b'S' + (agent id, step, name id) records one step, 17 bytes.
+
+    Attributes:
+        path (str): Archive file
+    """
+
+    NAME = struct.Struct('<cH')
+    STEP = struct.Struct('<cIQI')
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._names = {}
+        end = 0
+        for kind, payload, end in self._records():
+            if kind == b'N':
+                self._names[payload] = len(self._names)
+        self._file = open(path, 'ab')
+        if self._file.tell() > end:
+            self._file.truncate(end)  # Drop a record torn by an interrupted write
+        self._lock = threading.Lock()
+
+    def _records(self) -> Iterator[Tuple[bytes, object, int]]:
+        """Yields (kind, payload, end offset) for every complete record, reading in chunks."""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'rb') as f:
+            data, offset, pos = b'', 0, 0
+            while True:
+                chunk = f.read(CHUNK_SIZE)
+                if not chunk:
+                    return
+                data = data[pos:] + chunk
+                offset += pos
+                pos = 0
+                while pos < len(data):
+                    kind = data[pos:pos + 1]
+                    if kind == b'N' and pos + self.NAME.size <= len(data):
+                        _, length = self.NAME.unpack_from(data, pos)
+                        end = pos + self.NAME.size + length
+                        if end > len(data):
+                            break
+                        yield kind, data[pos + self.NAME.size:end].decode(), offset + end
+                    elif kind == b'S' and pos + self.STEP.size <= len(data):
+                        end = pos + self.STEP.size
+                        yield kind, self.STEP.unpack_from(data, pos)[1:], offset + end
+                    elif kind in (b'N', b'S'):
+                        break  # Incomplete record; the next chunk may finish it
+                    else:
+                        return
+                    pos = end
+
+    def spiller(self, agent_id: int) -> SpillFn:
+        """Returns a spill callback writing an agent's evicted steps to the archive."""
+        return lambda first, nodes: self.spill(agent_id, first, nodes)
+
+    def spill(self, agent_id: int, first: int, nodes: List[Node]) -> None:
+        """Appends consecutive steps of one agent, starting at step `first`."""
+        chunks = []
+        with self._lock:
+            for step, node in enumerate(nodes, first):
+                name_id = self._names.get(node.name)
+                if name_id is None:
+                    name_id = len(self._names)
+                    self._names[node.name] = name_id
+                    encoded = node.name.encode()
+                    chunks.append(self.NAME.pack(b'N', len(encoded)) + encoded)
+                chunks.append(self.STEP.pack(b'S', agent_id, step, name_id))
+            self._file.write(b''.join(chunks))
+
+    def flush(self) -> None:
+        with self._lock:
+            self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+    def read(self, agent_id: Optional[int] = None) -> Iterator[Tuple[int, int, str]]:
+        """Yields archived (agent id, step, node name) records, optionally for one agent."""
+        self.flush()
+        names = []
+        for kind, payload, _ in self._records():
+            if kind == b'N':
+                names.append(payload)
+            elif agent_id is None or payload[0] == agent_id:
+                yield payload[0], payload[1], names[payload[2]]
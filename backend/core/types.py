@@ -1,10 +1,14 @@
 from enum import Enum, auto
-from typing import Protocol, List, Optional, Dict, Tuple, Any
+from typing import Protocol, List, Optional, Dict, Tuple, Any, TYPE_CHECKING
 from datetime import datetime
 from dataclasses import dataclass
-from backend.core import Node
-from backend.core import Task
-from backend.core import Warehouse
+
+if TYPE_CHECKING:
+    from core.node import Node
+    from core.task import Task
+    from core.warehouse import Warehouse
+    from core.scheduler import TaskScheduler
+    from core.task_table import TaskTable
 
 # Enums
 class AgentStatus(Enum):
@@ -27,6 +31,9 @@ class NodeType(Enum):
     NORMAL = "NORMAL"
     CENTER = "CENTER"
 
+# Stable integer codes for node types, used by the compiled map and the node store
+NODE_TYPES = list(NodeType)
+
 class TaskType(Enum):
     """Types of tasks in the warehouse."""
     PICK = "PICK"
@@ -69,16 +76,33 @@ class IAgent(Protocol):
 class IMixer(Protocol):
     """Interface for mixer objects."""
     warehouse: 'Warehouse'
-    tasks: List['Task']
-    priority_tasks: List['Task']
+    scheduler: 'TaskScheduler'
+    task_table: 'TaskTable'
     agents: Dict[str, IAgent]
     logs: List[str]
     log_file: str
 
-    def log_event(self, event_type: str, message: str, agent: Optional[IAgent] = None, task: Optional['Task'] = None) -> None:
+    def log_event(self, event_type: str, message: str, agent: Optional[IAgent] = None, task: Optional['Task'] = None,
+                  data: Optional[dict] = None) -> None:
         """Logs an event in the system."""
         pass
 
+    def agent_blocked(self, agent: IAgent, node: 'Node') -> None:
+        """Records that an agent could not take a locked node."""
+        pass
+
+    def agent_unblocked(self, agent: IAgent) -> None:
+        """Records that a blocked agent moved again."""
+        pass
+
+    def complete_task(self, task: 'Task') -> None:
+        """Records that a task was completed."""
+        pass
+
+    def log_trajectory(self, agent: IAgent, nodes: List[Any], offsets: List[int], task: Optional['Task'] = None) -> None:
+        """Logs a whole path execution as one event."""
+        pass
+
 class ITask(Protocol):
     """Protocol defining the interface for a Task."""
     hash_id: str
@@ -86,6 +110,8 @@ class ITask(Protocol):
     goal_state: str
     job: TaskType
     priority: int
+    status: TaskStatus
+    depends_on: Tuple[str, ...]
 
 # Schema Classes
 @dataclass
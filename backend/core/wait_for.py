@@ -0,0 +1,124 @@
+""" Wait-for graph between agents.
+    When an agent fails to move because its next node is locked by another agent, an edge is
+    recorded from the blocked agent to the holder (`Node.locked_by`). An agent waits for one
+    node at a time, so every agent has at most one outgoing edge and a new edge closes a cycle
+    exactly when following the edges from the holder leads back to the blocked agent. Deadlock
+    detection therefore only walks the chain the new edge joined, not the whole fleet.
+
+    Edges are not removed when the holder moves away; instead every edge of a cycle is checked
+    against the current lock state before the cycle is reported.
+"""
+
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set
+
+
+@dataclass
+class WaitEdge:
+    """A blocked agent waiting for a node held by another agent.
+
+    Attributes:
+        waiter (Agent): Agent that could not move
+        holder (Agent): Agent holding the node
+        node (Node): Node the waiter tried to move to
+    """
+    waiter: object
+    holder: object
+    node: object
+
+    def is_current(self) -> bool:
+        """Whether the holder still holds the node."""
+        return getattr(self.node.locked_by, 'agent_id', None) == self.holder.agent_id
+
+
+class WaitForGraph:
+    """Agents waiting for nodes held by other agents, keyed by agent_id. Thread-safe."""
+
+    def __init__(self):
+        self._edges: Dict[int, WaitEdge] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._edges)
+
+    def wait(self, agent, node) -> Optional[List[WaitEdge]]:
+        """Records that an agent is blocked on a node and checks for a deadlock.
+
+        Args:
+            agent (Agent): Agent that failed to move
+            node (Node): Node it tried to move to
+
+        Returns:
+            Optional[List[WaitEdge]]: The edges of the cycle the agent is now part of, starting
+                with its own, or None if it is not deadlocked (including when the node is free
+                or held by something other than an agent)
+        """
+        holder = node.locked_by if node is not None else None
+        if getattr(holder, 'agent_id', None) is None or holder.agent_id == agent.agent_id:
+            self.clear(agent)
+            return None
+        with self._lock:
+            self._edges[agent.agent_id] = WaitEdge(agent, holder, node)
+            return self._cycle_from(agent.agent_id)
+
+    def _cycle_from(self, start: int) -> Optional[List[WaitEdge]]:
+        """Follows the edges from an agent; returns them if they lead back to it."""
+        path = []
+        seen: Set[int] = set()
+        current = start
+        while current in self._edges and current not in seen:
+            seen.add(current)
+            edge = self._edges[current]
+            if not edge.is_current():
+                return None
+            path.append(edge)
+            current = edge.holder.agent_id
+            if current == start:
+                return path
+        return None
+
+    def clear(self, agent) -> None:
+        """Removes an agent's outgoing edge (it moved, or stopped trying)."""
+        with self._lock:
+            self._edges.pop(agent.agent_id, None)
+
+    def remove(self, agent) -> None:
+        """Forgets an agent: its edge and the edges of agents waiting for it."""
+        with self._lock:
+            self._edges.pop(agent.agent_id, None)
+            for waiter in [w for w, edge in self._edges.items() if edge.holder.agent_id == agent.agent_id]:
+                del self._edges[waiter]
+
+    def waiting_for(self, agent) -> Optional[WaitEdge]:
+        return self._edges.get(agent.agent_id)
+
+    def cycles(self) -> List[List[WaitEdge]]:
+        """Returns every current deadlock cycle, dropping edges that are no longer current."""
+        with self._lock:
+            for waiter in [w for w, edge in self._edges.items() if not edge.is_current()]:
+                del self._edges[waiter]
+            found = []
+            state: Dict[int, int] = {}  # 1 = on the current walk, 2 = done
+            for start in self._edges:
+                walk = []
+                current = start
+                while current in self._edges and current not in state:
+                    state[current] = 1
+                    walk.append(current)
+                    current = self._edges[current].holder.agent_id
+                if state.get(current) == 1:
+                    cycle = walk[walk.index(current):]
+                    found.append([self._edges[member] for member in cycle])
+                for member in walk:
+                    state[member] = 2
+            return found
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "waiting": len(self._edges),
+                "edges": [{"agent_id": edge.waiter.agent_id, "holder_id": edge.holder.agent_id,
+                           "node": edge.node.name, "current": edge.is_current()}
+                          for edge in self._edges.values()],
+            }
@@ -1,9 +1,13 @@
 from typing import Dict, Optional, List, TYPE_CHECKING
 from math import sqrt
-from core.node import Node, NodeType
+import numpy as np
+from core.node import Node, NodeStore, NodeType
 from core.task import Task
-from schema.warehouse import FactsTable
-from schema.storage import Rack, Shelf
+from core.scheduler import TaskScheduler
+from core.graph import Graph
+from core.map_artifact import MapArtifact, load_map
+from core.map_validation import FLAG_GOAL, FLAG_LOCKED
+from core.types import NODE_TYPES, FactsTable, Rack, Shelf
 from dataclasses import dataclass, field
 import uuid
 import json
@@ -23,16 +27,24 @@ class Warehouse:
         racks (Dict[str, Rack]): All racks in the warehouse, keyed by rack ID
         shelves (Dict[str, Shelf]): All shelves in the warehouse, keyed by shelf ID
         agents (Dict[str, Agent]): All agents in the warehouse
-        tasks (List[Task]): All tasks in the warehouse
+        tasks (TaskScheduler): Tasks waiting to be assigned
         goal (Optional[Node]): Current goal node for pathfinding
+        graph (Optional[Graph]): Indexed graph over the nodes, built on first use
+        access_nodes (Dict[str, List[str]]): Access node names per rack side (e.g. "A1L")
+        artifact (Optional[MapArtifact]): Compiled map the warehouse was loaded from, if any
+        store (Optional[NodeStore]): Column storage behind the nodes, for bulk queries
     """
     facts: FactsTable
     nodes: Dict[str, Node] = field(default_factory=dict)
     racks: Dict[str, Rack] = field(default_factory=dict)
     shelves: Dict[str, Shelf] = field(default_factory=dict)
     agents: Dict[str, 'Agent'] = field(default_factory=dict)
-    tasks: List[Task] = field(default_factory=list)
+    tasks: TaskScheduler = field(default_factory=TaskScheduler)
     goal: Optional[Node] = None
+    graph: Optional[Graph] = field(default=None, repr=False, compare=False)
+    access_nodes: Dict[str, List[str]] = field(default_factory=dict)
+    artifact: Optional[MapArtifact] = field(default=None, repr=False, compare=False)
+    store: Optional[NodeStore] = field(default=None, repr=False, compare=False)
     
     @classmethod
     def create_default(cls) -> 'Warehouse':
@@ -51,12 +63,13 @@ class Warehouse:
             item_length=0.5
         )
         
-        # Create a 5x5 grid of nodes
+        # Create a 5x5 grid of nodes in one shared store
+        store = NodeStore(25)
         nodes: Dict[str, Node] = {}
         for i in range(5):
             for j in range(5):
                 node_hash = f"node_{i}_{j}"
-                nodes[node_hash] = Node(float(i), float(j), node_hash, {}, 0.0)
+                nodes[node_hash] = Node(x=float(i), y=float(j), node_type=NodeType.NORMAL, name=node_hash, store=store)
         
         # Connect nodes (up, down, left, right)
         for i in range(5):
@@ -102,7 +115,7 @@ class Warehouse:
                     is_locked=False
                 )
         
-        return cls(facts=facts, nodes=nodes, racks=racks, shelves=shelves)
+        return cls(facts=facts, nodes=nodes, racks=racks, shelves=shelves, store=store)
     
     @classmethod
     def load_from_json(cls, json_path: str) -> 'Warehouse':
@@ -193,12 +206,108 @@ class Warehouse:
         except Exception as e:
             raise ValueError(f"Failed to load warehouse from {json_path}: {str(e)}")
     
+    @classmethod
+    def load(cls, map_path: str, lookup_path: Optional[str] = None, artifact_path: Optional[str] = None) -> 'Warehouse':
+        """Loads the warehouse from the compiled map, recompiling it when the sources changed.
+
+        Args:
+            map_path (str): Path to map.json
+            lookup_path (Optional[str]): Path to lookup_table.json
+            artifact_path (Optional[str]): Compiled map path, defaults to map.bin next to map.json
+
+        Returns:
+            Warehouse: A new Warehouse instance with the loaded configuration
+
+        Raises:
+            ValueError: If the sources are invalid
+        """
+        return cls.from_artifact(load_map(map_path, lookup_path, artifact_path))
+
+    @classmethod
+    def from_artifact(cls, artifact: MapArtifact) -> 'Warehouse':
+        """Builds a warehouse from a compiled map.
+
+        The indexed graph reads coordinates and edges straight from the mapped arrays, so only
+        the Node objects themselves are allocated.
+
+        Args:
+            artifact (MapArtifact): The opened artifact
+
+        Returns:
+            Warehouse: A new Warehouse instance
+        """
+        facts = FactsTable(
+            name="Warehouse",
+            location="Default",
+            warehouse_width=20.0,
+            warehouse_length=30.0,
+            warehouse_height=5.0,
+            n_racks=artifact.rack_count,
+            n_shelfs_per_rack=3,
+            shelfs_max_height=[1.0, 2.0, 3.0],
+            shelf_max_width=2.0,
+            item_length=0.5
+        )
+        warehouse = cls(facts=facts, artifact=artifact)
+        a = artifact.arrays
+
+        # Nodes, in artifact index order, as views over one store
+        flags = np.asarray(a['node_flg'])
+        warehouse.store = NodeStore.from_arrays(artifact.node_names(), a['node_x'], a['node_y'], a['node_typ'],
+                                                locked=flags & FLAG_LOCKED, goals=flags & FLAG_GOAL)
+        node_list = warehouse.store.views()
+        warehouse.nodes = {node.name: node for node in node_list}
+
+        # Neighbours from the CSR edges
+        offsets, targets, weights = a['edge_off'], a['edge_tgt'], a['edge_wt']
+        for i, node in enumerate(node_list):
+            for e in range(offsets[i], offsets[i + 1]):
+                node.neighbours[node_list[targets[e]]] = weights[e]
+        warehouse.graph = artifact.graph(nodes=node_list)
+
+        # Racks and shelves
+        rack_ids = artifact.rack_ids()
+        for r, rack_id in enumerate(rack_ids):
+            start, center, end = artifact.rack_coords(r)
+            warehouse.racks[rack_id] = Rack(
+                rack_id=rack_id,
+                is_frozen=bool(a['rack_frz'][r]),
+                current_capacity=a['rack_cap'][r],
+                start_coords=start,
+                center_coords=center,
+                end_coords=end
+            )
+        for s, shelf_id in enumerate(artifact.shelf_ids()):
+            warehouse.shelves[shelf_id] = Shelf(
+                shelf_id=shelf_id,
+                rack_id=rack_ids[a['shlf_rck'][s]],
+                z_level=a['shlf_z'][s],
+                current_weight=0.0,
+                is_locked=False
+            )
+
+        warehouse.access_nodes = artifact.lookup_table()
+        return warehouse
+
+    def get_graph(self) -> Graph:
+        """Returns the indexed graph used by the path planning engines, building it on first use."""
+        if self.graph is None:
+            self.graph = Graph.from_nodes(self.nodes.values())
+        return self.graph
+
+    def get_store(self) -> NodeStore:
+        """Returns the store behind the nodes, moving them into a fresh one if they do not share one."""
+        if self.store is None:
+            self.store = NodeStore(len(self.nodes))
+            for node in self.nodes.values():
+                self.store.adopt(node)
+        return self.store
+
     def get_node(self, x: int, y: int) -> Optional[Node]:
         """Returns the node at the given coordinates."""
-        for node in self.nodes.values():
-            if node.x == x and node.y == y:
-                return node
-        return None
+        store = self.get_store()
+        i = store.find(x, y)
+        return store.node(i) if i is not None else None
 
     def get_node_by_name(self, name: str) -> Optional[Node]:
         """Returns the node with the given name."""
@@ -211,6 +320,16 @@ class Warehouse:
                 return rack
         return None
 
+    def goal_rack(self, goal: str) -> Optional[str]:
+        """Returns the rack id a task goal refers to: a rack id, a rack side (e.g. "A1L") or
+        one of its access nodes; None for other goals."""
+        if goal in self.racks:
+            return goal
+        for side, names in self.access_nodes.items():
+            if goal == side or goal in names:
+                return side[:-1] if side[:-1] in self.racks else side
+        return None
+
     def get_shelves_for_rack(self, rack: Rack) -> List[Shelf]:
         """Returns all shelves in the given rack."""
         return list(rack.shelves.values())
@@ -245,24 +364,24 @@ class Warehouse:
         for node in self.nodes.values():
             node.set_heuristic(self.get_distance(node, self.goal))
 
-    def add_task(self, task: Task):
-        """Adds a task to the warehouse task list.
+    def add_task(self, task: Task, deadline: Optional[float] = None):
+        """Adds a task to the warehouse task scheduler.
 
         Args:
             task (Task): The task to add.
+            deadline (float, optional): Unix time the task should be assigned by.
         """
-        self.tasks.append(task)
+        self.tasks.push(task, deadline=deadline)
 
     def assign_task(self, agent: 'Agent'):
-        """Assigns the highest priority task to an agent.
+        """Assigns the next task (highest aged priority, or a task close to its deadline) to an agent.
 
         Args:
             agent (Agent): The agent to assign the task to.
         """
-        if self.tasks:
-            # Sort tasks by priority (lower priority value means higher priority)
-            self.tasks.sort(key=lambda x: x.priority)
-            task = self.tasks.pop(0)  # Get the highest priority task
+        scheduled = self.tasks.pop()
+        if scheduled is not None:
+            task = scheduled.task
             agent.set_goal(task.goal_state)
             print(f"Assigned Task {task.job} to Agent {agent}.")
         else:
@@ -270,29 +389,23 @@ class Warehouse:
 
     def calculate_heuristics(self, goal_node: Node, agent_type: AgentType) -> Dict[str, float]:
         """Calculates heuristic values for all nodes based on the goal and agent type."""
-        heuristics = {}
-        
-        for node_name, node in self.nodes.items():
-            # Base heuristic is Manhattan distance
-            distance = abs(node.x - goal_node.x) + abs(node.y - goal_node.y)
-            
-            # Adjust heuristic based on agent type
-            if agent_type == AgentType.PICKER:
-                # Pickers prefer paths with fewer obstacles
-                if node.type == NodeType.CENTER:
-                    distance += 2  # Penalize rack centers
-                elif node.type == NodeType.ENTRY or node.type == NodeType.EXIT:
-                    distance -= 1  # Favor entry/exit points
-            elif agent_type == AgentType.TRANSPORTER:
-                # Transporters prefer straight paths
-                if node.type == NodeType.CENTER:
-                    distance += 3  # Strongly penalize rack centers
-                elif node.type == NodeType.ENTRY or node.type == NodeType.EXIT:
-                    distance -= 2  # Strongly favor entry/exit points
-            
-            heuristics[node_name] = distance
-            
-        return heuristics
+        store = self.get_store()
+        n = len(store)
+
+        # Base heuristic is Manhattan distance
+        distance = np.abs(store.xs[:n] - goal_node.x) + np.abs(store.ys[:n] - goal_node.y)
+
+        # Adjust heuristic based on agent type
+        center = store.types[:n] == NODE_TYPES.index(NodeType.CENTER)
+        gate = np.isin(store.types[:n], [NODE_TYPES.index(NodeType.ENTRY), NODE_TYPES.index(NodeType.EXIT)])
+        if agent_type == AgentType.PICKER:
+            # Pickers prefer paths with fewer obstacles
+            distance += np.where(center, 2, 0) - np.where(gate, 1, 0)
+        elif agent_type == AgentType.TRANSPORTER:
+            # Transporters prefer straight paths
+            distance += np.where(center, 3, 0) - np.where(gate, 2, 0)
+
+        return {name: distance[node.index].item() for name, node in self.nodes.items()}
 
     def __repr__(self):
         """String representation of the Warehouse map."""
@@ -3,43 +3,42 @@
     also contains 2 functions to calculate distances between 2 points , if you want you can implement other distances.
 """
 
-import json
-from core.node import Node
+from core.node import Node, NodeStore
+from core.map_validation import normalize_map
 
 def load_nodes_from_json(file_path: str,distance = "Euclidean") -> dict:
-    with open(file_path, 'r') as f:
-        data = json.load(f)
+    if distance not in ("Euclidean", "Manhattan"):
+        raise ValueError("Unsupported distance metric. Use 'Euclidean' or 'Manhattan'.")
 
-    raw_nodes = data["nodes"]
+    # Validation stage: raises MapValidationError listing every problem, and makes edges symmetric
+    normalized, _ = normalize_map(file_path)
+    raw_nodes = normalized.nodes
 
-    # First pass: Create Node objects
+    # First pass: Create Node objects, all backed by one store
     nodes = {}
+    store = NodeStore(normalized.node_count)
     for node_id, info in raw_nodes.items():
         node = Node(
             x=info["x"],
             y=info["y"],
-            hash=node_id, # type: ignore
-            neighbours={},  # Temporary
-            value=0.0 # type: ignore
-        ) # type: ignore
-        node.locked = info.get("locked", False)
-        node.heuristic = info.get("heuristic", 0) # type: ignore
-        node.type = info.get("type", "normal") # type: ignore
+            node_type=info["type"],
+            name=node_id,
+            locked=info["locked"],
+            is_goal=info["is_goal"],
+            store=store
+        )
         nodes[node_id] = node
 
     # Second pass: Assign neighbors with distance
     for node_id, info in raw_nodes.items():
         node = nodes[node_id]
         for neighbor_id in info["neighbours"]:
-            if neighbor_id in nodes:
-                neighbor = nodes[neighbor_id]
-                if distance == "Euclidean":
-                    dist = node.get_distance(neighbor)
-                elif distance == "Manhattan":
-                    dist = manhattan_distance(node.x, neighbor.x, node.y, neighbor.y)
-                else:
-                    raise ValueError("Unsupported distance metric. Use 'Euclidean' or 'Manhattan'.")
-                node.neighbours[neighbor] = dist
+            neighbor = nodes[neighbor_id]
+            if distance == "Euclidean":
+                dist = euclidean_distance(node.x, neighbor.x, node.y, neighbor.y)
+            else:
+                dist = manhattan_distance(node.x, neighbor.x, node.y, neighbor.y)
+            node.neighbours[neighbor] = dist
 
     return nodes
 
@@ -1,8 +1,13 @@
 
 import json
 import csv
-import heapq
 import math
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from core.graph import Graph
+from core.pathfinding import find_path
 
 #loading warehouse map
 try:
@@ -51,66 +56,16 @@ lookup_table = {
     "D3R": ["C11-9", "C12-9", "C13-9", "C14-9", "C15-9"],
 }
 
-import heapq
-
-def heuristic(node_a, node_b):
-    """Calculate Manhattan distance heuristic (admissible for 4-directional grid movement)"""
-    if node_a not in nodes or node_b not in nodes:
-        return float("inf")
-    ax, ay = nodes[node_a]["x"], nodes[node_a]["y"]
-    bx, by = nodes[node_b]["x"], nodes[node_b]["y"]
-    return abs(ax - bx) + abs(ay - by)  
+graph = Graph.from_map_data(nodes, metric='hops')
 
 def a_star_search(start, goal):
-    """Optimal pathfinding using corrected A* algorithm"""
+    """Optimal pathfinding through the shared A* engine (uniform 1 step cost)"""
     # Validate input nodes
     if start not in nodes or goal not in nodes:
         print(f"Error: Invalid start/goal nodes ({start} → {goal})")
         return []
 
-    # Initialize priority queue with start node
-    open_set = []
-    g_cost = 0  # Initial cost to reach the start node is 0
-    heapq.heappush(open_set, (heuristic(start, goal) + g_cost, g_cost, start, [start])) 
-    # Track lowest known costs to reach each node
-    g_costs = {start: 0}
-
-    while open_set:
-        # Get node with lowest f-score (priority = f = g + h)
-        current_f, current_g, current_node, current_path = heapq.heappop(open_set)
-
-        # Early exit if we reach the goal
-        if current_node == goal:
-            return current_path
-
-        # Skip if we've found a better path since this node was queued
-        if current_g > g_costs.get(current_node, float('inf')):
-            continue
-
-        # Explore all valid neighbors
-        for neighbor in nodes[current_node].get("neighbours", []):
-            # Validate neighbor existence and accessibility
-            if neighbor not in nodes or nodes[neighbor].get("locked"):
-                continue
-
-            # Calculate new path cost (uniform 1 step cost)
-            new_g = current_g + 1
-
-            # Only proceed if this path is better than previous attempts
-            if new_g < g_costs.get(neighbor, float('inf')):
-                # Update cost tracking
-                g_costs[neighbor] = new_g
-                
-                # Calculate priority score (f = g + h)
-                new_f = new_g + heuristic(neighbor, goal)
-                
-                # Create new path record
-                new_path = current_path + [neighbor]
-                
-                # Add to priority queue
-                heapq.heappush(open_set, (new_f, new_g, neighbor, new_path))
-
-    return []  # No path exists
+    return find_path(graph, start, goal, 'astar', heuristic='manhattan').path
 
 def bin_range_to_indices(bin_range):
     try:
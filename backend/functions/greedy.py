@@ -1,11 +1,15 @@
 import json
-import heapq
 import os
 import matplotlib.pyplot as plt
 import matplotlib.patches as patches # <<<<<<<<<<<<<<<<<<<< ADDED IMPORT
 import matplotlib.colors as mcolors # For potential gradient effects (not used yet but good to have)
 import numpy as np # For gradient effects (not used yet)
 import random
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from core.graph import Graph
+from core.pathfinding import find_path
 
 # --- ENHANCED STYLING CONSTANTS (Copied from previous "beautiful" version) ---
 FIG_BG_COLOR = '#F4F6F6'
@@ -98,45 +102,15 @@ def manhattan_distance_heuristic(node1_id, node2_id, nodes_data):
         return float('inf')
     return abs(x1 - x2) + abs(y1 - y2)
 
-def reconstruct_path(came_from, current_node_id):
-    """Reconstructs the path from the start node to the current_node_id."""
-    path = [current_node_id]
-    while current_node_id in came_from and came_from[current_node_id] is not None:
-        current_node_id = came_from[current_node_id]
-        path.append(current_node_id)
-    return path[::-1]
-
 def greedy_best_first_search(start_node_id, goal_node_id, nodes_data, heuristic_function):
+    """Runs greedy best-first search through the shared pathfinding engine."""
     if start_node_id not in nodes_data or goal_node_id not in nodes_data:
         print("Error: Start or goal node ID not found in nodes_data.")
         return None, set()
-    open_list_pq = []
-    entry_count = 0
-    heapq.heappush(open_list_pq, (heuristic_function(start_node_id, goal_node_id, nodes_data), entry_count, start_node_id))
-    entry_count += 1
-    came_from = {start_node_id: None}
-    explored_nodes = set()
-    while open_list_pq:
-        _, _, current_node_id = heapq.heappop(open_list_pq)
-        if current_node_id in explored_nodes:
-            continue
-        explored_nodes.add(current_node_id)
-        if current_node_id == goal_node_id:
-            return reconstruct_path(came_from, current_node_id), explored_nodes
-        current_node_info = nodes_data.get(current_node_id, {})
-        neighbors = current_node_info.get("neighbours", [])
-        for neighbor_id in neighbors:
-            if neighbor_id not in nodes_data:
-                continue
-            neighbor_info = nodes_data[neighbor_id]
-            if neighbor_info.get("locked", False):
-                continue
-            if neighbor_id not in explored_nodes and neighbor_id not in came_from:
-                came_from[neighbor_id] = current_node_id
-                priority = heuristic_function(neighbor_id, goal_node_id, nodes_data)
-                heapq.heappush(open_list_pq, (priority, entry_count, neighbor_id))
-                entry_count += 1
-    return None, explored_nodes
+    graph = Graph.from_map_data(nodes_data, metric='manhattan')
+    result = find_path(graph, start_node_id, goal_node_id, 'greedy', trace=True,
+                       heuristic=lambda i: heuristic_function(graph.names[i], goal_node_id, nodes_data))
+    return (result.path or None), set(result.explored)
 
 # --- REPLACED draw_warehouse_path FUNCTION ---
 def draw_warehouse_path(nodes_data, racks_data, start_node_id, goal_node_id, path, explored_nodes=None, title="Warehouse Path"):
@@ -1,26 +1,21 @@
-# >>> IMPORTANT NOTE <<< 
+# >>> IMPORTANT NOTE <<<
 # THIS IS AN EXAMPLE OF THE ALGORITHM IMPLEMENTATION.
 # IT IS JUST AN EXAMPLE FOR HOW TO USE THE OTHER FILES IN THE BACKEND.
 
-from core.warehouse import Node
-from backend.functions.a_star import AStarSearch
-from backend.functions.greedy import GreedySearch
-from backend.functions.simulated_annealing import SimulatedAnnealing
-from backend.functions.genetic import GeneticAlgorithm
+from core.graph import Graph
+from core.pathfinding import PathResult, available_algorithms, find_path
 
-def search(algorithm: str, start: Node, goal: Node):
+# Names used by the frontend, mapped to the algorithms registered in core.pathfinding
+ALGORITHM_ALIASES = {
+    "AStar": "astar",
+    "Greedy": "greedy",
+    "Dijkstra": "dijkstra",
+    "TravelTime": "travel_time",
+}
+
+def search(algorithm: str, graph: Graph, start: str, goal: str, **options) -> PathResult:
     """ Run the selected search algorithm and return the result. """
-    if algorithm == "AStar":
-        search = AStarSearch(start, goal)
-        return search.search()
-    elif algorithm == "Greedy":
-        search = GreedySearch(start, goal)
-        return search.search()
-    elif algorithm == "SimulatedAnnealing":
-        search = SimulatedAnnealing(start, goal)
-        return search.search()
-    elif algorithm == "Genetic":
-        search = GeneticAlgorithm(start, goal)
-        return search.search()
-    else:
+    name = ALGORITHM_ALIASES.get(algorithm, algorithm)
+    if name not in available_algorithms():
         raise ValueError(f"Unknown algorithm {algorithm}")
+    return find_path(graph, start, goal, name, **options)
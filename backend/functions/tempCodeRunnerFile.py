@@ -1,9 +1,13 @@
 import json
-import heapq
 import math
 import os
+import sys
 import matplotlib.pyplot as plt
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from core.graph import Graph
+from core.pathfinding import find_path
+
 # --- File Paths ---
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 MAP_FILE_PATH = os.path.join(BASE_DIR, "..", "data", "map.json")
@@ -30,33 +34,11 @@ def heuristic_manhattan(n1, n2, nodes):
 def get_goal_node_from_lookup(item_id, table):
     return table.get(item_id, {}).get("goal_node")
 
-def reconstruct_path(came_from, current):
-    path = [current]
-    while current in came_from and came_from[current]:
-        current = came_from[current]
-        path.append(current)
-    return path[::-1]
-
 def greedy_search(start, goal, nodes, heuristic):
-    open_set = []
-    heapq.heappush(open_set, (heuristic(start, goal, nodes), start))
-    came_from = {start: None}
-    explored = set()
-
-    while open_set:
-        _, current = heapq.heappop(open_set)
-        if current in explored:
-            continue
-        explored.add(current)
-        if current == goal:
-            return reconstruct_path(came_from, current), explored
-
-        for neighbor in nodes[current].get("neighbours", []):
-            if neighbor not in explored and not nodes[neighbor].get("locked", False):
-                came_from[neighbor] = current
-                heapq.heappush(open_set, (heuristic(neighbor, goal, nodes), neighbor))
-
-    return None, explored
+    graph = Graph.from_map_data(nodes, metric='manhattan')
+    result = find_path(graph, start, goal, 'greedy', trace=True,
+                       heuristic=lambda i: heuristic(graph.names[i], goal, nodes))
+    return (result.path or None), set(result.explored)
 
 def plot_statistics(path_ids, explored, warehouse_nodes):
     heuristics = [
@@ -1,6 +1,6 @@
 import json
-import heapq
 import os
+import sys
 import time
 import matplotlib.pyplot as plt
 import matplotlib.patches as patches
@@ -9,6 +9,10 @@ import numpy as np
 import random
 import pandas as pd
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from core.graph import Graph
+from core.pathfinding import find_path
+
 # --- ENHANCED STYLING CONSTANTS ---
 FIG_BG_COLOR = '#F4F6F6'
 AXES_BG_COLOR = '#FFFFFF'
@@ -83,60 +87,28 @@ def calculate_path_distance(path, nodes_data, dist_fn=manhattan_distance_heurist
         total_dist+=d
     return total_dist
 
-def reconstruct_path(came_from, current_node_id):
-    path=[current_node_id]
-    while current_node_id in came_from and came_from[current_node_id] is not None:
-        current_node_id=came_from[current_node_id]; path.append(current_node_id)
-    return path[::-1]
+_graphs = {}
 
-def greedy_best_first_search(start_node_id, goal_node_id, nodes_data, heuristic_function):
+def map_graph(nodes_data):
+    """Returns the engine graph for a nodes dict (Manhattan edge costs), built once per dict."""
+    graph = _graphs.get(id(nodes_data))
+    if graph is None:
+        graph = _graphs[id(nodes_data)] = Graph.from_map_data(nodes_data, metric='manhattan')
+    return graph
+
+def run_engine(algorithm, start_node_id, goal_node_id, nodes_data, heuristic_function):
     if start_node_id not in nodes_data or goal_node_id not in nodes_data: return None,set(),0
-    pq,ec=[],0; h_s=heuristic_function(start_node_id,goal_node_id,nodes_data)
-    if h_s==float('inf'): return None,set(),0
-    heapq.heappush(pq,(h_s,ec,start_node_id)); ec+=1
-    cf,ex_n={start_node_id:None},set()
-    while pq:
-        _,_,curr_n_id=heapq.heappop(pq)
-        if curr_n_id in ex_n: continue
-        ex_n.add(curr_n_id)
-        if curr_n_id==goal_node_id: p=reconstruct_path(cf,curr_n_id); return p,ex_n,len(p)
-        curr_n_info=nodes_data.get(curr_n_id,{})
-        for neigh_id in curr_n_info.get("neighbours",[]):
-            if neigh_id not in nodes_data or nodes_data[neigh_id].get("locked",False): continue
-            if neigh_id not in ex_n and neigh_id not in cf:
-                cf[neigh_id]=curr_n_id; prio=heuristic_function(neigh_id,goal_node_id,nodes_data)
-                if prio==float('inf'): continue
-                heapq.heappush(pq,(prio,ec,neigh_id)); ec+=1
-    return None,ex_n,0
+    if heuristic_function(start_node_id,goal_node_id,nodes_data)==float('inf'): return None,set(),0
+    graph=map_graph(nodes_data)
+    res=find_path(graph,start_node_id,goal_node_id,algorithm,trace=True,
+                  heuristic=lambda i: heuristic_function(graph.names[i],goal_node_id,nodes_data))
+    return (res.path or None),set(res.explored),len(res.path)
+
+def greedy_best_first_search(start_node_id, goal_node_id, nodes_data, heuristic_function):
+    return run_engine('greedy',start_node_id,goal_node_id,nodes_data,heuristic_function)
 
 def a_star_search(start_node_id, goal_node_id, nodes_data, heuristic_function):
-    if start_node_id not in nodes_data or goal_node_id not in nodes_data: return None,set(),0
-    pq,ec=[],0
-    g_s={n:float('inf') for n in nodes_data}; g_s[start_node_id]=0
-    f_s={n:float('inf') for n in nodes_data}
-    h_s=heuristic_function(start_node_id,goal_node_id,nodes_data)
-    if h_s==float('inf'): return None,set(),0
-    f_s[start_node_id]=h_s
-    heapq.heappush(pq,(f_s[start_node_id],ec,start_node_id)); ec+=1
-    cf,ex_n_set={start_node_id:None},set()
-    while pq:
-        curr_f,_,curr_n_id=heapq.heappop(pq)
-        if curr_f > f_s.get(curr_n_id,float('inf')): continue
-        if curr_n_id==goal_node_id: p=reconstruct_path(cf,curr_n_id); return p,ex_n_set,len(p)
-        ex_n_set.add(curr_n_id)
-        curr_n_info=nodes_data.get(curr_n_id,{})
-        for neigh_id in curr_n_info.get("neighbours",[]):
-            if neigh_id not in nodes_data or nodes_data[neigh_id].get("locked",False): continue
-            cost_neigh=manhattan_distance_heuristic(curr_n_id,neigh_id,nodes_data)
-            if cost_neigh==float('inf'): continue
-            tent_g_s=g_s.get(curr_n_id,float('inf'))+cost_neigh
-            if tent_g_s < g_s.get(neigh_id,float('inf')):
-                cf[neigh_id]=curr_n_id; g_s[neigh_id]=tent_g_s
-                h_n=heuristic_function(neigh_id,goal_node_id,nodes_data)
-                if h_n==float('inf'): continue
-                f_s[neigh_id]=tent_g_s+h_n
-                heapq.heappush(pq,(f_s[neigh_id],ec,neigh_id)); ec+=1
-    return None,ex_n_set,0
+    return run_engine('astar',start_node_id,goal_node_id,nodes_data,heuristic_function)
 
 def draw_warehouse_path(nodes_data, racks_data, start_node_id, goal_node_id, path, explored_nodes=None, title="Warehouse Path", algo_name=""):
     if not nodes_data: print("No node data for drawing."); return
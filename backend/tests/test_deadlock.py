@@ -0,0 +1,89 @@
+import os
+import threading
+
+import pytest
+
+from core.agent import Agent
+from core.mixer import Mixer
+from core.reservation import ReservationManager
+from core.types import AgentType
+from core.warehouse import Warehouse
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+
+
+@pytest.fixture
+def mixer(tmp_path):
+    Mixer._instance = None
+    mixer = Mixer(log_dir=str(tmp_path))
+    yield mixer
+    mixer.close()
+    Mixer._instance = None
+
+
+@pytest.fixture
+def head_on(mixer):
+    """Agents facing each other on N10-5 and N10-6, each with one step of history."""
+    warehouse = Warehouse.load(os.path.join(DATA_DIR, 'map.json'), os.path.join(DATA_DIR, 'lookup_table.json'))
+    node = warehouse.get_node_by_name
+    light = Agent(1, node('N10-4'), 1.0, mixer=mixer, agent_type=AgentType.PICKER)
+    heavy = Agent(2, node('N11-6'), 2.0, mixer=mixer, agent_type=AgentType.PICKER)
+    assert light.move(node('N10-5')) and heavy.move(node('N10-6'))
+    return warehouse, light, heavy
+
+
+def test_reservation_conflicts_close_a_wait_for_cycle(mixer, head_on):
+    warehouse, light, heavy = head_on
+    node = warehouse.get_node_by_name
+    reservations = ReservationManager()
+
+    first = reservations.execute(light, [node('N10-6'), node('N10-7')])
+    assert not first.success and first.blocked_node is node('N10-6')
+    assert len(mixer.wait_for) == 1 and mixer.deadlock_stats['detected'] == 0
+
+    second = reservations.execute(heavy, [node('N10-5'), node('N10-4')])
+    assert not second.success
+    assert mixer.deadlock_stats['detected'] == 1 and mixer.deadlock_stats['resolved'] == 1
+    # The lighter agent backed off, which frees the node the heavier one waits for
+    assert light.node is node('N10-4')
+    assert not node('N10-5').locked
+    assert reservations.execute(heavy, [node('N10-5')]).success
+
+
+def test_agent_moved_by_another_thread_is_not_backed_off(mixer, head_on):
+    warehouse, light, heavy = head_on
+    node = warehouse.get_node_by_name
+    reservations = ReservationManager()
+    reservations.execute(light, [node('N10-6')])
+
+    # Another request is executing a path for the lighter agent
+    holding, done = threading.Event(), threading.Event()
+
+    def hold():
+        with light.motion_lock:
+            holding.set()
+            done.wait(5)
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    holding.wait(5)
+    try:
+        reservations.execute(heavy, [node('N10-5')])
+    finally:
+        done.set()
+        holder.join()
+
+    assert light.node is node('N10-5')
+    assert heavy.node is node('N11-6')
+    assert mixer.deadlock_stats['resolved'] == 1
+
+
+def test_backed_off_agent_releases_its_reserved_window(mixer, head_on):
+    warehouse, light, heavy = head_on
+    node = warehouse.get_node_by_name
+    assert light.lock_manager.acquire_all([node('N9-6')], light) is None  # Reserved ahead
+    ReservationManager().execute(light, [node('N10-6')])
+    ReservationManager().execute(heavy, [node('N10-5')])
+
+    assert light.node is node('N10-4')
+    assert not node('N9-6').locked and not node('N10-5').locked
@@ -0,0 +1,30 @@
+import os
+
+from core.agent import Agent
+from core.dispatcher import Dispatcher
+from core.distance_field import DistanceFieldCache
+from core.scheduler import TaskScheduler
+from core.task import Task
+from core.types import AgentStatus, AgentType, TaskType
+from core.warehouse import Warehouse
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+
+
+def test_unassignable_tasks_do_not_starve_the_queue():
+    warehouse = Warehouse.load(os.path.join(DATA_DIR, 'map.json'), os.path.join(DATA_DIR, 'lookup_table.json'))
+    node = warehouse.get_node_by_name
+    transporter = Agent(0, node('N1-1'), 1.0, agent_type=AgentType.TRANSPORTER)
+    scheduler = TaskScheduler()
+    # Urgent picks only a picker may take, ahead of a move the transporter can take
+    for row in range(2, 12):
+        scheduler.push(Task(f'N1-{row}', TaskType.PICK, 5))
+    scheduler.push(Task('N1-21', TaskType.MOVE, 0))
+    dispatcher = Dispatcher(DistanceFieldCache(warehouse.get_graph()), scheduler)
+
+    assignments = dispatcher.dispatch([transporter])
+
+    assert [a.task.task.job for a in assignments] == [TaskType.MOVE]
+    assert transporter.status == AgentStatus.MOVING and transporter.goal_state == 'N1-21'
+    assert len(scheduler) == 10
+    assert dispatcher.stats.deferred == 10
@@ -0,0 +1,59 @@
+import json
+import os
+
+from core.log_archive import LogArchive, compact_day, finished_days
+
+DAY = '20260101'
+
+
+def write_log(path, first, count):
+    with open(path, 'a') as f:
+        for i in range(first, first + count):
+            f.write(json.dumps({
+                "id": f"event-{i}",
+                "timestamp": f"2026-01-01T{i % 24:02d}:00:00.{i:06d}",
+                "type": "movement",
+                "message": f"Moved to N{i}",
+                "agent_id": str(i % 3),
+                "task_id": None,
+            }) + "\n")
+
+
+def test_repeated_compaction_archives_each_event_once(tmp_path):
+    log_dir = str(tmp_path)
+    write_log(os.path.join(log_dir, f"warehouse_logs_{DAY}.jsonl"), 0, 30)
+
+    first = compact_day(log_dir, DAY)
+    assert first.events == 30
+    assert finished_days(log_dir, today='20260102') == []
+    for _ in range(2):
+        assert compact_day(log_dir, DAY) is None
+    assert len(LogArchive(first.archive)) == 30
+
+
+def test_compaction_merges_new_events_without_duplicates(tmp_path):
+    log_dir = str(tmp_path)
+    source = os.path.join(log_dir, f"warehouse_logs_{DAY}.jsonl")
+    write_log(source, 0, 30)
+    archive = compact_day(log_dir, DAY).archive
+
+    # Late events written after the first compaction make the sources newer than the archive
+    write_log(source, 30, 5)
+    written = os.path.getmtime(archive)
+    os.utime(source, (written + 1, written + 1))
+    assert finished_days(log_dir, today='20260102') == [DAY]
+    assert compact_day(log_dir, DAY).events == 35
+    assert len(LogArchive(archive)) == 35
+
+
+def test_compaction_keeps_archived_events_of_deleted_sources(tmp_path):
+    log_dir = str(tmp_path)
+    write_log(os.path.join(log_dir, f"warehouse_logs_{DAY}.jsonl"), 0, 30)
+    archive = compact_day(log_dir, DAY, delete=True).archive
+
+    write_log(os.path.join(log_dir, f"warehouse_logs_{DAY}.1.jsonl"), 30, 10)
+    written = os.path.getmtime(archive)
+    os.utime(os.path.join(log_dir, f"warehouse_logs_{DAY}.1.jsonl"), (written + 1, written + 1))
+    assert compact_day(log_dir, DAY).events == 40
+    ids = [row['id'] for row in LogArchive(archive).read(['id'])]
+    assert sorted(ids) == sorted(f"event-{i}" for i in range(40))
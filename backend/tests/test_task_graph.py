@@ -0,0 +1,58 @@
+import pytest
+
+from core.mixer import Mixer
+from core.task import Task
+from core.task_graph import TaskGraph
+from core.types import TaskStatus, TaskType
+
+
+def chain(*names, depends_on=()):
+    tasks = []
+    for name in names:
+        tasks.append(Task(name, TaskType.MOVE, depends_on=[tasks[-1].hash_id] if tasks else list(depends_on)))
+    return tasks
+
+
+def test_remove_prunes_dependents_and_shortens_ancestors():
+    graph = TaskGraph()
+    pick, move, place = chain('N1-1', 'N1-2', 'N1-3')
+    side = Task('N1-4', TaskType.MOVE, depends_on=[pick.hash_id])
+    for task in (pick, move, place, side):
+        graph.add(task)
+    assert graph.critical_path(pick.hash_id) == 3
+
+    dependents, shortened = graph.remove(move.hash_id)
+
+    assert dependents == [place.hash_id]
+    assert shortened == [pick.hash_id]
+    assert graph.critical_path(pick.hash_id) == 2
+    assert move.hash_id not in graph and place.hash_id not in graph
+    assert graph.remove(move.hash_id) == ([], [])
+    assert graph.complete(pick.hash_id) == [(side, None)]
+
+
+@pytest.fixture
+def mixer(tmp_path):
+    Mixer._instance = None
+    mixer = Mixer(log_dir=str(tmp_path))
+    yield mixer
+    mixer.close()
+    Mixer._instance = None
+
+
+def test_cancelled_task_fails_its_dependents(mixer):
+    pick, move, place = chain('N1-1', 'N1-2', 'N1-3')
+    mixer.order_job([pick, move, place])
+    assert mixer.scheduler.get(pick.hash_id).priority == 2
+
+    assert mixer.cancel_task(move.hash_id)
+
+    assert mixer.task_table.get(place.hash_id).status == TaskStatus.FAILED
+    assert mixer.scheduler.get(pick.hash_id).priority == 0
+    assert len(mixer.task_graph) == 1
+    with pytest.raises(ValueError):
+        mixer.retry_task(place.hash_id)
+    assert mixer.retry_task(move.hash_id) and mixer.retry_task(place.hash_id)
+    assert mixer.scheduler.get(pick.hash_id).priority == 2
+    mixer.complete_task(pick)
+    assert mixer.scheduler.get(move.hash_id) is not None
@@ -1,28 +1,42 @@
+from core.wait_for import WaitForGraph
+
+
 class DeadlockHandler:
-    def __init__(self):
+    def __init__(self, wait_for: WaitForGraph = None):
         self.resolutions = []
+        self.wait_for = wait_for if wait_for is not None else WaitForGraph()
 
     def detect_deadlock(self, agents):
         """
-        Detects if there is any deadlock scenario.
-        Assumes that agents can be in blocked state and not able to progress.
+        Detects agents waiting for each other in a cycle and resolves each cycle.
+        Agents that could not take their next node (Agent.blocked_on) are added to the
+        wait-for graph first, so the handler also works without a mixer tracking them.
         """
-        blocked_agents = [agent for agent in agents if agent.state == "blocked"]
+        for agent in agents:
+            if agent.blocked_on is not None:
+                self.wait_for.wait(agent, agent.blocked_on)
 
-        # Deadlock detection: If there is at least one agent in a blocked state, resolve it.
-        if len(blocked_agents) >= 1:
-            self.resolve_deadlock(blocked_agents)
+        for cycle in self.wait_for.cycles():
+            self.resolve_deadlock([edge.waiter for edge in cycle])
 
     def resolve_deadlock(self, agents):
         """
-        Resolves deadlock by reversing the last move of one of the blocked agents.
-        This is a simple resolution, could be more complex based on needs.
+        Resolves a deadlock by backtracking the lightest agent of the cycle one step along its
+        path history and releasing the nodes it reserved ahead, which frees the node the next
+        agent in the cycle waits for. Agents another thread is moving are skipped.
         """
-        # For simplicity, we can move one of the agents back a step (could be improved with actual path data)
-        for agent in agents:
-            if agent.state == "blocked":
-                self.resolutions.append(f"Resolving deadlock by moving {agent} back.")
-                agent.node.x -= 1  # Move back by 1 step in x direction
-                agent.node.y -= 1  # Move back by 1 step in y direction
-                agent.state = "moving"  # Change state to 'moving'
-                break  # Resolve only one agent for simplicity
+        for agent in sorted(agents, key=lambda a: a.weight):
+            if not agent.motion_lock.acquire(blocking=False):
+                continue
+            try:
+                moved = agent.backtrack(1)
+                if moved:
+                    agent.release_reservations()
+            finally:
+                agent.motion_lock.release()
+            if moved:
+                self.wait_for.clear(agent)
+                self.resolutions.append(f"Resolved deadlock by moving {agent} back.")
+                return True
+        self.resolutions.append(f"Could not resolve deadlock between {', '.join(str(a) for a in agents)}.")
+        return False
@@ -0,0 +1,137 @@
+""" Staged background start-up.
+    The heavy initialization (map load, indexes, path caches, agents) runs as named stages in a
+    daemon thread, so the web server can answer health checks right away and report readiness
+    once every stage has finished.
+"""
+
+import logging
+import threading
+import time
+import traceback
+from dataclasses import asdict, dataclass
+from typing import Callable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+# A stage receives a callback to report its own progress as a fraction between 0 and 1
+StageFn = Callable[[Callable[[float], None]], None]
+
+
+@dataclass
+class WarmupStage:
+    """State of one start-up stage.
+
+    Attributes:
+        name (str): Stage name
+        status (str): "pending", "running", "done" or "failed"
+        progress (float): Fraction of the stage completed
+        elapsed (float): Seconds spent in the stage so far
+        error (Optional[str]): Error message if the stage failed
+    """
+    name: str
+    status: str = PENDING
+    progress: float = 0.0
+    elapsed: float = 0.0
+    error: Optional[str] = None
+
+
+class Warmup:
+    """Runs start-up stages in order on a background thread.
+
+    The stages run one after another; if one fails, the remaining ones are skipped and the
+    warm-up stays failed.
+
+    Attributes:
+        stages (List[WarmupStage]): Stage states, in run order
+    """
+
+    def __init__(self, stages: List[Tuple[str, StageFn]]):
+        self._functions = [fn for _, fn in stages]
+        self.stages = [WarmupStage(name) for name, _ in stages]
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._started_at: Optional[float] = None
+        self._finished_at: Optional[float] = None
+
+    def start(self) -> threading.Thread:
+        """Starts the warm-up thread (once)."""
+        with self._lock:
+            if self._thread is None:
+                self._started_at = time.perf_counter()
+                self._thread = threading.Thread(target=self.run, name='warmup', daemon=True)
+                self._thread.start()
+            return self._thread
+
+    def run(self) -> None:
+        """Runs every stage in the calling thread."""
+        if self._started_at is None:
+            self._started_at = time.perf_counter()
+        try:
+            for stage, fn in zip(self.stages, self._functions):
+                self._run_stage(stage, fn)
+                if stage.status == FAILED:
+                    break
+        finally:
+            self._finished_at = time.perf_counter()
+            self._done.set()
+
+    def _run_stage(self, stage: WarmupStage, fn: StageFn) -> None:
+        started = time.perf_counter()
+
+        def report(fraction: float) -> None:
+            stage.progress = min(max(fraction, 0.0), 1.0)
+            stage.elapsed = time.perf_counter() - started
+
+        stage.status = RUNNING
+        logger.info(f"Warm-up: {stage.name}...")
+        try:
+            fn(report)
+        except Exception as e:
+            stage.status = FAILED
+            stage.error = str(e)
+            stage.elapsed = time.perf_counter() - started
+            logger.error(f"Warm-up stage {stage.name} failed: {str(e)}\n{traceback.format_exc()}")
+            return
+        stage.status = DONE
+        stage.progress = 1.0
+        stage.elapsed = time.perf_counter() - started
+        logger.info(f"Warm-up: {stage.name} done in {stage.elapsed * 1000:.1f} ms")
+
+    @property
+    def ready(self) -> bool:
+        """Whether every stage finished successfully."""
+        return self._done.is_set() and all(stage.status == DONE for stage in self.stages)
+
+    @property
+    def failed(self) -> bool:
+        return any(stage.status == FAILED for stage in self.stages)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Blocks until the warm-up has finished; returns whether it succeeded."""
+        self._done.wait(timeout)
+        return self.ready
+
+    def progress(self) -> float:
+        """Returns the overall completed fraction, each stage counting equally."""
+        if not self.stages:
+            return 1.0
+        return sum(stage.progress for stage in self.stages) / len(self.stages)
+
+    def snapshot(self) -> dict:
+        """Returns the warm-up state for the readiness endpoint."""
+        current = next((stage.name for stage in self.stages if stage.status == RUNNING), None)
+        end = self._finished_at if self._finished_at is not None else time.perf_counter()
+        return {
+            "ready": self.ready,
+            "failed": self.failed,
+            "progress": round(self.progress(), 3),
+            "current_stage": current,
+            "elapsed": round(end - self._started_at, 3) if self._started_at is not None else 0.0,
+            "stages": [asdict(stage) for stage in self.stages],
+        }